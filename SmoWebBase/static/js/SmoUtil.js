@@ -385,6 +385,59 @@ smoModule.factory('communicator', function($http, $window, $timeout, $location,
 	    });
 	}
 	
+	// Maximum number of points per series requested for plots of hdf storage data
+	var hdfPlotTargetPoints = 4000;
+	
+	// Encoding requested for array values (RecordArray, TableView, PlotView)
+	var arrayEncoding = 'base64Columns';
+	
+	// Converts an array encoded as base64 column buffers back to a list of rows
+	// (typed arrays use the platform byte order, which is little endian on all common platforms)
+	function decodeBase64Columns(value) {
+		var numRows = value.shape[0];
+		var columns = [];
+		for (var j=0; j<value.columns.length; j++) {
+			var column = value.columns[j];
+			if (typeof column.data === 'undefined') {
+				columns.push(column.values);
+			} else {
+				var binary = atob(column.data);
+				var bytes = new Uint8Array(binary.length);
+				for (var k=0; k<binary.length; k++) {
+					bytes[k] = binary.charCodeAt(k);
+				}
+				if (column.dtype == 'float32') {
+					columns.push(new Float32Array(bytes.buffer));
+				} else {
+					columns.push(new Float64Array(bytes.buffer));
+				}
+			}
+		}
+		var rows = new Array(numRows);
+		for (var i=0; i<numRows; i++) {
+			var row = new Array(columns.length);
+			for (var j=0; j<columns.length; j++) {
+				row[j] = columns[j][i];
+			}
+			rows[i] = row;
+		}
+		return rows;
+	}
+	
+	// Decodes in place the encoded arrays in the field values (including sub-model values)
+	function decodeArrayValues(values) {
+		for (var key in values) {
+			var value = values[key];
+			if (value !== null && typeof value === 'object' && !Array.isArray(value)) {
+				if (value.encoding == arrayEncoding) {
+					values[key] = decodeBase64Columns(value);
+				} else {
+					decodeArrayValues(value);
+				}
+			}
+		}
+	}
+	
 	// Model communicator
 	function ModelCommunicator(model, modelName, viewName, url) {
 			this.model = model;
@@ -399,6 +452,8 @@ smoModule.factory('communicator', function($http, $window, $timeout, $location,
 		this.postData = {
 			modelName: this.modelName,
 			viewName: this.viewName,
+			arrayEncoding: arrayEncoding,
+			schemaETag: this.schemaETag,
 			parameters: parameters
 		};
 	}
@@ -410,6 +465,19 @@ smoModule.factory('communicator', function($http, $window, $timeout, $location,
 			}
 		};
 		
+		if (typeof responseData.values !== 'undefined') {
+			decodeArrayValues(responseData.values);
+		}
+		
+		// The definitions are sent only if they differ from the ones received before
+		if (typeof responseData.schemaETag !== 'undefined') {
+			if (typeof responseData.definitions === 'undefined') {
+				responseData.definitions = this.data.definitions;
+				responseData.actions = this.data.actions;
+			}
+			this.schemaETag = responseData.schemaETag;
+		}
+		
 		if (responseData.keepDefaultDefs == false) {
 			//If the definitions have been received once, on next occasions they are discarded
 			if (this.data.definitions) {
@@ -431,7 +499,9 @@ smoModule.factory('communicator', function($http, $window, $timeout, $location,
 							if (field.type == 'TableView' || field.type == 'PlotView') {
 								if (field.useHdfStorage == true) {
 									hdfViews.push({"name": field.name,
-													"storage": responseData.values[field.name]});
+													"type": field.type,
+													"storage": responseData.values[field.name],
+													"field": field});
 								}
 							}
 							if (field.type == 'HdfStorage') {
@@ -446,6 +516,25 @@ smoModule.factory('communicator', function($http, $window, $timeout, $location,
 				}
 			}
 			
+			// storage fields shown only in plots are downsampled on the server
+			for (var i=0; i<storageFields.length; i++) {
+				var plotsOnly = true;
+				for (var j=0; j<hdfViews.length; j++) {
+					if (hdfViews[j].storage == storageFields[i].name && hdfViews[j].type != 'PlotView') {
+						plotsOnly = false;
+					}
+				}
+				if (plotsOnly) {
+					storageFields[i].targetPoints = hdfPlotTargetPoints;
+					// the plots request the visible time window again when zoomed or panned
+					for (var j=0; j<hdfViews.length; j++) {
+						if (hdfViews[j].storage == storageFields[i].name) {
+							hdfViews[j].field.hdfStorage = storageFields[i];
+						}
+					}
+				}
+			}
+			
 			if (storageFields.length > 0) {
 				var modelComm = this;
 				var onFetchSuccess = function(comm) {
@@ -521,6 +610,7 @@ smoModule.factory('communicator', function($http, $window, $timeout, $location,
 	
 	AsyncModelCommunicator.prototype.computeAsync = function(parameters) {
 		this.current = 0;
+		this.progressStreamFailed = false;
 		$('#' + this.modelName + '_computeButton').prop('disabled', true);
 		this.fetchData('startCompute', parameters, this.onFetchSuccess);
 	}
@@ -532,17 +622,58 @@ smoModule.factory('communicator', function($http, $window, $timeout, $location,
 			$('#' + this.modelName + '_computeButton').prop('disabled', false);
 		}
 		if (this.jobID) {
+			this.closeProgressStream();
 			this.fetchData('abort', {"jobID" : this.jobID}, onFetchSuccess);
 		}
 	}
 	
 	AsyncModelCommunicator.prototype.checkProgress = function() {
 		var comm = this;
+		// Progress updates are pushed by the server if the browser supports Server-Sent Events, 
+		// otherwise (or if the stream fails) the server is polled
+		if (typeof $window.EventSource !== 'undefined' && !this.progressStreamFailed) {
+			if (!this.progressStream) {
+				this.openProgressStream();
+			}
+			return;
+		}
 		setTimeout(function(){
 			comm.fetchData('checkProgress', {"jobID" : comm.jobID}, comm.onFetchSuccess);
 		}, 1000);
 	}
 	
+	AsyncModelCommunicator.prototype.openProgressStream = function() {
+		var comm = this;
+		var url = (this.url || $window.location.pathname) + '?progressJobID=' + encodeURIComponent(this.jobID);
+		var stream = new $window.EventSource(url);
+		this.progressStream = stream;
+		stream.onmessage = function(event) {
+			var data = JSON.parse(event.data);
+			if (data.state == 'PROGRESS') {
+				$timeout(function() {
+					comm.current = data.current;
+					comm.total = data.total;
+				});
+			} else if (data.state == 'SUCCESS' || data.state == 'FAILURE' || data.state == 'REVOKED') {
+				comm.closeProgressStream();
+				// Get the result or the error
+				comm.fetchData('checkProgress', {"jobID" : comm.jobID}, comm.onFetchSuccess);
+			}
+		};
+		stream.onerror = function() {
+			comm.closeProgressStream();
+			comm.progressStreamFailed = true;
+			comm.checkProgress();
+		};
+	}
+	
+	AsyncModelCommunicator.prototype.closeProgressStream = function() {
+		if (this.progressStream) {
+			this.progressStream.close();
+			this.progressStream = null;
+		}
+	}
+	
 	AsyncModelCommunicator.prototype.setResponseData = function(responseData) {
 		if (responseData.jobID) {
 			this.jobID = responseData.jobID;
@@ -1113,7 +1244,7 @@ smoModule.directive('smoBool', ['$compile', function($compile) {
 	}
 }]);
 
-smoModule.directive('smoDataSeriesView', ['$compile', 'communicator', 'util', function($compile, communicator, util) {
+smoModule.directive('smoDataSeriesView', ['$compile', '$timeout', 'communicator', 'util', function($compile, $timeout, communicator, util) {
 	return {
 		restrict : 'A',
 		scope : {
@@ -1169,10 +1300,73 @@ smoModule.directive('smoDataSeriesView', ['$compile', 'communicator', 'util', fu
 				$scope.options.xlabel = $scope.options.labels[0];			
 			}
 			
+			// Time window (in display units) of the loaded hdf storage data, null for the whole dataset
+			var hdfWindow = null;
+			var hdfRequest = null;
+			
+			var loadHdfWindow = function(timeWindow) {
+				//Requesting the decimated data of the visible time window, and a window width on both sides for panning
+				var storage = angular.copy($scope.fieldVar.hdfStorage);
+				if (timeWindow != null) {
+					var field = $scope.fieldVar.fields[0];
+					var toStorageUnit = function(x) {
+						var value = x * field.dispUnitDef.mult + (field.dispUnitDef.offset || 0);
+						return (value - (field.unitDef.offset || 0)) / field.unitDef.mult;
+					}
+					var width = timeWindow[1] - timeWindow[0];
+					storage.tStart = toStorageUnit(timeWindow[0] - width);
+					storage.tEnd = toStorageUnit(timeWindow[1] + width);
+					storage.targetPoints = 3 * storage.targetPoints;
+				}
+				var hdfDataComm = new communicator.Communicator();
+				hdfDataComm.fetchData('loadHdfValues', [storage], function(comm) {
+					hdfWindow = timeWindow;
+					var values = comm.data[0][storage.name];
+					if (values.length == 0) {
+						return;
+					}
+					$scope.setValues(values);
+					setPlotView();
+					var options = {file: $scope.viewData};
+					if (timeWindow != null) {
+						options.dateWindow = timeWindow;
+					}
+					$scope.chart.updateOptions(options);
+				});
+			}
+			
+			var onPlotDraw = function(chart, isInitial) {
+				//Reloading the data of hdf storage plots when the visible time window changes
+				if (isInitial) {
+					return;
+				}
+				var timeWindow = chart.isZoomed('x') ? chart.xAxisRange() : null;
+				if (timeWindow == null && hdfWindow == null) {
+					return;
+				}
+				if (timeWindow != null && hdfWindow != null && timeWindow[0] == hdfWindow[0] && timeWindow[1] == hdfWindow[1]) {
+					return;
+				}
+				if (hdfRequest != null) {
+					$timeout.cancel(hdfRequest);
+				}
+				// wait for the end of the zooming or panning
+				hdfRequest = $timeout(function() {
+					hdfRequest = null;
+					loadHdfWindow(timeWindow);
+				}, 300);
+			}
+			
 			var plotData = function() {
 				$scope.options.labelsDiv = $scope.modelName + '_' + $scope.fieldVar.name + 'LegendDiv';
 				$scope.options.legend = 'always';
 				$scope.options.hideOverlayOnMouseOut = false;
+				if ($scope.fieldVar.hdfStorage) {
+					$scope.options.drawCallback = onPlotDraw;
+					if (hdfWindow != null) {
+						$scope.options.dateWindow = hdfWindow;
+					}
+				}
 				$scope.chart = new Dygraph(document.getElementById($scope.modelName + '_' + $scope.fieldVar.name + 'PlotDiv'), 
 						$scope.viewData,
 						$scope.options);
@@ -1326,8 +1520,9 @@ smoModule.directive('smoDataSeriesView', ['$compile', 'communicator', 'util', fu
 				$scope.labels[col] = $scope.fieldVar.labels[col] + ' [' + field.displayUnit + ']';
 			}
 			
-			$scope.init = function() {
-				$scope.values = $scope.smoDataSource[$scope.fieldVar.name];
+			$scope.setValues = function(values) {
+				//Converting the values to the field units and the display units
+				$scope.values = values;
 				$scope.displayValues = angular.copy($scope.values);
 				$scope.labels = angular.copy($scope.fieldVar.labels);
 				
@@ -1364,6 +1559,11 @@ smoModule.directive('smoDataSeriesView', ['$compile', 'communicator', 'util', fu
 					$scope.labels[col] 
 						= $scope.fieldVar.labels[col] + ' [' + field.displayUnit + ']';
 				}
+			}
+			
+			$scope.init = function() {
+				$scope.setValues($scope.smoDataSource[$scope.fieldVar.name]);
+				hdfWindow = null;
 				
 				//Determining number of rows in edit mode
 				var numEditRows;
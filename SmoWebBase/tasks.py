@@ -1,16 +1,48 @@
 from __future__ import absolute_import
 
-from celery import task
+from celery import task, Task
+from celery.signals import worker_process_init
+from django.conf import settings
 from smo.model.model import modelRegistry
+from smo.web.progress import publishProgress
+from smo.util.resources import warmResources
+from smo.model.sweep import evaluateSweepPoint
 
-@task(track_started=True, bind = True)
-def celeryCompute(self, modelName, viewName, parameters):
+class ComputeTask(Task):
+    """
+    Task publishing its progress updates and final state to the progress streams
+    """
+    abstract = True
+
+    def update_state(self, task_id = None, state = None, meta = None):
+        super(ComputeTask, self).update_state(task_id = task_id, state = state, meta = meta)
+        if (state == 'PROGRESS'):
+            publishProgress(self.app, task_id or self.request.id, state,
+                            meta['current'], meta['total'])
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        # Called after the result is stored in the backend
+        publishProgress(self.app, task_id, status)
+
+@task(track_started=True, bind = True, base = ComputeTask)
+def celeryCompute(self, modelName, viewName, parameters, arrayEncoding = None, schemaETag = None):
     model = modelRegistry[modelName]
     view = model.declared_modelViews[viewName]
     instance = model()
     instance.fieldValuesFromJson(parameters)
     instance.task = self
     instance.computeAsync()
-    return instance.modelView2Json(view)
+    return instance.modelView2Json(view, arrayEncoding = arrayEncoding, schemaETag = schemaETag)
+
+@task
+def celerySweepPoint(modelName, parameters, outputs, inputValues):
+    # Returns the complete row of the sweep table
+    return inputValues + evaluateSweepPoint(modelName, parameters, outputs)
+
+@worker_process_init.connect
+def preloadWarmResources(**kwargs):
+    # Each worker process keeps its own cache of meshes, fluids etc.
+    warmResources.maxBytes = getattr(settings, 'WARM_RESOURCES_MAX_BYTES', warmResources.maxBytes)
+    warmResources.preload()
 
 # Starting worker: celery -A SmoWeb worker -l info
\ No newline at end of file
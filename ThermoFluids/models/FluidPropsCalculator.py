@@ -7,7 +7,7 @@ from smo.model.model import NumericalModel
 from smo.model.fields import *
 from smo.web.blocks import HtmlBlock
 from smo.web.modules import RestModule
-from smo.media.CoolProp.CoolProp import Fluid, FluidState
+from smo.media.CoolProp.CoolProp import Fluid, FluidState, FluidStateArray
 from smo.media.MaterialData import Fluids
 from smo.media.CoolProp.CoolPropReferences import References
 import smo.media.diagrams.StateDiagrams as SD
@@ -369,24 +369,22 @@ class SaturationData(NumericalModel):
 	############# Methods ###############	
 	def compute(self):
 		f = Fluid(self.fluidName)
-		fState = FluidState(self.fluidName)
+		fStates = FluidStateArray(self.fluidName)
 		numPoints = 100
 		pressures = np.logspace(np.log10(f.tripple['p']), np.log10(f.critical['p']), numPoints, endpoint = False)
 		data = np.zeros((numPoints, 10))
 		data[:,0] = pressures
 		
-		for i in range(len(pressures)):
-			fState.update_pq(pressures[i], 0)			
-			satL = fState.SatL
-			satV = fState.SatV
-			
-			data[i,1] = fState.T
-			data[i,2] = satL.rho
-			data[i,3] = satV.rho
-			data[i,4] = satL.h
-			data[i,5] = satV.h
-			data[i,7] = satL.s
-			data[i,8] = satV.s
+		# Saturated liquid and vapor states
+		satL = fStates.update_pq(pressures, 0, properties = ('T', 'rho', 'h', 's'))
+		satV = fStates.update_pq(pressures, 1, properties = ('rho', 'h', 's'))
+		data[:,1] = satL['T']
+		data[:,2] = satL['rho']
+		data[:,3] = satV['rho']
+		data[:,4] = satL['h']
+		data[:,5] = satV['h']
+		data[:,7] = satL['s']
+		data[:,8] = satV['s']
 		# Compute evaporation enthalpy
 		data[:,6] = data[:, 5] - data[:, 4]	
 		# Compute evaporation entropy
@@ -45,6 +45,7 @@ class FreeConvection_External(NumericalModel):
 	label = "Free Convection External"
 	figure = ModelFigure(src="ThermoFluids/img/ModuleImages/Convection_External.svg")
 	description = ModelDescription("Heat exchange due to natural convection for external surfaces", show = True)
+	cacheResults = True
 
 	############# Inputs ###############
 	# Fields
@@ -218,6 +219,7 @@ class FreeConvection_Internal(NumericalModel):
 	label = "Free Convection Internal"
 	figure = ModelFigure(src="ThermoFluids/img/ModuleImages/Convection_Internal.svg")
 	description = ModelDescription("Heat exchange due to natural convection for closed volumes", show = True)
+	cacheResults = True
 
 	############# Inputs ###############
 	# Fields
@@ -6,6 +6,7 @@ Created on Apr 8, 2015
 '''
 
 from smo.model.model import NumericalModel
+from smo.util.resources import warmResources
 from smo.media.MaterialData import Fluids, Solids, IncompressibleSolutions
 from heat_exchangers.HeatExchangerMesher import HeatExchangerMesher
 from heat_exchangers.HeatExchangerSolver import HeatExchangerSolver
@@ -109,7 +110,8 @@ class FluidFlowInput(NumericalModel):
 	modelBlocks = []
 	
 	def createFluidState(self):
-		return CP.FluidState(self.fluidName)
+		fluid = warmResources.get('Fluid', self.fluidName, lambda: CP.Fluid(self.fluidName))
+		return CP.FluidState(fluid)
 	
 	def compute(self):
 		self.fState = self.createFluidState()
@@ -411,11 +413,23 @@ class CylindricalBlockHeatExchanger(NumericalModel):
 		self.sectionResultsSettings.Tmin = (200, 'K')
 		self.sectionResultsSettings.Tmax = (350, 'K')
 		
-	def computeAsync(self):
-		# PreComputation
+	def computeGeometry(self):
 		self.externalChannelGeom.compute(self.blockGeom.diameter)
 		self.primaryChannelsGeom.compute()
 		self.secondaryChannelsGeom.compute()
+	
+	@classmethod
+	def preloadResources(cls):
+		"""
+		Creates the mesh of the default geometry in the warm resource cache
+		"""
+		heatExch = cls()
+		heatExch.computeGeometry()
+		HeatExchangerMesher().create(heatExch)
+		
+	def computeAsync(self):
+		# PreComputation
+		self.computeGeometry()
 		
 		self.primaryFlowIn.compute()
 		self.secondaryFlowIn.compute()
@@ -571,3 +585,6 @@ class CylindricalBlockHeatExchanger(NumericalModel):
 	def isDividedExactly(self, a, b):
 		bigE = 1e6
 		return int(a*bigE) % int(b*bigE) == 0
+
+# Create the default mesh on worker startup
+warmResources.registerPreloader(CylindricalBlockHeatExchanger.preloadResources)
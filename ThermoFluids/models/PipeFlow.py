@@ -10,6 +10,7 @@ class PipeFlow(NumericalModel):
     label = "Pipe Flow"
     figure = ModelFigure(src="ThermoFluids/img/ModuleImages/StraightPipe.svg")
     description = ModelDescription("Pipe flow calculator accounting for heat exchange and pressure drop", show = True)
+    cacheResults = True
 
     ############# Inputs ###############
     # Fields
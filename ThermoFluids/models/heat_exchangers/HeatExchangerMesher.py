@@ -9,6 +9,7 @@ import numpy as np
 import smo.math.util as sm
 
 from smo.util import AttributeDict 
+from smo.util.resources import warmResources
 from cStringIO import StringIO
         
 class HeatExchangerMesher():    
@@ -130,7 +131,8 @@ class HeatExchangerMesher():
         gmshScript = self.sMesh.getvalue()
         self.sMesh.close()
         #===== Generate the mesh =====#
-        self.mesh = FP.Gmsh2D(gmshScript)
+        # The script defines the geometry, so meshes are reused for the same script
+        self.mesh = warmResources.get('Gmsh2D', gmshScript, lambda: FP.Gmsh2D(gmshScript))
         
     def addCircle2D_gmsh(self, radius, cellSize, radialPosition = 0, angularPosition = 0, name = None):
         #:WARRANTY: sometimes this method doesn't work
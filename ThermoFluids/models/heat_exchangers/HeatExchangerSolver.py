@@ -2,6 +2,7 @@ import fipy as FP
 import numpy as np
 from smo.media.MaterialData import Solids
 from smo.math.util import Interpolator1D
+from smo.util.resources import warmResources
 from fipy.solvers.pysparse import LinearLUSolver
 from smo.flow.FrictionHeatExchange import FluidChannelSection, FluidChannel
 from smo.media.CoolProp.CoolProp import FluidState
@@ -16,9 +17,10 @@ import matplotlib.cm as cm
 class HeatExchangerSolver(object):
 	def __init__(self, heatExch, mesher):
 		self.blockMaterial= heatExch.blockProps.material
-		self.thermCondModel = Interpolator1D(
-			self.blockMaterial['thermalCond_T']['T'], 
-			self.blockMaterial['thermalCond_T']['cond'])
+		self.thermCondModel = warmResources.get('ThermalConductivity', self.blockMaterial['_key'], 
+			lambda: Interpolator1D(
+				self.blockMaterial['thermalCond_T']['T'], 
+				self.blockMaterial['thermalCond_T']['cond']))
 		# Solver settings
 		self.fvSolverSettings = heatExch.fvSolverSettings
 		self.linSolver = LinearLUSolver(tolerance = 1e-10)
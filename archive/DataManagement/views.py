@@ -1,5 +1,5 @@
 from django.shortcuts import render_to_response, RequestContext
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.core.urlresolvers import reverse
 from  SmoWeb.settings import MEDIA_ROOT, HDF_FOLDER
 import json
@@ -43,8 +43,12 @@ def hdfInterfaceView(request):
 			hdfIface.deleteItem(hdfNode["path"])
 		elif (action == "view"):
 			datasetPath = hdfNode["path"]
-			jsonContent = hdfIface.getDatasetContent(datasetPath)
-			return HttpResponse(jsonContent, content_type="application/json")
+			limit = int(postData["limit"]) if postData.get("limit") is not None else None
+			jsonContent = hdfIface.iterDatasetContent(datasetPath, 
+					offset = int(postData.get("offset", 0)), 
+					limit = limit, 
+					columns = postData.get("columns"))
+			return StreamingHttpResponse(jsonContent, content_type="application/json")
 		return HttpResponseRedirect(reverse('home'))
 	else:
 		return render_to_response('DataManagement/HdfInterface.html', 
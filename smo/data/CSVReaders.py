@@ -7,6 +7,107 @@ import csv
 import numpy as np
 import glob
 import os
+import itertools
+import StringIO
+
+class CSVBlockParser:
+    """
+    Parses CSV files in batches of rows. The encoding conversion and the decimal
+    separator replacement are done on the buffer of the whole batch, and purely 
+    numerical batches are parsed in a single call to np.fromstring. Other batches 
+    are split with the csv module and converted to the column types with numpy.
+    """
+    def __init__(self, dtype, columnIndices = None, delimiter = ',', decimalSeparator = '.', 
+                encoding = 'ascii', batchSize = 10000):
+        """
+        :param dtype: structured dtype of the result
+        :param columnIndices: index of the CSV column of each field of dtype
+            (default: the first len(dtype.names) columns)
+        """
+        self.dtype = np.dtype(dtype)
+        if (columnIndices is None):
+            columnIndices = range(len(self.dtype.names))
+        self.columnIndices = list(columnIndices)
+        self.delimiter = delimiter
+        self.decimalSeparator = decimalSeparator
+        self.encoding = encoding
+        self.batchSize = batchSize
+        self.isFloat = all(self.dtype[name].kind == 'f' for name in self.dtype.names)
+    
+    def preprocess(self, buf):
+        if (self.encoding != 'ascii'):
+            buf = buf.decode(self.encoding).encode('utf-8')
+        if (self.decimalSeparator != '.'):
+            buf = buf.replace(self.decimalSeparator, '.')
+        return buf
+    
+    def iterBatches(self, f):
+        """
+        Generator of structured arrays with the rows of the next batch of lines 
+        read from the file object f. Empty lines are skipped.
+        """
+        while True:
+            lines = list(itertools.islice(f, self.batchSize))
+            if (len(lines) == 0):
+                return
+            # Don't split a quoted value containing line breaks between batches
+            numQuotes = sum(line.count('"') for line in lines)
+            while (numQuotes % 2 == 1):
+                line = next(f, None)
+                if (line is None):
+                    break
+                lines.append(line)
+                numQuotes += line.count('"')
+            yield self.parseBatch(self.preprocess(''.join(lines)))
+    
+    def parseBatch(self, buf):
+        result = None
+        if (self.isFloat):
+            result = self.parseNumeric(buf)
+        if (result is None):
+            result = self.parseStrings(buf)
+        return result
+    
+    def parseNumeric(self, buf):
+        """
+        Fast path for rectangular tables of numbers. Returns None if the buffer
+        cannot be parsed in this way (quoted values, which may also contain line 
+        breaks, empty cells, empty lines, rows with different number of columns...)
+        """
+        buf = buf.replace('\r', '').strip('\n')
+        if (len(buf) == 0 or '\n\n' in buf or '"' in buf):
+            return None
+        lines = buf.split('\n')
+        numRows = len(lines)
+        numColumns = lines[0].count(self.delimiter) + 1
+        # Checking only the total count would let a missing and an extra value cancel out
+        if (not all(line.count(self.delimiter) == numColumns - 1 for line in lines)):
+            return None
+        values = np.fromstring(buf.replace('\n', self.delimiter), dtype = np.float64, sep = self.delimiter)
+        if (values.size != numRows * numColumns):
+            return None
+        values = values.reshape((numRows, numColumns))
+        result = np.empty((numRows,), dtype = self.dtype)
+        for name, columnIndex in zip(self.dtype.names, self.columnIndices):
+            result[name] = values[:, columnIndex]
+        return result
+    
+    def parseStrings(self, buf):
+        # Read from a file object, so that quoted values may contain line breaks
+        rows = [row for row in csv.reader(StringIO.StringIO(buf), delimiter = self.delimiter) if len(row) > 0]
+        result = np.empty((len(rows),), dtype = self.dtype)
+        if (len(rows) == 0):
+            return result
+        cells = np.array(rows)
+        if (cells.ndim != 2):
+            raise ValueError('The rows have different number of columns')
+        for name, columnIndex in zip(self.dtype.names, self.columnIndices):
+            column = cells[:, columnIndex]
+            if (self.dtype[name].kind in 'fiu'):
+                # Surrounding whitespace is accepted by float() and int(), but not by numpy
+                column = np.char.strip(column)
+            result[name] = column.astype(self.dtype[name])
+        return result
 
 class Table2DReader:
     def __init__(self, filePath):
@@ -64,31 +165,18 @@ class CSVReader:
             
     def read(self):
         f = open(self.filePath)
-        reader = csv.reader(f)
-        rowIndex = 0
-        numDataRows = 0
-        # determine the structure of the file (numDataRows, numCols, types)
-        for row in reader:
+        # Read the column names and skip to the first data row
+        for rowIndex, line in enumerate(f):
             if (rowIndex == self.headerRowIndex):
-                columnNames = row[:]
-                numColumns = len(row[:])
-            elif (rowIndex >= self.firstDataRowIndex):
-                if len(row[:]) > numColumns:
-                    numColumns = len(row[:])
-                numDataRows += 1
-            rowIndex += 1
+                columnNames = next(csv.reader([line]))
+            if (rowIndex + 1 >= self.firstDataRowIndex):
+                break
         #TODO derive column types from strings
         storageType = np.dtype([(columnName, np.float64) for columnName in columnNames])
-        self.data = np.empty(shape = (numDataRows), dtype = storageType)
-        
-        f.seek(0)
-        rowIndex = 0
-        for row in reader:
-            if (rowIndex >= self.firstDataRowIndex):
-                self.data[rowIndex - self.firstDataRowIndex] = tuple(float(x) for x in row)
-            rowIndex += 1
+        parser = CSVBlockParser(storageType)
+        self.data = np.concatenate(list(parser.iterBatches(f)) or [np.empty((0,), dtype = storageType)])
         f.close()
-        print("From input file '%s' read %d rows and %d columns"%(self.filePath, numDataRows, numColumns))
+        print("From input file '%s' read %d rows and %d columns"%(self.filePath, len(self.data), len(columnNames)))
         
     @staticmethod
     def test(filePath):
@@ -0,0 +1,177 @@
+'''
+Created on Oct 18, 2026
+
+Min/max preserving decimation of time series stored in HDF5 datasets
+'''
+import numpy as np
+
+class MinMaxDecimator(object):
+	"""
+	Decimates tabular time series (structured arrays or HDF5 compound datasets,
+	whose first column is the time) for plotting. The rows are split in buckets
+	and each bucket is represented by 2 rows holding, for every column, the minimum
+	and the maximum value of the bucket in their order of occurrence, so that the
+	peaks are preserved. The times of the 2 rows are the times of the first and
+	the last row of the bucket.
+
+	A pyramid of decimated levels can be stored next to a dataset, in the group
+	'<datasetName>_pyramid', with level k decimated from level k-1 (level 0 is the
+	dataset) using buckets of pyramidFactor rows.
+	"""
+	pyramidSuffix = '_pyramid'
+
+	def __init__(self, pyramidFactor = 16, minPyramidLevelSize = 1000, chunkSize = 2**20):
+		"""
+		:param pyramidFactor: bucket size used to compute each level of the pyramid
+			from the previous one
+		:param minPyramidLevelSize: no pyramid levels smaller than this are created
+		:param chunkSize: maximum number of rows read from a dataset at once
+		"""
+		self.pyramidFactor = pyramidFactor
+		self.minPyramidLevelSize = minPyramidLevelSize
+		self.chunkSize = chunkSize
+
+	@staticmethod
+	def decimate(data, bucketSize, columns = None):
+		"""
+		Decimates an array in memory
+		:param data: structured array, with time in the first of the columns
+		:param bucketSize: number of rows of a bucket
+		:param columns: columns to include in the result (default: all)
+		"""
+		if (columns is None):
+			columns = data.dtype.names
+		timeColumn = columns[0]
+		numRows = len(data)
+		numBuckets = (numRows + bucketSize - 1) // bucketSize
+		result = np.empty((2 * numBuckets,), dtype = [(name, data.dtype[name]) for name in columns])
+		if (numBuckets == 0):
+			return result
+		bucketRows = np.arange(numBuckets)
+		# Time of the first and last rows of the buckets
+		result[timeColumn][0::2] = data[timeColumn][bucketRows * bucketSize]
+		result[timeColumn][1::2] = data[timeColumn][np.minimum((bucketRows + 1) * bucketSize, numRows) - 1]
+		padding = numBuckets * bucketSize - numRows
+		for name in columns[1:]:
+			values = data[name]
+			if (padding > 0):
+				# Padding with the last value does not change the extrema
+				values = np.concatenate((values, np.repeat(values[-1:], padding)))
+			values = values.reshape((numBuckets, bucketSize))
+			minPos = np.argmin(values, axis = 1)
+			maxPos = np.argmax(values, axis = 1)
+			result[name][0::2] = values[bucketRows, np.minimum(minPos, maxPos)]
+			result[name][1::2] = values[bucketRows, np.maximum(minPos, maxPos)]
+		return result
+
+	def decimateDataset(self, dataset, start, stop, bucketSize, columns):
+		"""
+		Decimates the rows [start, stop) of a dataset, reading it in chunks
+		"""
+		chunkRows = max(1, self.chunkSize // bucketSize) * bucketSize
+		chunks = []
+		for chunkStart in range(start, stop, chunkRows):
+			data = self.readRows(dataset, chunkStart, min(stop, chunkStart + chunkRows), columns)
+			chunks.append(self.decimate(data, bucketSize, columns))
+		if (len(chunks) == 0):
+			return self.readRows(dataset, start, start, columns)
+		return np.concatenate(chunks)
+
+	@staticmethod
+	def readRows(dataset, start, stop, columns):
+		"""
+		Reads the selected columns of the rows [start, stop) as a structured array
+		"""
+		if (len(columns) == 1):
+			# h5py returns a plain array when a single field is selected
+			result = np.empty((stop - start,), dtype = [(columns[0], dataset.dtype[columns[0]])])
+			result[columns[0]] = dataset[columns[0], start:stop]
+			return result
+		return dataset[(slice(start, stop),) + tuple(columns)]
+
+	@staticmethod
+	def searchSorted(dataset, timeColumn, t, side = 'left'):
+		"""
+		Binary search in the (increasing) time column of a dataset, reading single values
+		"""
+		low = 0
+		high = len(dataset)
+		while (low < high):
+			middle = (low + high) // 2
+			value = dataset[timeColumn, middle]
+			if (value < t or (side == 'right' and value == t)):
+				low = middle + 1
+			else:
+				high = middle
+		return low
+
+	def getRowRange(self, dataset, timeColumn, tStart = None, tEnd = None):
+		start = 0 if tStart is None else self.searchSorted(dataset, timeColumn, tStart, 'left')
+		stop = len(dataset) if tEnd is None else self.searchSorted(dataset, timeColumn, tEnd, 'right')
+		return start, max(start, stop)
+
+	def buildPyramid(self, group, datasetName):
+		"""
+		Creates (or recreates) the pyramid of decimated levels of a dataset
+		"""
+		pyramidName = datasetName + self.pyramidSuffix
+		if (pyramidName in group):
+			del group[pyramidName]
+		dataset = group[datasetName]
+		columns = dataset.dtype.names
+		pyramid = group.create_group(pyramidName)
+		pyramid.attrs['factor'] = self.pyramidFactor
+		level = None
+		levelIndex = 1
+		while True:
+			numRows = len(dataset) if level is None else len(level)
+			if (2 * numRows // self.pyramidFactor < self.minPyramidLevelSize):
+				break
+			if (level is None):
+				level = self.decimateDataset(dataset, 0, numRows, self.pyramidFactor, columns)
+			else:
+				level = self.decimate(level, self.pyramidFactor)
+			pyramid.create_dataset('level%d'%levelIndex, data = level, compression = 'gzip')
+			levelIndex += 1
+		return pyramid
+
+	def load(self, group, datasetName, columns = None, targetPoints = None, tStart = None, tEnd = None):
+		"""
+		Reads the rows of a dataset within a time window, decimated to about targetPoints rows.
+		The coarsest pyramid level with enough resolution is used as source, if the
+		dataset has a pyramid.
+		:param columns: columns to read, the first one is the time (default: all)
+		:param targetPoints: maximum number of rows of the result (default: no decimation)
+		:param tStart: start of the time window (default: first row)
+		:param tEnd: end of the time window (default: last row)
+		:return: structured array
+		"""
+		dataset = group[datasetName]
+		if (columns is None):
+			columns = dataset.dtype.names
+		columns = [str(name) for name in columns]
+		timeColumn = columns[0]
+		start, stop = self.getRowRange(dataset, timeColumn, tStart, tEnd)
+		numRows = stop - start
+		if (targetPoints is None or numRows <= targetPoints):
+			return self.readRows(dataset, start, stop, columns)
+		source = dataset
+		pyramidName = datasetName + self.pyramidSuffix
+		if (pyramidName in group and numRows > 0):
+			pyramid = group[pyramidName]
+			factor = pyramid.attrs['factor']
+			levelIndex = 1
+			# Each row of level k represents (factor / 2)**k rows of the dataset
+			while ('level%d'%levelIndex in pyramid and
+					numRows / (factor / 2.) ** levelIndex >= targetPoints):
+				source = pyramid['level%d'%levelIndex]
+				levelIndex += 1
+			if (source is not dataset):
+				if (tStart is None):
+					tStart = dataset[timeColumn, start]
+				if (tEnd is None):
+					tEnd = dataset[timeColumn, stop - 1]
+				start, stop = self.getRowRange(source, timeColumn, tStart, tEnd)
+				numRows = stop - start
+		bucketSize = max(1, int(np.ceil(numRows / (targetPoints / 2.))))
+		return self.decimateDataset(source, start, stop, bucketSize, columns)
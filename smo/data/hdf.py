@@ -4,11 +4,182 @@ Created on Sep 28, 2014
 '''
 import os
 import csv
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 import h5py
 import numpy as np
 import json
-from decimal import Decimal
-from smo.data.util import DecimalEncoder
+from smo.data.CSVReaders import CSVBlockParser
+
+class HDFFilePool(object):
+	"""
+	Process-wide pool of open HDF5 files, which avoids reopening (and parsing the
+	metadata of) the same files on every request. Files are opened either read-only 
+	('r') or read-write ('a'); a read-write handle is also used for reading. 
+	A handle is reopened if the file has been modified (size or modification time) 
+	by someone else since it was last used. The least recently used idle handles are 
+	closed when there are more than maxOpenFiles, and idle handles are closed after
+	maxIdleTime seconds by a background thread. 
+	HDF5 (>= 1.10) locks open files across processes, so any open handle prevents 
+	other processes (e.g. celery workers) from writing the file, and a read-write 
+	handle prevents them from opening it at all. Therefore read-write handles are 
+	closed as soon as they are released, and files written by other processes must 
+	be released with keepOpen = False. 
+	Handles obtained with `acquire` must be given back with `release`, and must
+	not be closed by the user.
+	"""
+	class PooledFile(object):
+		def __init__(self, h5File, mode, signature):
+			self.h5File = h5File
+			self.mode = mode
+			self.signature = signature
+			self.refCount = 0
+			self.lastUsed = time.time()
+	
+	def __init__(self, maxOpenFiles = 16, maxIdleTime = 10.):
+		self.maxOpenFiles = maxOpenFiles
+		self.maxIdleTime = maxIdleTime
+		self.lock = threading.RLock()
+		self.entries = OrderedDict()
+		self.pid = os.getpid()
+		self.janitor = None
+	
+	@staticmethod
+	def getFileSignature(filePath):
+		try:
+			stat = os.stat(filePath)
+		except OSError:
+			return None
+		return (stat.st_size, stat.st_mtime)
+	
+	def acquire(self, filePath, mode = 'r'):
+		"""
+		Returns an open h5py.File
+		:param mode: 'r' (read-only, the file must exist) or 'a' (read-write, created if missing)
+		"""
+		if (mode not in ('r', 'a')):
+			raise ValueError("Invalid mode '{}', the file pool supports only 'r' and 'a'".format(mode))
+		key = os.path.realpath(filePath)
+		with self.lock:
+			self.checkProcess()
+			entry = self.entries.pop(key, None)
+			if (entry is not None and entry.refCount == 0):
+				if (entry.signature != self.getFileSignature(key) or (mode == 'a' and entry.mode == 'r')):
+					# The file changed or needs to be reopened for writing
+					self.closeEntry(entry)
+					entry = None
+			elif (entry is not None and mode == 'a' and entry.mode == 'r'):
+				self.entries[key] = entry
+				raise IOError('File "{}" is in use read-only and cannot be opened for writing'.format(filePath))
+			if (entry is None):
+				entry = HDFFilePool.PooledFile(h5py.File(key, mode), mode, None)
+				entry.signature = self.getFileSignature(key)
+			entry.refCount += 1
+			entry.lastUsed = time.time()
+			# Most recently used entries at the end
+			self.entries[key] = entry
+			self.evict()
+			return entry.h5File
+	
+	def release(self, h5File, keepOpen = True):
+		"""
+		Gives back a file obtained with `acquire`. When the file is no longer in use,
+		it is closed if it was opened for writing or keepOpen is False, so that other 
+		processes can write it. Otherwise the handle is kept open for reuse.
+		:param keepOpen: keep the idle read-only handle open
+		"""
+		with self.lock:
+			for key, entry in self.entries.items():
+				if (entry.h5File is h5File):
+					entry.refCount -= 1
+					entry.lastUsed = time.time()
+					if (entry.refCount == 0 and (entry.mode == 'a' or not keepOpen)):
+						del self.entries[key]
+						self.closeEntry(entry)
+					break
+			else:
+				raise ValueError('File {} does not belong to the pool'.format(h5File))
+			self.evict()
+			self.startJanitor()
+	
+	@contextmanager
+	def open(self, filePath, mode = 'r', keepOpen = True):
+		"""
+		Context manager acquiring and releasing a file from the pool
+		:param keepOpen: passed to `release`
+		"""
+		h5File = self.acquire(filePath, mode)
+		try:
+			yield h5File
+		finally:
+			self.release(h5File, keepOpen)
+	
+	def invalidate(self, filePath):
+		"""
+		Closes the handle to a file, if it is not in use
+		"""
+		key = os.path.realpath(filePath)
+		with self.lock:
+			entry = self.entries.get(key)
+			if (entry is not None and entry.refCount == 0):
+				del self.entries[key]
+				self.closeEntry(entry)
+	
+	def clear(self):
+		"""
+		Closes all the handles which are not in use
+		"""
+		with self.lock:
+			for key, entry in self.entries.items():
+				if (entry.refCount == 0):
+					del self.entries[key]
+					self.closeEntry(entry)
+	
+	def evict(self):
+		now = time.time()
+		numOpen = len(self.entries)
+		for key, entry in self.entries.items():
+			if (entry.refCount == 0 and 
+					(numOpen > self.maxOpenFiles or now - entry.lastUsed > self.maxIdleTime)):
+				del self.entries[key]
+				self.closeEntry(entry)
+				numOpen -= 1
+	
+	def startJanitor(self):
+		if (len(self.entries) > 0 and (self.janitor is None or not self.janitor.is_alive())):
+			self.janitor = threading.Thread(target = self.runJanitor, name = 'HDFFilePoolJanitor')
+			self.janitor.daemon = True
+			self.janitor.start()
+	
+	def runJanitor(self):
+		# Closes the idle handles, runs as long as there are open files
+		while True:
+			time.sleep(min(1., self.maxIdleTime / 2.))
+			with self.lock:
+				if (os.getpid() != self.pid):
+					return
+				self.evict()
+				if (len(self.entries) == 0):
+					self.janitor = None
+					return
+	
+	def checkProcess(self):
+		# Handles inherited from the parent process (fork) must not be used
+		if (os.getpid() != self.pid):
+			self.entries = OrderedDict()
+			self.pid = os.getpid()
+			self.janitor = None
+	
+	@staticmethod
+	def closeEntry(entry):
+		if (entry.h5File):
+			entry.h5File.close()
+
+""" Process-wide HDF5 file pool """
+hdfFilePool = HDFFilePool()
 
 class HDFInterface(object):
 	def __init__(self, filePath):
@@ -17,17 +188,18 @@ class HDFInterface(object):
 		
 	def getGroupContent(self, baseGroup, level = 0):
 		if (level == 0):
-			hdfFile = h5py.File(self.filePath)
-			baseGroup = hdfFile[baseGroup]
+			with hdfFilePool.open(self.filePath, 'r') as hdfFile:
+				return self.getItemsContent(hdfFile[baseGroup], level)
+		return self.getItemsContent(baseGroup, level)
+	
+	def getItemsContent(self, baseGroup, level):
 		resultDict = []
 		for name, item in baseGroup.iteritems():
 			if (isinstance(item, h5py.Dataset)):
 				resultDict.append({'type' : 'dataset', 'id' : hash(name), 'path' : item.name, 'name' : name, 'children' : []})
 			elif (isinstance(item, h5py.Group)):
-				children = self.getGroupContent(item, level + 1) 
+				children = self.getItemsContent(item, level + 1) 
 				resultDict.append({'type' : 'group', 'id' : hash(name), 'path' : item.name, 'name' : name, 'children' : children, 'level' : level})
-		if (level == 0):
-			hdfFile.close()
 		return resultDict
 	
 	def getFileContent(self, fileAsRoot = True):
@@ -36,46 +208,134 @@ class HDFInterface(object):
 			fileContent = {'type' : 'hdf_file', 'id' : hash(self.filePath), 'filePath' : self.filePath, 'path' : '/', 'name' : self.fileName, 'children' : fileContent}
 		return fileContent
 	
-	def getDatasetContent(self, datasetPath):
-		print self.filePath, datasetPath
-		hdfFile = h5py.File(self.filePath)
-		dataset = hdfFile[datasetPath]
-		
-		arr = np.zeros(dataset.shape, dtype=dataset.dtype)
-		columnNames = arr.dtype.names
-		columnNamesList = []
-		for columnName in columnNames:
-			columnNamesList.append({"name" :columnName})
-
-		dataset.read_direct(arr)
-		datalist = [list([Decimal(str(elem)) for elem in row]) for row in arr]
-		content = {"columns": columnNamesList, "data" : datalist}
-		jsonContent = json.dumps(content, cls=DecimalEncoder)
-		return jsonContent 
+	def getDatasetContent(self, datasetPath, offset = 0, limit = None, columns = None):
+		"""
+		Returns a JSON string with a range of rows of a dataset:
+		{"columns": [{"name": ...}, ...], "offset": ..., "numRows": ..., "data": [[...], ...]}
+		:param offset: index of the first row
+		:param limit: maximum number of rows (default: up to the last row)
+		:param columns: names of the columns to read (default: all)
+		"""
+		return ''.join(self.iterDatasetContent(datasetPath, offset, limit, columns))
+	
+	def iterDatasetContent(self, datasetPath, offset = 0, limit = None, columns = None, batchSize = 10000):
+		"""
+		Generator of the JSON content returned by `getDatasetContent` in pieces,
+		reading batchSize rows at a time. Can be used for streaming HTTP responses.
+		"""
+		hdfFile = hdfFilePool.acquire(self.filePath, 'r')
+		try:
+			dataset = hdfFile[datasetPath]
+			numRows = dataset.shape[0]
+			start = min(max(0, offset), numRows)
+			if (limit is None):
+				stop = numRows
+			else:
+				stop = min(numRows, start + max(0, limit))
+			columnNames, columnKeys = self.getDatasetColumns(dataset, columns)
+			header = {
+				'columns': [{'name': name} for name in columnNames], 
+				'offset': start, 
+				'numRows': numRows
+			}
+			yield json.dumps(header)[:-1] + ', "data": ['
+			for batchStart in range(start, stop, batchSize):
+				rows = self.readDatasetRows(dataset, batchStart, min(stop, batchStart + batchSize), columnKeys)
+				if (batchStart > start):
+					yield ', '
+				yield json.dumps(rows)[1:-1]
+			yield ']}'
+		finally:
+			hdfFilePool.release(hdfFile)
+	
+	@staticmethod
+	def getDatasetColumns(dataset, columns = None):
+		"""
+		Returns the names of the columns of a dataset and the keys used to read them:
+		the field names of compound datasets, the column indices of 2D datasets
+		and None for 1D datasets (single column 'value') 
+		"""
+		if (dataset.dtype.names is not None):
+			allNames = list(dataset.dtype.names)
+			allKeys = allNames
+		elif (len(dataset.shape) == 2):
+			allNames = [str(i) for i in range(dataset.shape[1])]
+			allKeys = range(dataset.shape[1])
+		else:
+			allNames = ['value']
+			allKeys = [None]
+		if (columns is None):
+			return allNames, allKeys
+		columnNames = [str(column) for column in columns]
+		for name in columnNames:
+			if (name not in allNames):
+				raise ValueError("Column '{}' not found in dataset {}".format(name, dataset.name))
+		return columnNames, [allKeys[allNames.index(name)] for name in columnNames]
+	
+	@staticmethod
+	def readDatasetRows(dataset, start, stop, columnKeys):
+		"""
+		Reads the rows [start, stop) of the selected columns (a hyperslab read) 
+		and returns them as a list of lists of python values
+		"""
+		if (dataset.dtype.names is not None):
+			# Read only the selected fields of the compound type
+			arr = dataset[(slice(start, stop),) + tuple(columnKeys)]
+			if (len(columnKeys) == 1):
+				columns = [arr]
+			else:
+				columns = [arr[key] for key in columnKeys]
+		elif (len(dataset.shape) == 2):
+			arr = dataset[start:stop, :][:, columnKeys]
+			columns = [arr[:, j] for j in range(arr.shape[1])]
+		else:
+			columns = [dataset[start:stop]]
+		columns = [HDFInterface.shortestFloat32(column) if column.dtype == np.float32 else column 
+				for column in columns]
+		return [list(row) for row in zip(*[column.tolist() for column in columns])]
+	
+	@staticmethod
+	def shortestFloat32(values):
+		"""
+		Converts float32 values to the floats with the fewest digits rounding to the
+		same float32 values, so that e.g. 0.1 is serialized as 0.1 and not as 
+		0.10000000149011612
+		"""
+		result = values.astype(np.float64)
+		remaining = np.flatnonzero(np.isfinite(values))
+		# 9 significant digits are always enough
+		for numDigits in range(6, 10):
+			if (len(remaining) == 0):
+				break
+			rounded = np.char.mod('%.{}g'.format(numDigits), result[remaining]).astype(np.float64)
+			exact = (rounded.astype(np.float32) == values[remaining])
+			result[remaining[exact]] = rounded[exact]
+			remaining = remaining[~exact]
+		return result
 		
 	def createGroup(self, groupPath, groupName):
-		hdfFile = h5py.File(self.filePath)
-		currentGroup = hdfFile[groupPath]
-		print currentGroup.name
-		currentGroup.create_group(groupName)
+		with hdfFilePool.open(self.filePath, 'a') as hdfFile:
+			currentGroup = hdfFile[groupPath]
+			print currentGroup.name
+			currentGroup.create_group(groupName)
 	
 	def deleteItem(self, itemPath):
-		hdfFile = h5py.File(self.filePath)
-		print itemPath
-		del hdfFile[itemPath]
+		with hdfFilePool.open(self.filePath, 'a') as hdfFile:
+			print itemPath
+			del hdfFile[itemPath]
 	
 	def copyItem(self, itemPath, pasteRoot, name):
-		hdfFile = h5py.File(self.filePath)
-		src = hdfFile[itemPath]
-		dest = hdfFile[pasteRoot]
-		hdfFile.copy(src, dest, name)
+		with hdfFilePool.open(self.filePath, 'a') as hdfFile:
+			src = hdfFile[itemPath]
+			dest = hdfFile[pasteRoot]
+			hdfFile.copy(src, dest, name)
 		
 	def moveItem(self, itemPath, pasteRoot, name):
-		hdfFile = h5py.File(self.filePath)
-		src = itemPath
-		dest = os.path.join(pasteRoot, name)
-		print src, dest
-		hdfFile.move(src, dest)
+		with hdfFilePool.open(self.filePath, 'a') as hdfFile:
+			src = itemPath
+			dest = os.path.join(pasteRoot, name)
+			print src, dest
+			hdfFile.move(src, dest)
 				
 	@staticmethod
 	def test():
@@ -88,7 +348,6 @@ class HDFInterface(object):
 	
 class CSV2HDFImporter(object):
 	typeDict = {'float' : 'f', 'integer' : 'i', 'string' : 'S100'}
-	typeCastFunc = {'float' : float, 'integer' : int, 'string' : str}
 	def __init__(self, filePath, firstDataRowIndex = 1):
 		self.filePath = filePath
 		self.csvFileName = os.path.splitext(os.path.basename(filePath))[0]
@@ -128,46 +387,55 @@ class CSV2HDFImporter(object):
 		return (self.numRows, numColumns, previewValues)
 	
 	def import2Hdf(self, filePath, groupPath, datasetName, columnProps, 
-				firstDataRow, forceOverride):
-		hdfFile = h5py.File(filePath)
-
-		group = hdfFile[groupPath]
-		if (datasetName in group):
-			if (forceOverride):
-				del group[datasetName]
-			else:
-				raise IOError('Dataset with name ' + datasetName + 
-							' already exists in ' + groupPath + 
-							"\nEither change the name or select 'Force override'")
-		# Define the size and type of the dataset
-		datasetNumRows = self.numRows - firstDataRow + 1
-		datasetTypeList = []
-		for colProp in columnProps:
-			if (colProp['use']):
-				datasetTypeList.append((str(colProp['name']), self.typeDict[colProp['dataType']]))
-		datasetType = np.dtype(datasetTypeList)
-
-		dataset = group.create_dataset(datasetName, 
-					shape = (datasetNumRows,), dtype = datasetType)
-		f = open(self.filePath, 'r')
-		rowPreprocessor = CSV2HDFImporter.RowPreprocessor(self)
-		reader = csv.reader(rowPreprocessor.preprocessRows(f), delimiter = self.columnDelimiter)		
-		rowIndex = 0
-		for row in reader:
-			rowIndex += 1
-			if (rowIndex < firstDataRow):
-				continue
-			columnIndex = 0
-			datasetRowValues = []
-			for data in row:
-				colProp = columnProps[columnIndex]
+				firstDataRow, forceOverride, batchSize = 10000):
+		"""
+		Imports the CSV file into a HDF5 dataset. The rows are parsed in batches 
+		of batchSize rows, and each batch is written to one chunk of the dataset.
+		"""
+		hdfFile = hdfFilePool.acquire(filePath, 'a')
+		try:
+			group = hdfFile[groupPath]
+			if (datasetName in group):
+				if (forceOverride):
+					del group[datasetName]
+				else:
+					raise IOError('Dataset with name ' + datasetName + 
+								' already exists in ' + groupPath + 
+								"\nEither change the name or select 'Force override'")
+			# Define the size and type of the dataset
+			datasetNumRows = self.numRows - firstDataRow + 1
+			datasetTypeList = []
+			columnIndices = []
+			for columnIndex, colProp in enumerate(columnProps):
 				if (colProp['use']):
-					datasetRowValues.append(self.typeCastFunc[colProp['dataType']](data))
-				columnIndex +=1
-			dataset[rowIndex - firstDataRow] = tuple(datasetRowValues)					
-		f.close()
-		
-		hdfFile.close()
+					datasetTypeList.append((str(colProp['name']), self.typeDict[colProp['dataType']]))
+					columnIndices.append(columnIndex)
+			datasetType = np.dtype(datasetTypeList)
+
+			chunkNumRows = max(1, min(batchSize, datasetNumRows))
+			dataset = group.create_dataset(datasetName, 
+						shape = (datasetNumRows,), maxshape = (None,), 
+						dtype = datasetType, chunks = (chunkNumRows,))
+			parser = CSVBlockParser(datasetType, columnIndices, 
+						delimiter = self.columnDelimiter, decimalSeparator = self.decimalSeparator,
+						encoding = self.fileEncoding, batchSize = chunkNumRows)
+			f = open(self.filePath, 'r')
+			# Skip the rows before the first data row
+			for _ in itertools.islice(f, firstDataRow - 1):
+				pass
+			numRowsWritten = 0
+			for batch in parser.iterBatches(f):
+				endRow = numRowsWritten + len(batch)
+				if (endRow > dataset.shape[0]):
+					dataset.resize((endRow,))
+				dataset[numRowsWritten : endRow] = batch
+				numRowsWritten = endRow
+			# Empty rows are skipped by the parser
+			if (numRowsWritten != dataset.shape[0]):
+				dataset.resize((numRowsWritten,))
+			f.close()
+		finally:
+			hdfFilePool.release(hdfFile)
 
 	@staticmethod
 	def test(filePath):
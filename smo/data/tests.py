@@ -0,0 +1,283 @@
+'''
+Created on Oct 18, 2026
+
+@author: Atanas Pavlov
+@copyright: SysMo Ltd, Bulgaria
+'''
+import os
+import json
+import shutil
+import tempfile
+import multiprocessing
+import StringIO
+import unittest
+import h5py
+import numpy as np
+from smo.data.hdf import HDFFilePool, HDFInterface
+from smo.data.decimation import MinMaxDecimator
+from smo.data.CSVReaders import CSVBlockParser
+import smo.data.hdf
+
+"""
+======================================
+hdf.py
+======================================
+"""
+
+def writeDataset(filePath, name):
+	# Runs in another process
+	h5File = h5py.File(filePath, 'a')
+	h5File.create_dataset(name, data = np.arange(10.))
+	h5File.close()
+
+def runInProcess(target, *args):
+	process = multiprocessing.Process(target = target, args = args)
+	process.start()
+	process.join()
+	return process.exitcode
+
+class TestHDFFilePool(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		self.filePath = os.path.join(self.tempDir, 'test.h5')
+		h5File = h5py.File(self.filePath, 'w')
+		h5File.create_group('group1/group2')
+		h5File.create_dataset('group1/data', data = np.arange(5.))
+		h5File.close()
+		self.pool = HDFFilePool()
+
+	def tearDown(self):
+		self.pool.clear()
+		shutil.rmtree(self.tempDir)
+
+	def getEntry(self):
+		return self.pool.entries.get(os.path.realpath(self.filePath))
+
+	def testReuseReadHandle(self):
+		h5File = self.pool.acquire(self.filePath, 'r')
+		self.pool.release(h5File)
+		self.assertEqual(self.getEntry().refCount, 0)
+		self.assertIs(self.pool.acquire(self.filePath, 'r'), h5File)
+		self.pool.release(h5File)
+
+	def testReleaseClosesHandle(self):
+		with self.pool.open(self.filePath, 'r', keepOpen = False) as h5File:
+			with self.pool.open(self.filePath, 'r', keepOpen = False):
+				pass
+			# Still in use
+			self.assertTrue(h5File)
+		self.assertFalse(h5File)
+		self.assertIsNone(self.getEntry())
+
+	def testWriteHandleClosed(self):
+		with self.pool.open(self.filePath, 'a') as h5File:
+			h5File.create_dataset('written', data = np.arange(3.))
+		self.assertFalse(h5File)
+		self.assertIsNone(self.getEntry())
+		with self.pool.open(self.filePath, 'r') as h5File:
+			np.testing.assert_array_equal(h5File['written'][...], np.arange(3.))
+
+	def testWriteWhileInUseReadOnly(self):
+		with self.pool.open(self.filePath, 'r'):
+			self.assertRaises(IOError, self.pool.acquire, self.filePath, 'a')
+
+	def testReleaseForeignFile(self):
+		h5File = h5py.File(self.filePath, 'r')
+		try:
+			self.assertRaises(ValueError, self.pool.release, h5File)
+		finally:
+			h5File.close()
+
+	def testOtherProcessWrites(self):
+		# Another process (e.g. a celery worker) can write the file after it
+		# has been released with keepOpen = False
+		h5File = self.pool.acquire(self.filePath, 'a')
+		self.pool.release(h5File)
+		self.assertEqual(runInProcess(writeDataset, self.filePath, 'fromWriter'), 0)
+		h5File = self.pool.acquire(self.filePath, 'r')
+		self.pool.release(h5File, keepOpen = False)
+		self.assertEqual(runInProcess(writeDataset, self.filePath, 'fromWriter2'), 0)
+		with self.pool.open(self.filePath, 'r', keepOpen = False) as h5File:
+			self.assertIn('fromWriter', h5File)
+			self.assertIn('fromWriter2', h5File)
+
+	def testGroupContent(self):
+		smo.data.hdf.hdfFilePool.clear()
+		interface = HDFInterface(self.filePath)
+		content = interface.getGroupContent('/')
+		self.assertEqual([item['name'] for item in content], ['group1'])
+		self.assertEqual(sorted(item['name'] for item in content[0]['children']), ['data', 'group2'])
+		self.assertEqual(content[0]['level'], 0)
+		# The handle is released also if the group doesn't exist
+		self.assertRaises(KeyError, interface.getGroupContent, '/missing')
+		for entry in smo.data.hdf.hdfFilePool.entries.values():
+			self.assertEqual(entry.refCount, 0)
+		smo.data.hdf.hdfFilePool.clear()
+
+class TestDatasetContent(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		self.filePath = os.path.join(self.tempDir, 'test.h5')
+		h5File = h5py.File(self.filePath, 'w')
+		data = np.zeros((3,), dtype = [('t', np.float64), ('x', np.float32), ('n', np.int32)])
+		data['t'] = [0.1, 0.2, 0.3]
+		data['x'] = [0.1, 1e-8, 16777217]
+		data['n'] = [1, 2, 3]
+		h5File.create_dataset('compound', data = data)
+		h5File.create_dataset('plain', data = np.array([[0.1, 2.5], [1./3, -7.]], dtype = np.float32))
+		h5File.close()
+		self.interface = HDFInterface(self.filePath)
+
+	def tearDown(self):
+		smo.data.hdf.hdfFilePool.clear()
+		shutil.rmtree(self.tempDir)
+
+	def testFloat32Values(self):
+		content = json.loads(self.interface.getDatasetContent('compound'))
+		self.assertEqual(content['data'], [[0.1, 0.1, 1], [0.2, 1e-8, 2], [0.3, 16777216., 3]])
+		self.assertIn('[0.1, 0.1, 1]', self.interface.getDatasetContent('compound'))
+		content = json.loads(self.interface.getDatasetContent('compound', columns = ['x']))
+		self.assertEqual(content['data'], [[0.1], [1e-8], [16777216.]])
+		content = json.loads(self.interface.getDatasetContent('plain', offset = 1, columns = [1, 0]))
+		self.assertEqual(content['data'], [[-7., 0.33333334]])
+
+	def testShortestFloat32(self):
+		values = np.random.RandomState(0).normal(size = 1000).astype(np.float32)
+		values[:3] = [np.nan, np.inf, 3.4e38]
+		result = HDFInterface.shortestFloat32(values)
+		self.assertEqual(result.dtype, np.float64)
+		np.testing.assert_array_equal(result.astype(np.float32), values)
+		for value in result[2:].tolist():
+			# At most 9 significant digits
+			mantissa = repr(value).split('e')[0].lstrip('-').replace('.', '').strip('0')
+			self.assertLessEqual(len(mantissa), 9)
+
+"""
+======================================
+decimation.py
+======================================
+"""
+
+def makeSeries(numRows):
+	data = np.zeros((numRows,), dtype = [('t', np.float64), ('x', np.float32), ('y', np.float64)])
+	data['t'] = np.arange(numRows) * 0.5
+	data['x'] = np.sin(np.arange(numRows) * 0.01)
+	data['y'] = np.random.RandomState(0).normal(size = numRows)
+	return data
+
+class TestMinMaxDecimator(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		self.h5File = h5py.File(os.path.join(self.tempDir, 'test.h5'), 'w')
+		self.data = makeSeries(100003)
+		self.h5File.create_dataset('series', data = self.data)
+
+	def tearDown(self):
+		self.h5File.close()
+		shutil.rmtree(self.tempDir)
+
+	def testDecimate(self):
+		data = self.data[:1003]
+		result = MinMaxDecimator.decimate(data, 10)
+		self.assertEqual(len(result), 2 * 101)
+		for k in range(101):
+			bucket = data[10 * k : 10 * (k + 1)]
+			self.assertEqual(result['t'][2 * k], bucket['t'][0])
+			self.assertEqual(result['t'][2 * k + 1], bucket['t'][-1])
+			for name in ('x', 'y'):
+				values = bucket[name]
+				self.assertEqual(sorted(result[name][2 * k : 2 * k + 2]), [values.min(), values.max()])
+				# Extrema in their order of occurrence
+				first = min(np.argmin(values), np.argmax(values))
+				self.assertEqual(result[name][2 * k], values[first])
+
+	def testDecimateEmpty(self):
+		result = MinMaxDecimator.decimate(self.data[:0], 10, ['t', 'y'])
+		self.assertEqual(len(result), 0)
+		self.assertEqual(result.dtype.names, ('t', 'y'))
+
+	def testLoadWithoutDecimation(self):
+		result = MinMaxDecimator().load(self.h5File, 'series', columns = ['t', 'y'], 
+			targetPoints = 200000)
+		np.testing.assert_array_equal(result['y'], self.data['y'])
+
+	def testLoadPreservesExtrema(self):
+		decimator = MinMaxDecimator()
+		decimator.buildPyramid(self.h5File, 'series')
+		self.assertIn('series_pyramid/level1', self.h5File)
+		for targetPoints in [100, 1000, 4000]:
+			result = decimator.load(self.h5File, 'series', columns = ['t', 'y'], targetPoints = targetPoints)
+			self.assertLessEqual(len(result), targetPoints)
+			self.assertGreater(len(result), targetPoints / 4)
+			self.assertEqual(result['y'].max(), self.data['y'].max())
+			self.assertEqual(result['y'].min(), self.data['y'].min())
+			self.assertTrue(np.all(np.diff(result['t']) >= 0))
+
+	def testLoadTimeWindow(self):
+		decimator = MinMaxDecimator()
+		decimator.buildPyramid(self.h5File, 'series')
+		tStart, tEnd = 10000.3, 12000.
+		window = self.data[(self.data['t'] >= tStart) & (self.data['t'] <= tEnd)]
+		result = decimator.load(self.h5File, 'series', columns = ['t', 'x'], 
+			targetPoints = 500, tStart = tStart, tEnd = tEnd)
+		self.assertLessEqual(len(result), 500)
+		self.assertEqual(result['x'].max(), window['x'].max())
+		self.assertEqual(result['x'].min(), window['x'].min())
+		# The rows of the coarse levels may extend up to a bucket outside the window
+		bucketTime = 0.5 * decimator.pyramidFactor
+		self.assertTrue(result['t'][0] >= tStart - bucketTime and result['t'][-1] <= tEnd + bucketTime)
+		# Small window: the rows are returned as they are
+		result = decimator.load(self.h5File, 'series', targetPoints = 500, tStart = 10., tEnd = 20.)
+		np.testing.assert_array_equal(result, self.data[20:41])
+
+"""
+======================================
+CSVReaders.py
+======================================
+"""
+
+def parseAll(parser, text):
+	batches = list(parser.iterBatches(StringIO.StringIO(text)))
+	return batches, np.concatenate(batches)
+
+class TestCSVBlockParser(unittest.TestCase):
+	def testNumeric(self):
+		parser = CSVBlockParser([('a', np.float64), ('c', np.float32)], columnIndices = [0, 2], 
+				delimiter = ';', decimalSeparator = ',', batchSize = 2)
+		batches, result = parseAll(parser, '1,5;2;3,25\r\n4;5;6\r\n-7e-3;8;9\r\n')
+		self.assertEqual([len(batch) for batch in batches], [2, 1])
+		np.testing.assert_array_equal(result['a'], [1.5, 4., -7e-3])
+		np.testing.assert_array_equal(result['c'], [3.25, 6., 9.])
+	
+	def testMixedTypes(self):
+		parser = CSVBlockParser([('name', 'S10'), ('n', np.int32), ('x', np.float64)])
+		_, result = parseAll(parser, 'abc, 1, 2.5\n"d,e",2,3\n')
+		self.assertEqual(result['name'].tolist(), ['abc', 'd,e'])
+		self.assertEqual(result['n'].tolist(), [1, 2])
+		self.assertEqual(result['x'].tolist(), [2.5, 3.])
+	
+	def testEmptyLines(self):
+		parser = CSVBlockParser([('a', np.float64), ('b', np.float64)])
+		_, result = parseAll(parser, '1,2\n\n3,4\n')
+		self.assertEqual(result['b'].tolist(), [2., 4.])
+	
+	def testQuotedLineBreakBetweenBatches(self):
+		parser = CSVBlockParser([('x', np.float64), ('text', 'S20')], batchSize = 2)
+		batches, result = parseAll(parser, '1,a\n2,"first\nsecond"\n3,b\n4,c\n')
+		self.assertEqual([len(batch) for batch in batches], [2, 2])
+		self.assertEqual(result['text'].tolist(), ['a', 'first\nsecond', 'b', 'c'])
+		self.assertEqual(result['x'].tolist(), [1., 2., 3., 4.])
+	
+	def testDifferentNumberOfColumns(self):
+		parser = CSVBlockParser([('a', np.float64), ('b', np.float64)])
+		# The missing and the extra value must not cancel out
+		self.assertRaises(ValueError, parseAll, parser, '1,2,3\n4\n')
+		self.assertRaises(ValueError, parseAll, parser, '1,2\n3\n')
+	
+	def testEncoding(self):
+		parser = CSVBlockParser([('unit', 'S10'), ('x', np.float64)], encoding = 'latin-1')
+		_, result = parseAll(parser, '\xb0C,1\nK,2\n')
+		self.assertEqual(result['unit'].tolist(), ['\xc2\xb0C', 'K'])
+
+if __name__ == '__main__':
+	unittest.main()
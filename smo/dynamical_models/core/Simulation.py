@@ -11,6 +11,8 @@ from assimulo.solvers import CVode
 from assimulo.problem import Explicit_Problem
 from smo.util import AttributeDict
 from smo.data.util import genTimestampUUID
+from smo.data.hdf import hdfFilePool
+from smo.data.decimation import MinMaxDecimator
 
 class TimeEvent(object):
 	def __init__(self, t, eventType, description = None):
@@ -26,10 +28,10 @@ class ResultStorage(object):
 		Writes and reads simulation results from HDF file
 		"""
 		self.filePath = filePath
-		self.h5File = h5py.File(filePath, 'a')
 		self.datasetPath = datasetPath
 	
 	def initializeWriting(self, varList, chunkSize):
+		self.h5File = hdfFilePool.acquire(self.filePath, 'a')
 		# Size of result chunks
 		self.chunkSize = int(chunkSize)
 		# Create the group for the result if not present
@@ -76,14 +78,17 @@ class ResultStorage(object):
 		del self.h5File[self.datasetPath][self.simulationName + '_raw']
 		# Assign the new dataset to the data variable 
 		self.data = self.h5File[self.datasetPath][self.simulationName]
-		self.h5File.flush()
-		self.h5File.close()
+		# Store the decimated levels used for plotting long results
+		MinMaxDecimator().buildPyramid(self.h5File[self.datasetPath], self.simulationName)
+		self.closeStorage()
 	
 	def openStorage(self):
-		self.h5File = h5py.File(self.filePath, 'r')
+		self.h5File = hdfFilePool.acquire(self.filePath, 'r')
 	
 	def closeStorage(self):
-		self.h5File.close()
+		# Closes the file, so that the results can be read (and the next
+		# simulation written) by other processes
+		hdfFilePool.release(self.h5File, keepOpen = False)
 	
 	def loadResult(self):
 		return self.h5File[self.datasetPath][self.simulationName]
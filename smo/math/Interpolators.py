@@ -1,116 +1,101 @@
 import numpy as np
 
 class Interpolator2D:
+	"""
+	Bilinear interpolator over a rectilinear (x, y) grid. The values are 
+	given as zData[yIndex][xIndex]. Several tables sharing the same grid can be 
+	interpolated in a single pass, by giving zData with shape (ny, nx, nTables) 
+	(see also `fromTables`); the result then has shape (N, nTables).
+	Evaluation is vectorized: the grid cells for all the input points are 
+	located at once and the values are blended with array operations.
+	"""
 	BOUNDARY_ERROR = 0
 	BOUNDARY_CONSTANT = 1
 	BOUNDARY_LINEAR = 2
 	
 	def __init__(self, xData, yData, zData, interp_type = BOUNDARY_LINEAR):
-		self.xData = xData
-		self.yData = yData
-		self.zData = zData
+		self.xData = np.asarray(xData, dtype = np.float64)
+		self.yData = np.asarray(yData, dtype = np.float64)
+		self.zData = np.asarray(zData, dtype = np.float64)
+		if (self.zData.ndim not in (2, 3) or self.zData.shape[:2] != (len(self.yData), len(self.xData))):
+			raise ValueError("The shape of zData {} doesn't match the grid size (ny = {}, nx = {})".format(
+				self.zData.shape, len(self.yData), len(self.xData)))
 		self.xMin = np.min(self.xData)
 		self.xMax = np.max(self.xData)
 		self.yMin = np.min(self.yData)
 		self.yMax = np.max(self.yData)
 		
-		if (interp_type == self.BOUNDARY_ERROR):
-			self.fInterpFunction = self.__interpFunction_BoundaryError
-		elif (interp_type == self.BOUNDARY_CONSTANT):
-			self.fInterpFunction = self.__interpFunction_BoundaryConstant
-		elif (interp_type == self.BOUNDARY_LINEAR):
-			self.fInterpFunction =  self.__interpFunction_BoundaryLinear
-		else:
+		if (interp_type not in (self.BOUNDARY_ERROR, self.BOUNDARY_CONSTANT, self.BOUNDARY_LINEAR)):
 			raise ValueError("Invalid value '%d' for the interpolation type. The valid value are " 
 				"{0-BOUNDARY_ERROR, 1-BOUNDARY_CONSTANT, 2-BOUNDARY_LINEAR}."%(interp_type))
-		
-	def __call__(self, xIn, yIn):		
-		return map(self.fInterpFunction, xIn, yIn)
-		
-	def __interpFunction_BoundaryError(self, x, y):
-		if (x < self.xMin or x > self.xMax or y < self.yMin or y > self.yMax):
-			raise ValueError("Input data (%e, %e) out of the interpolator range"%(x, y))
-		
-		xNextIndex = np.searchsorted(self.xData, x)		
-		if (xNextIndex == 0):
-			xPrevIndex = 0
-			xCoeff = 0
-		else:
-			xPrevIndex = xNextIndex-1
-			xCoeff = (x-self.xData[xPrevIndex])/(self.xData[xNextIndex]-self.xData[xPrevIndex])
-		
-		yNextIndex = np.searchsorted(self.yData, y)
-		if (yNextIndex == 0):
-			yPrevIndex = 0
-			yCoeff = 0
-		else:
-			yPrevIndex = yNextIndex-1
-			yCoeff = (y-self.yData[yPrevIndex])/(self.yData[yNextIndex]-self.yData[yPrevIndex])
-		
-		value1 = self.zData[yPrevIndex][xPrevIndex] + xCoeff*(self.zData[yPrevIndex][xNextIndex]-self.zData[yPrevIndex][xPrevIndex])
-		value2 = self.zData[yNextIndex][xPrevIndex] + xCoeff*(self.zData[yNextIndex][xNextIndex]-self.zData[yNextIndex][xPrevIndex])
-		interpValue = value1 + yCoeff*(value2 - value1)
-		return interpValue 	
-
-	def __interpFunction_BoundaryLinear(self, x, y):	
-		xNextIndex = np.searchsorted(self.xData, x)	
-		if (xNextIndex == 0):
-			xPrevIndex = 0
-			xNextIndex = 1
-		elif (xNextIndex >= len(self.xData)):
-			xNextIndex = xNextIndex - 1
-			xPrevIndex = xNextIndex - 1
-		else:
-			xPrevIndex = xNextIndex-1
-		xCoeff = (x-self.xData[xPrevIndex])/(self.xData[xNextIndex]-self.xData[xPrevIndex])
-		
-		yNextIndex = np.searchsorted(self.yData, y)
-		if (yNextIndex == 0):
-			yPrevIndex = 0
-			yNextIndex = 1
-		elif (yNextIndex >= len(self.yData)):
-			yNextIndex = yNextIndex - 1
-			yPrevIndex = yNextIndex - 1
-		else:
-			yPrevIndex = yNextIndex-1
-		yCoeff = (y-self.yData[yPrevIndex])/(self.yData[yNextIndex]-self.yData[yPrevIndex])
-		
-		value1 = self.zData[yPrevIndex][xPrevIndex] + xCoeff*(self.zData[yPrevIndex][xNextIndex]-self.zData[yPrevIndex][xPrevIndex])
-		value2 = self.zData[yNextIndex][xPrevIndex] + xCoeff*(self.zData[yNextIndex][xNextIndex]-self.zData[yNextIndex][xPrevIndex])
-		interpValue = value1 + yCoeff*(value2 - value1)
-		return interpValue
+		self.interp_type = interp_type
 	
-	def __interpFunction_BoundaryConstant(self, x, y):
-		xNextIndex = np.searchsorted(self.xData, x)	
-		if (xNextIndex == 0):
-			xNextIndex = 0
-			xPrevIndex = xNextIndex
-			xCoeff = 0
-		elif (xNextIndex >= len(self.xData)):
-			xNextIndex = xNextIndex - 1
-			xPrevIndex = xNextIndex
-			xCoeff = 0
-		else:
-			xPrevIndex = xNextIndex-1
-			xCoeff = (x-self.xData[xPrevIndex])/(self.xData[xNextIndex]-self.xData[xPrevIndex])
+	@staticmethod
+	def fromTables(xData, yData, zTables, interp_type = BOUNDARY_LINEAR):
+		"""
+		Creates an interpolator for several tables zTables[k][yIndex][xIndex] 
+		sharing the same grid
+		"""
+		zData = np.empty(shape = (len(yData), len(xData), len(zTables)), dtype = np.float64)
+		for k, zTable in enumerate(zTables):
+			zData[..., k] = zTable
+		return Interpolator2D(xData, yData, zData, interp_type)
 		
-		yNextIndex = np.searchsorted(self.yData, y)
-		if (yNextIndex == 0):
-			yNextIndex = 0
-			yPrevIndex = yNextIndex
-			yCoeff = 0
-		elif (yNextIndex >= len(self.yData)):
-			yNextIndex = yNextIndex - 1
-			yPrevIndex = yNextIndex
-			yCoeff = 0
+	def __call__(self, xIn, yIn):
+		xIn = np.asarray(xIn, dtype = np.float64)
+		yIn = np.asarray(yIn, dtype = np.float64)
+		if (self.interp_type == self.BOUNDARY_ERROR):
+			outOfRange = (xIn < self.xMin) | (xIn > self.xMax) | (yIn < self.yMin) | (yIn > self.yMax)
+			if (np.any(outOfRange)):
+				i = np.flatnonzero(outOfRange)[0]
+				raise ValueError("Input data (%e, %e) out of the interpolator range"%(xIn[i], yIn[i]))
+		cells = self.locateCells(xIn, yIn)
+		return self.interpolateCells(cells)
+	
+	def locateCells(self, xIn, yIn):
+		"""
+		Finds the grid cells and the blending coefficients for the input points
+		:return: tuple (xPrevIndex, xNextIndex, xCoeff, yPrevIndex, yNextIndex, yCoeff)
+		"""
+		xPrevIndex, xNextIndex, xCoeff = self._locate1D(self.xData, xIn)
+		yPrevIndex, yNextIndex, yCoeff = self._locate1D(self.yData, yIn)
+		return (xPrevIndex, xNextIndex, xCoeff, yPrevIndex, yNextIndex, yCoeff)
+	
+	def interpolateCells(self, cells, zData = None):
+		"""
+		Blends the values at the corners of the cells found by `locateCells`
+		"""
+		if (zData is None):
+			zData = self.zData
+		xPrevIndex, xNextIndex, xCoeff, yPrevIndex, yNextIndex, yCoeff = cells
+		if (zData.ndim == 3):
+			# Broadcast the coefficients over the tables
+			xCoeff = xCoeff[..., np.newaxis]
+			yCoeff = yCoeff[..., np.newaxis]
+		zPrevPrev = zData[yPrevIndex, xPrevIndex]
+		zNextPrev = zData[yNextIndex, xPrevIndex]
+		value1 = zPrevPrev + xCoeff * (zData[yPrevIndex, xNextIndex] - zPrevPrev)
+		value2 = zNextPrev + xCoeff * (zData[yNextIndex, xNextIndex] - zNextPrev)
+		return value1 + yCoeff * (value2 - value1)
+	
+	def _locate1D(self, data, values):
+		numData = len(data)
+		nextIndex = np.searchsorted(data, values)
+		if (self.interp_type == self.BOUNDARY_LINEAR):
+			# Extrapolate using the first and last grid intervals
+			nextIndex = np.clip(nextIndex, 1, numData - 1)
+			prevIndex = nextIndex - 1
+			coeff = (values - data[prevIndex]) / (data[nextIndex] - data[prevIndex])
 		else:
-			yPrevIndex = yNextIndex-1
-			yCoeff = (y-self.yData[yPrevIndex])/(self.yData[yNextIndex]-self.yData[yPrevIndex])
-		
-		value1 = self.zData[yPrevIndex][xPrevIndex] + xCoeff*(self.zData[yPrevIndex][xNextIndex]-self.zData[yPrevIndex][xPrevIndex])
-		value2 = self.zData[yNextIndex][xPrevIndex] + xCoeff*(self.zData[yNextIndex][xNextIndex]-self.zData[yNextIndex][xPrevIndex])
-		interpValue = value1 + yCoeff*(value2 - value1)
-		return interpValue
+			# Outside of the grid (or at the first point) use the boundary value
+			atBoundary = (nextIndex == 0) | (nextIndex >= numData)
+			nextIndex = np.minimum(nextIndex, numData - 1)
+			prevIndex = np.where(atBoundary, nextIndex, nextIndex - 1)
+			coeff = np.zeros(np.shape(values), dtype = np.float64)
+			inside = ~atBoundary
+			coeff[inside] = (values[inside] - data[prevIndex[inside]]) / \
+				(data[nextIndex[inside]] - data[prevIndex[inside]])
+		return prevIndex, nextIndex, coeff
 
 	@staticmethod
 	def test():
@@ -1,5 +1,7 @@
 import numpy as np
 import struct
+import os
+import json
 from smo.util.log import SimpleAppLoggerConfgigurator
 import mmap
 import logging
@@ -7,6 +9,9 @@ import logging
 appLogger = logging.getLogger('AppLogger.AMRFileReader')
 
 class ChannelInfo(object):
+	""" Encoding of the channel names and units in the AMR files """
+	encoding = 'latin-1'
+	
 	def __init__(self, name, group, number, unit, start, length):
 		self.name = name
 		self.group = group
@@ -18,16 +23,57 @@ class ChannelInfo(object):
 	
 	def __str__(self):
 		return "{}(group = {}, # = {}, unit = {}, start = {}, end = {}, length = {})".format(self.name, self.group, self.number, self.unit, self.start, self.end, self.length)
+	
+	def toDict(self):
+		# The names and units are byte strings, which may contain non-ASCII characters (e.g. '\xb0C')
+		return {'name': self.name.decode(self.encoding), 'group': self.group, 'number': self.number, 
+			'unit': self.unit.decode(self.encoding), 'start': self.start, 'length': self.length, 
+			'computed': self.computed}
+	
+	@staticmethod
+	def fromDict(d):
+		chInfo = ChannelInfo(name = d['name'].encode(ChannelInfo.encoding), group = d['group'], 
+			number = d['number'], unit = d['unit'].encode(ChannelInfo.encoding), 
+			start = d['start'], length = d['length'])
+		chInfo.computed = d['computed']
+		return chInfo
+
+class ChannelTable(object):
+	"""
+	Table of channels sharing the same time base. The data is stored in a
+	Fortran ordered 2D array, so that each column is contiguous in memory.
+	"""
+	def __init__(self, names, data):
+		self.names = names
+		self.data = data
+		self.columnIndex = {name: i for i, name in enumerate(names)}
+	
+	def __getitem__(self, name):
+		return self.data[:, self.columnIndex[name]]
+	
+	def __len__(self):
+		return self.data.shape[0]
 
 class AMRFileReader(object):
+	""" Suffix of the sidecar file caching the channel directory of an AMR file """
+	channelCacheSuffix = '.channels.json'
+	""" Record structure of the channel data """
+	channelDType = np.dtype([('time', np.uint32), ('value', '<f8'), ('f3', np.uint16), ('f4', np.uint16)])
+	
 	def openFile(self, filePath, offset = 0):
 		self.filePath = filePath
-		f = open(filePath, 'rb')
+		self.channelDirectory = None
+		with open(filePath, 'rb') as f:
+			self.fh = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
 		appLogger.info('AMRFileReader: Opened file "{}" for reading'.format(filePath))
-		self.fh = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
 		self.fh.seek(offset, 0)
 	
-	def __del__(self):
+	def close(self):
+		"""
+		Closes the memory map of the file. The arrays returned by `getChannelData` 
+		and `readChannels` are views of the map, and must not be used after closing. 
+		Without calling close the map is released together with its last view.
+		"""
 		self.fh.close()
 	
 	def checkEOF(self):
@@ -44,13 +90,11 @@ class AMRFileReader(object):
 		return isEOF
 	
 	def readUntilDelimiter(self, delim):
-		result = ''
-		while True:
-			c = self.fh.read(1)
-			result += c
-			if (c == delim):
-				break
-		return result
+		pos = self.fh.tell()
+		end = self.fh.find(delim, pos)
+		if (end == -1):
+			raise ValueError('Delimiter {} not found after position {}'.format(self.toHexString(delim), pos))
+		return self.fh.read(end - pos + 1)
 
 	def readString(self):
 		l, = struct.unpack('B', self.fh.read(1))
@@ -110,11 +154,94 @@ class AMRFileReader(object):
 		return chInfo
 
 	def getChannelData(self, chInfo):
-		dtype = np.dtype([('time', np.uint32), ('value', '<f8'), ('f3', np.uint16), ('f4', np.uint16)])
-		arr = np.frombuffer(buffer(self.fh[chInfo.start: chInfo.start + 16 * chInfo.length]), dtype=dtype)
-		return arr
+		"""
+		Returns the channel records as a read-only view of the memory map (no copy)
+		"""
+		return np.frombuffer(self.fh, dtype = self.channelDType, count = chInfo.length, offset = chInfo.start)
+	
+	def readChannels(self, channels):
+		"""
+		Reads several channels using a single lookup in the channel directory
+		:param channels: list of (channelName, channelUnit) tuples
+		:return: list of read-only record arrays (views of the memory map), in the order of `channels`
+		"""
+		chInfos = [self.findChannel(channelName, channelUnit) for channelName, channelUnit in channels]
+		return [self.getChannelData(chInfo) for chInfo in chInfos]
 	
 	def findChannel(self, channelName, channelUnit):
+		try:
+			directory = self.getChannelDirectory()
+		except Exception as e:
+			appLogger.warning('Failed building the channel directory ({}), searching the channel in the file'.format(e))
+			return self.searchChannel(channelName, channelUnit)
+		try:
+			return directory[(channelName, channelUnit)]
+		except KeyError:
+			raise ValueError("Channel {}(unit = {}) not found".format(channelName, channelUnit))
+	
+	def getChannelDirectory(self, useCache = True):
+		"""
+		Returns a dictionary of the channels, indexed by (channelName, channelUnit).
+		The channel list is read in a single pass over the file and is kept in a
+		sidecar file next to the AMR file, which is valid as long as the size and the 
+		modification time of the AMR file do not change.
+		:param useCache: if False the sidecar file is neither read nor written
+		"""
+		if (self.channelDirectory is not None):
+			return self.channelDirectory
+		chList = None
+		if (useCache):
+			chList = self.loadChannelCache()
+		saveCache = useCache and chList is None
+		if (chList is None):
+			chList = self.getChannelList()
+		directory = {}
+		for chInfo in chList:
+			# Keep the first channel if name and unit are repeated
+			directory.setdefault((chInfo.name, chInfo.unit), chInfo)
+		self.channelDirectory = directory
+		if (saveCache):
+			self.saveChannelCache(chList)
+		return directory
+	
+	def getFileSignature(self):
+		stat = os.stat(self.filePath)
+		return {'size': stat.st_size, 'mtime': stat.st_mtime}
+	
+	def loadChannelCache(self):
+		cachePath = self.filePath + self.channelCacheSuffix
+		if (not os.path.isfile(cachePath)):
+			return None
+		try:
+			with open(cachePath, 'r') as f:
+				cache = json.load(f)
+			if (cache['file'] != self.getFileSignature()):
+				appLogger.info('AMRFileReader: Channel cache "{}" is out of date'.format(cachePath))
+				return None
+			return [ChannelInfo.fromDict(d) for d in cache['channels']]
+		except (IOError, ValueError, KeyError, TypeError, AttributeError) as e:
+			appLogger.warning('AMRFileReader: Ignoring invalid channel cache "{}": {}'.format(cachePath, e))
+			return None
+	
+	def saveChannelCache(self, chList):
+		cachePath = self.filePath + self.channelCacheSuffix
+		cache = {
+			'file': self.getFileSignature(), 
+			'channels': [chInfo.toDict() for chInfo in chList]
+		}
+		# Written to a temporary file and renamed, so that a failed write
+		# doesn't leave a truncated cache
+		tempPath = '{}.{}.tmp'.format(cachePath, os.getpid())
+		try:
+			with open(tempPath, 'w') as f:
+				json.dump(cache, f)
+			os.rename(tempPath, cachePath)
+		except Exception as e:
+			appLogger.warning('AMRFileReader: Could not write channel cache "{}": {}'.format(cachePath, e))
+			if (os.path.exists(tempPath)):
+				os.remove(tempPath)
+	
+	def searchChannel(self, channelName, channelUnit):
 		self.fh.seek(0)
 		while True:
 			titleLoc = self.fh.find(channelName)
@@ -137,18 +264,22 @@ class AMRFileReader(object):
 			appLogger.debug(chInfo)
 		return chList
 
-	def mergeChannels(self, channelList, channelNames, resamplingInterval, maxIntervalNoValue):
+	def mergeChannels(self, channelList, channelNames, resamplingInterval, maxIntervalNoValue, method = 'linear', out = None):
+		"""
+		Checks the channels for missing data and resamples them on a common time base
+		:param channelList: list of record arrays with fields 'time' and 'value'
+		:param channelNames: names of the channels in the result
+		:param method: resampling method, see `resampleChannels`
+		:param out: optional preallocated Fortran ordered float64 array, see `resampleChannels`
+		:return: ChannelTable with columns 'time' and channelNames 
+		"""
 		__funcName = 'AMRFileReader.mergeChannels'
 		numChannels = len(channelList)
-		maxLen = 0
 		startTimes = np.zeros(numChannels, dtype = np.uint32)
 		stopTimes = np.zeros(numChannels, dtype = np.uint32)
-		#print channelList[0][:100]
-		# Determine the start/stop times and the channel lengths
+		# Determine the start/stop times
 		channelInd = 0
 		for channel in channelList:
-			if (channel.shape[0] > maxLen):
-				maxLen = channel.shape[0]
 			startTimes[channelInd] = channel['time'][0]
 			stopTimes[channelInd] = channel['time'][-1]
 			# Check for big gaps in time
@@ -178,29 +309,159 @@ class AMRFileReader(object):
 		
 		startTime = startTimeMax
 		stopTime = stopTimeMin
-		newLen = (stopTime - startTime - 1) / resamplingInterval + 1
+		time = np.arange(startTime, stopTime, resamplingInterval, dtype = np.float64)
 		appLogger.info('{}: New startTime = {}; stopTime = {}; size = {}'.format(__funcName, self.AMRTime2DateTime(startTime), 
-																			self.AMRTime2DateTime(startTime), newLen))
-		newDType = [(name, np.float64) for name in channelNames]
-		newDType.insert(0, ('time', np.float64))
-		newChannelData = np.zeros(shape = (newLen,), dtype = newDType)
-		newChannelData['time'] = np.arange(startTime, stopTime, resamplingInterval)
-		# Resample channels using interpolation
-		channelInd = 0
-		for channel in channelList:
-			chanName = channelNames[channelInd]
-			newChannelData[chanName] = np.interp(newChannelData['time'], channel['time'], channel['value'])
-			channelInd += 1
-		return newChannelData
+																			self.AMRTime2DateTime(stopTime), len(time)))
+		data = self.resampleChannels(channelList, time, resamplingInterval, method = method, out = out)
+		return ChannelTable(['time'] + list(channelNames), data)
+	
+	@classmethod
+	def resampleChannels(cls, channelList, time, resamplingInterval, method = 'linear', out = None):
+		"""
+		Resamples the channels on the time base `time`
+		:param channelList: list of record arrays with fields 'time' (increasing) and 'value'
+		:param time: equidistant time base, with step `resamplingInterval`
+		:param method: 
+			'linear' - linear interpolation
+			'zoh' - zero order hold, the last value at or before each time point
+			'minmax' - min/max preserving decimation; each resampling interval is
+				represented by 2 points, at its start and middle, holding the extrema of 
+				the interval in their order of occurrence. Intervals without data points 
+				are linearly interpolated.
+		:param out: optional preallocated Fortran ordered float64 array of shape (numPoints, numChannels + 1),
+			where numPoints is len(time) or 2 * len(time) for 'minmax'
+		:return: Fortran ordered array with the time in column 0 and the channels in the next columns 
+		"""
+		if (method == 'minmax'):
+			numPoints = 2 * len(time)
+		elif (method in ('linear', 'zoh')):
+			numPoints = len(time)
+		else:
+			raise ValueError("Unknown resampling method '{}', use 'linear', 'zoh' or 'minmax'".format(method))
+		shape = (numPoints, len(channelList) + 1)
+		if (out is None):
+			out = np.empty(shape, dtype = np.float64, order = 'F')
+		elif (out.shape != shape or out.dtype != np.float64 or not out.flags.f_contiguous):
+			raise ValueError('Output array must be a Fortran ordered float64 array of shape {}'.format(shape))
+		if (method == 'minmax'):
+			out[0::2, 0] = time
+			out[1::2, 0] = time + resamplingInterval / 2.
+		else:
+			out[:, 0] = time
+		for k, channel in enumerate(channelList):
+			t = channel['time']
+			v = channel['value']
+			if (method == 'linear'):
+				out[:, k + 1] = np.interp(time, t, v)
+			elif (method == 'zoh'):
+				ind = np.searchsorted(t, time, side = 'right') - 1
+				np.clip(ind, 0, len(t) - 1, out = ind)
+				np.take(v, ind, out = out[:, k + 1])
+			else:
+				cls.decimateMinMax(t, v, time, resamplingInterval, out[:, k + 1], out[:, 0])
+		return out
+	
+	@staticmethod
+	def decimateMinMax(t, v, time, resamplingInterval, out, outTime):
+		"""
+		Min/max decimation of a single channel (see `resampleChannels`)
+		"""
+		intervalStarts = np.searchsorted(t, time, side = 'left')
+		intervalEnds = np.searchsorted(t, time + resamplingInterval, side = 'left')
+		nonEmpty = intervalEnds > intervalStarts
+		# Intervals without data points
+		out[:] = np.interp(outTime, t, v)
+		if (not np.any(nonEmpty)):
+			return
+		# The non-empty intervals partition the values between the first and last of them
+		starts = intervalStarts[nonEmpty]
+		first = starts[0]
+		values = v[first : intervalEnds[nonEmpty][-1]]
+		starts -= first
+		counts = np.diff(np.append(starts, len(values)))
+		positions = np.arange(len(values))
+		minValues = np.minimum.reduceat(values, starts)
+		maxValues = np.maximum.reduceat(values, starts)
+		# First positions of the extrema in each interval
+		minPos = np.minimum.reduceat(np.where(values == np.repeat(minValues, counts), positions, len(values)), starts)
+		maxPos = np.minimum.reduceat(np.where(values == np.repeat(maxValues, counts), positions, len(values)), starts)
+		intervalInd = np.nonzero(nonEmpty)[0]
+		out[2 * intervalInd] = values[np.minimum(minPos, maxPos)]
+		out[2 * intervalInd + 1] = values[np.maximum(minPos, maxPos)]
 
+	def convertToHDF5(self, outputFileName, channels, chunkSize = 100000, 
+					resamplingInterval = None, method = 'linear', compression = 'gzip'):
+		"""
+		Streams channels to chunked, compressed and resizable HDF5 datasets. The data
+		is processed in chunks, so the memory use is bounded by the chunk size and not
+		by the file size.
+		:param channels: list of (channelName, channelUnit) tuples
+		:param chunkSize: number of samples (or resampled points) processed at once
+		:param resamplingInterval: if not given, each channel is written to the datasets
+			'<channelName>/time' and '<channelName>/value'. Otherwise the channels are 
+			resampled on the fly on a common time base (see `resampleChannels`) 
+			and written to the datasets 'time' and '<channelName>'.
+		:param method: resampling method, see `resampleChannels`
+		"""
+		import h5py
+		from smo.math.io.HDF5Converter import ChunkedDatasetWriter
+		channelData = self.readChannels(channels)
+		channelNames = [channelName for channelName, _ in channels]
+		f = h5py.File(outputFileName, 'w')
+		try:
+			if (resamplingInterval is None):
+				for channelName, data in zip(channelNames, channelData):
+					appLogger.info('AMRFileReader: Writing channel {}'.format(channelName))
+					group = f.create_group(channelName)
+					timeWriter = ChunkedDatasetWriter(group, 'time', dtype = data['time'].dtype, compression = compression)
+					valueWriter = ChunkedDatasetWriter(group, 'value', dtype = data['value'].dtype, compression = compression)
+					for start in range(0, len(data), chunkSize):
+						chunk = data[start : start + chunkSize]
+						timeWriter.append(chunk['time'])
+						valueWriter.append(chunk['value'])
+				return
+			# Common time base, as in mergeChannels
+			startTime = float(max(data['time'][0] for data in channelData))
+			stopTime = float(min(data['time'][-1] for data in channelData))
+			# Same step and length as np.arange(startTime, stopTime, resamplingInterval)
+			timeStep = (startTime + resamplingInterval) - startTime
+			numPoints = max(0, int(np.ceil((stopTime - startTime) / resamplingInterval)))
+			appLogger.info('AMRFileReader: Resampling {} channels to {} points'.format(len(channels), numPoints))
+			writers = [ChunkedDatasetWriter(f, name, compression = compression) 
+					for name in ['time'] + channelNames]
+			for firstPoint in range(0, numPoints, chunkSize):
+				time = startTime + np.arange(firstPoint, min(numPoints, firstPoint + chunkSize)) * timeStep
+				# Channel samples from the last one at or before the start of the chunk
+				# to the first one after its end
+				chunkChannels = []
+				for data in channelData:
+					t = data['time']
+					first = max(0, np.searchsorted(t, time[0], side = 'right') - 1)
+					last = np.searchsorted(t, time[-1] + resamplingInterval, side = 'left')
+					if (last < len(t)):
+						last = np.searchsorted(t, t[last], side = 'right')
+					chunkChannels.append(self.removeDuplicateTimes(data[first:last], verbose = False))
+				values = self.resampleChannels(chunkChannels, time, resamplingInterval, method = method)
+				for i, writer in enumerate(writers):
+					writer.append(values[:, i])
+		finally:
+			f.close()
+	
 	@classmethod
-	def removeDuplicateTimes(cls, channel):
-		df = np.diff(channel['time'])
-		dft = np.zeros((channel.shape[0], ), dtype = np.bool)
-		dft[:-1] = df
+	def removeDuplicateTimes(cls, channel, verbose = True):
+		"""
+		Removes the rows with repeated time, keeping the last one.
+		The channel is returned unchanged (not copied) if there are no duplicates.
+		"""
+		dft = np.empty((channel.shape[0], ), dtype = np.bool)
+		np.not_equal(channel['time'][1:], channel['time'][:-1], out = dft[:-1])
 		dft[-1] = True
-		result = channel[dft]
-		appLogger.info('Removed {} duplicate times'.format(len(channel) - len(result)))
+		if (dft.all()):
+			result = channel
+		else:
+			result = channel[dft]
+		if (verbose):
+			appLogger.info('Removed {} duplicate times'.format(len(channel) - len(result)))
 		return result
 
 	@classmethod
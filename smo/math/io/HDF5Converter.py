@@ -0,0 +1,66 @@
+'''
+Helpers for streaming measurement data to HDF5 in fixed size chunks
+'''
+import numpy as np
+
+class ChunkedDatasetWriter(object):
+	"""
+	Appends data to a chunked, compressed and resizable 1D HDF5 dataset
+	"""
+	def __init__(self, group, name, dtype = np.float64, chunkSize = 65536,
+				compression = 'gzip', compressionLevel = 4):
+		if (compression == 'gzip'):
+			compressionOpts = compressionLevel
+		else:
+			compressionOpts = None
+		self.dataset = group.create_dataset(name, shape = (0,), maxshape = (None,),
+				dtype = dtype, chunks = (chunkSize,),
+				compression = compression, compression_opts = compressionOpts)
+
+	def append(self, values):
+		numValues = len(values)
+		if (numValues == 0):
+			return
+		size = self.dataset.shape[0]
+		self.dataset.resize((size + numValues,))
+		self.dataset[size : size + numValues] = values
+
+class StreamingResampler(object):
+	"""
+	Linear resampling of time series, read in consecutive chunks, on the equidistant
+	time base np.arange(startTime, stopTime, resamplingInterval). The last sample of
+	each chunk is kept to interpolate across the chunk boundaries, so the result is
+	the same as np.interp on the whole series.
+	"""
+	def __init__(self, startTime, stopTime, resamplingInterval):
+		self.startTime = startTime
+		# Same step as used by np.arange to fill the time base
+		self.resamplingInterval = (startTime + resamplingInterval) - startTime
+		self.numPoints = len(np.arange(startTime, stopTime, resamplingInterval))
+		self.nextIndex = 0
+		self.prevTime = None
+		self.prevValues = None
+
+	def process(self, time, valuesList):
+		"""
+		Resamples the next chunk
+		:param time: increasing times of the chunk samples
+		:param valuesList: list of value arrays (one per channel) of the chunk samples
+		:return: (resampled time, list of resampled value arrays) of the time base points
+			up to the last time of the chunk
+		"""
+		if (self.prevTime is not None):
+			time = np.concatenate((self.prevTime, time))
+			valuesList = [np.concatenate((prevValues, values))
+						for prevValues, values in zip(self.prevValues, valuesList)]
+		if (len(time) == 0):
+			return np.zeros((0,)), [np.zeros((0,)) for _ in valuesList]
+		lastIndex = int(np.floor((time[-1] - self.startTime) / self.resamplingInterval)) + 1
+		lastIndex = max(self.nextIndex, min(self.numPoints, lastIndex))
+		gridTime = self.startTime + np.arange(self.nextIndex, lastIndex) * self.resamplingInterval
+		# Guard against rounding in the computation of lastIndex
+		gridTime = gridTime[gridTime <= time[-1]]
+		self.nextIndex += len(gridTime)
+		self.prevTime = time[-1:]
+		self.prevValues = [values[-1:] for values in valuesList]
+		return gridTime, [np.interp(gridTime, time, values) for values in valuesList]
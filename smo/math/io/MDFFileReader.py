@@ -8,6 +8,8 @@ import struct
 import datetime
 import os, sys
 import re
+import mmap
+import warnings
 import numpy as np
 os.environ['ETS_TOOLKIT'] = 'qt4'
 
@@ -74,6 +76,75 @@ class DataRecordDefinition(T.HasTraits):
 				
 			result.append(value)
 		return result
+	
+	def getFieldFormat(self, channelIndex):
+		"""
+		Returns the numpy format of the bytes holding a channel value,
+		or None if the channel type/size is not supported
+		"""
+		thisType = self.types[channelIndex]
+		thisSize = self.sizeList[channelIndex]
+		if (thisSize < 8):
+			if (thisType in (0, 1) and self.positionOffsetList[channelIndex] + thisSize <= 8):
+				return 'u1'
+		elif (thisType in (2, 3)):
+			if (thisSize in (32, 64)):
+				return '<f%d'%(thisSize // 8)
+		elif (thisType in (0, 1)):
+			if (thisSize in (8, 16, 32, 64)):
+				return '<%s%d'%('u' if thisType == 0 else 'i', thisSize // 8)
+		return None
+	
+	def getRecordDType(self, recordSize, channelIndices = None):
+		"""
+		Returns a structured dtype (fields 'c0', 'c1', ...) mapping the bytes of 
+		each supported channel within a record. Bit fields are mapped to the byte 
+		containing them, unsupported channels are omitted.
+		:param channelIndices: channels to include (default: all) 
+		"""
+		if (channelIndices is None):
+			channelIndices = range(len(self.types))
+		names = []
+		formats = []
+		offsets = []
+		for i in channelIndices:
+			fieldFormat = self.getFieldFormat(i)
+			if (fieldFormat is not None):
+				names.append('c%d'%i)
+				formats.append(fieldFormat)
+				offsets.append(self.positionByteList[i])
+		return np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': recordSize})
+	
+	def parseRecords(self, data, numberRecords, recordSize, offset = 0, channelIndices = None):
+		"""
+		Decodes all the records of a data block at once
+		:param data: buffer (e.g. mmap) containing the data block
+		:param offset: position of the first record in the buffer
+		:param channelIndices: channels to decode (default: all)
+		:return: list with one array per channel. Byte aligned channels are strided 
+			views of the buffer, bit fields are decoded into new arrays. Unsupported
+			channels are returned as None.
+		"""
+		if (channelIndices is None):
+			channelIndices = range(len(self.types))
+		records = np.frombuffer(data, dtype = self.getRecordDType(recordSize, channelIndices), 
+							count = numberRecords, offset = offset)
+		result = []
+		for i in channelIndices:
+			name = 'c%d'%i
+			if (name not in records.dtype.names):
+				result.append(None)
+				continue
+			values = records[name]
+			thisSize = self.sizeList[i]
+			if (thisSize < 8):
+				values = (values >> self.positionOffsetList[i]) & ((1 << thisSize) - 1)
+				if (self.types[i] == 1):
+					# Two's complement sign extension
+					values = values.astype(np.int8)
+					values -= (values >> (thisSize - 1)) << thisSize
+			result.append(values)
+		return result
 				
 class ConversionFormula:
 	def __init__(self, conversionFormulaType, parameters):
@@ -105,6 +176,7 @@ class SignalChannel(T.HasTraits):
 	data = T.Array
 	unit = T.Str
 	conversionFormula = T.Instance(ConversionFormula) 
+	channelIndex = T.Int
 	 
 	def getRepr(self):		
 		if (self.conversionFormula != None):
@@ -137,36 +209,110 @@ class ChannelGroup(T.HasTraits):
 class DataGroup(T.HasTraits):
 	channelGroups = T.List(ChannelGroup)
 	numberRecordIds = T.Int
+	dataRecordsAddress = T.Int
 	
 	def getRepr(self):
 		s = "DataGroup(nuberRecordIds = %d)"%self.numberRecordIds
 		return s
 	
 	def readFromMat(self, f, dataBeginAddress):
+		# The map is released together with the last view of it
+		data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
 		for channelGroup in self.channelGroups:
-			for channel in channelGroup.channels:
-				channel.data = np.zeros((channelGroup.numberRecords,))
+			channelValues = channelGroup.dataRecordDefinition.parseRecords(data, 
+					channelGroup.numberRecords, channelGroup.recordSize, offset = dataBeginAddress)
+			for channel, values in zip(channelGroup.channels, channelValues):
+				channel.data = self.convertChannelValues(channel, values, channelGroup.numberRecords)
+	
+	def readChannelData(self, data, channelGroup, channel, firstRecord = 0, numberRecords = None):
+		"""
+		Decodes a single channel from the data block, reading only the requested records
+		:param data: buffer (e.g. mmap) containing the file
+		:param firstRecord: index of the first record to read
+		:param numberRecords: number of records to read (default: up to the last record)
+		"""
+		if (numberRecords is None):
+			numberRecords = channelGroup.numberRecords - firstRecord
+		values, = channelGroup.dataRecordDefinition.parseRecords(data, 
+				numberRecords, channelGroup.recordSize, 
+				offset = self.dataRecordsAddress + firstRecord * channelGroup.recordSize,
+				channelIndices = [channel.channelIndex])
+		return self.convertChannelValues(channel, values, numberRecords)
+	
+	@staticmethod
+	def convertChannelValues(channel, values, numberRecords):
+		"""
+		Copies the raw channel values to a float array and applies the conversion formula
+		"""
+		if (values is None):
+			warnings.warn("Unsupported data type of channel '%s' (signalType = %d, numberBits = %d)"%
+					(channel.name, channel.signalType, channel.numberBits))
+			result = np.empty((numberRecords,))
+			result.fill(np.nan)
+			return result
+		# Copy the values, so that the data does not refer to the mapped file
+		result = np.array(values, dtype = np.float64)
+		if (channel.conversionFormula != None):
+			result = channel.conversionFormula(result)
+		return result
+
+class ChannelHandle(object):
+	"""
+	Lightweight reference to a channel of a file read in lazy mode.
+	The channel data is decoded only when requested.
+	"""
+	def __init__(self, reader, dataGroup, channelGroup, channel):
+		self.reader = reader
+		self.dataGroup = dataGroup
+		self.channelGroup = channelGroup
+		self.channel = channel
+		self.name = channel.name
+		self.unit = channel.unit
+		self.numberRecords = channelGroup.numberRecords
+	
+	def getData(self, startTime = None, endTime = None):
+		"""
+		Decodes the channel data
+		:param startTime: if given, the records before startTime are skipped
+		:param endTime: if given, the records after endTime are skipped
+		The time range is located using the 'time' channel of the channel group. 
+		"""
+		firstRecord = 0
+		numberRecords = None
+		if (startTime is not None or endTime is not None):
+			firstRecord, lastRecord = self.getRecordRange(startTime, endTime)
+			numberRecords = lastRecord - firstRecord
+		return self.dataGroup.readChannelData(self.reader.getDataMap(), 
+				self.channelGroup, self.channel, firstRecord, numberRecords)
+	
+	def getRecordRange(self, startTime = None, endTime = None):
+		"""
+		Returns the range [first, last) of the records within the time range
+		"""
+		timeChannel = self.reader.findTimeChannel(self.channelGroup)
+		time = self.dataGroup.readChannelData(self.reader.getDataMap(), 
+				self.channelGroup, timeChannel)
+		firstRecord = 0 if startTime is None else np.searchsorted(time, startTime, side = 'left')
+		lastRecord = len(time) if endTime is None else np.searchsorted(time, endTime, side = 'right')
+		return int(firstRecord), int(max(firstRecord, lastRecord))
+	
+	def __repr__(self):
+		return "ChannelHandle(name = '%s', unit = '%s', numberRecords = %d)"%(self.name, self.unit, self.numberRecords)
 
-			for i in range(channelGroup.numberRecords):
-				recordBegin = dataBeginAddress + i * channelGroup.recordSize;
-				f.seek(recordBegin)
-				recordRawData = f.read(channelGroup.recordSize) 				
-				recordData = channelGroup.dataRecordDefinition.parseRecord(recordRawData)
-				j = 0
-				for channel in channelGroup.channels:
-					if (channel.conversionFormula != None):
-						channel.data[i] = channel.conversionFormula(recordData[j])
-					else:
-						channel.data[i] = recordData[j]
-					j += 1
-			
 class MDFFileReader:
 	currentDataGroup = None
 	currentChannelGroup = None
 	currentChannel = None
+	lazy = False
+	dataMap = None
 	def __init__(self, inputFileName):
 		self.inputFileName = inputFileName
 		self.f = open(inputFileName, 'rb')
+	
+	def getDataMap(self):
+		if (self.dataMap is None):
+			self.dataMap = mmap.mmap(self.f.fileno(), 0, access = mmap.ACCESS_READ)
+		return self.dataMap
 		
 	def readChunk(self, chunkFormat):
 		chunkSize = struct.calcsize(chunkFormat)
@@ -196,6 +342,7 @@ class MDFFileReader:
 		assert(data[4] == 1) # Only one channel group allowed
 		nextGroup = data[0]
 		dataRecordsAddress = data[3]
+		self.currentDataGroup.dataRecordsAddress = dataRecordsAddress
 		firstChannelGroupAddress = data[1]
 		print(self.currentDataGroup.getRepr())
 		
@@ -204,7 +351,8 @@ class MDFFileReader:
 			hasMore = True
 			while hasMore:
 				hasMore = self.readChannelGroupBlock()
-		self.currentDataGroup.readFromMat(self.f, dataRecordsAddress)
+		if (not self.lazy):
+			self.currentDataGroup.readFromMat(self.f, dataRecordsAddress)
 		
 		if (nextGroup == 0):
 			return False
@@ -247,6 +395,7 @@ class MDFFileReader:
 		data = self.readChunk(blockStruct)
 		channel = SignalChannel()
 		self.currentChannel = channel
+		channel.channelIndex = len(self.currentChannelGroup.channels)
 		self.currentChannelGroup.channels.append(channel)
 		
 		# Read channel attrubutes
@@ -315,7 +464,14 @@ class MDFFileReader:
 	def getString(self, data):
 		return re.sub(r'[\x00]', '', data)
 		
-	def read(self):
+	def read(self, lazy = False):
+		"""
+		Reads the file structure and the channel data
+		:param lazy: if True, only the block tree (data groups, channel groups, channels
+			and conversion formulas) is read. The channel data is decoded on demand
+			through the handles returned by `getChannels` and `getChannel`.
+		"""
+		self.lazy = lazy
 		self.readIDBlock()
 		self.readHeaderBlock()
 		self.dataGroups = []
@@ -324,7 +480,45 @@ class MDFFileReader:
 			hasMore = self.readDataGroupBlock()			
 		return self.dataGroups
 	
-	def saveAsMat(self, outputFileName, resample = False):
+	def getChannels(self):
+		"""
+		Returns handles to all the channels of the file
+		"""
+		handles = []
+		for dataGroup in self.dataGroups:
+			for channelGroup in dataGroup.channelGroups:
+				for channel in channelGroup.channels:
+					handles.append(ChannelHandle(self, dataGroup, channelGroup, channel))
+		return handles
+	
+	def getChannel(self, name):
+		"""
+		Returns a handle to the first channel with the given name
+		"""
+		for handle in self.getChannels():
+			if (handle.name == name):
+				return handle
+		raise ValueError("Channel '%s' not found"%name)
+	
+	def findTimeChannel(self, channelGroup):
+		for channel in channelGroup.channels:
+			if (channel.name == 'time'):
+				return channel
+		raise ValueError('No time channel found in %s'%channelGroup.getRepr())
+	
+	def getChannelData(self, dataGroup, channelGroup, channel):
+		"""
+		Returns the channel data, decoding it if the file was read in lazy mode
+		"""
+		if (self.lazy):
+			return dataGroup.readChannelData(self.getDataMap(), channelGroup, channel)
+		else:
+			return channel.data
+	
+	def saveAsMat(self, outputFileName, resample = False, channelNames = None):
+		"""
+		:param channelNames: names of the channels to save (default: all)
+		"""
 		from scipy.io import savemat
 		groupNumber = 0
 		groupDict = {}
@@ -337,7 +531,7 @@ class MDFFileReader:
 					for i in range(len(channelGroup.channels)):
 						if (channelGroup.channels[i].name == 'time'):
 							timeChannel = channelGroup.channels.pop(i)
-							time = timeChannel.data
+							time = self.getChannelData(dataGroup, channelGroup, timeChannel)
 							resamplingTime = np.arange(time[0], time[-1], resamplingInterval)
 							break
 					assert (time is not None)
@@ -351,20 +545,27 @@ class MDFFileReader:
 					groupDict[groupName] = channelGroupDict
 					# Resample the non-zero channels 
 					for channel in channelGroup.channels:
+						if (channelNames is not None and channel.name not in channelNames):
+							continue
 						name = channel.name
 						if (len(name) > 31):
 							name = name[:31]
-						if (np.any(channel.data)):
+						data = self.getChannelData(dataGroup, channelGroup, channel)
+						if (np.any(data)):
 							if (resample):
-								channel.data = np.interp(resamplingTime, time, channel.data)
-							channelGroupDict[name] = channel.data
+								data = np.interp(resamplingTime, time, data)
+							channelGroupDict[name] = data
 						else:
 							#channel.data = np.zeros((1,))
 							pass
 		
 		savemat(outputFileName, groupDict)
 
-	def saveAsHDF5(self, outputFileName):
+	def saveAsHDF5(self, outputFileName, channelNames = None):
+		"""
+		:param channelNames: names of the channels to save (default: all). 
+			In lazy mode only these channels are decoded, one at a time.
+		"""
 		import h5py
 		groupNumber = 0
 		f = h5py.File(outputFileName, "w")
@@ -377,15 +578,86 @@ class MDFFileReader:
 					print("Writing group '%s'"%groupName)
 					group = f.create_group(groupName)
 					for channel in channelGroup.channels:
+						if (channelNames is not None and channel.name not in channelNames):
+							continue
 						name = channel.name
 						if (len(name) > 31):
 							name = name[:31]
-						if (np.any(channel.data) and (name not in group)):
+						if (name in group):
+							continue
+						data = self.getChannelData(dataGroup, channelGroup, channel)
+						if (np.any(data)):
 							print("Writing channel '%s'"%name)
-							group.create_dataset(name, shape = channel.data.shape, 
-								dtype = channel.data.dtype, data = channel.data)
+							group.create_dataset(name, shape = data.shape, 
+								dtype = data.dtype, data = data)
 		f.close()
 
+	def convertToHDF5(self, outputFileName, channelNames = None, chunkSize = 100000, 
+					resamplingInterval = None, compression = 'gzip'):
+		"""
+		Streams the channel data to chunked, compressed and resizable HDF5 datasets.
+		The records are decoded in chunks, so the memory use is bounded by the chunk 
+		size and not by the file size. Can be used after `read(lazy = True)`.
+		:param channelNames: names of the channels to convert (default: all)
+		:param chunkSize: number of records decoded at once
+		:param resamplingInterval: if given, the channels are linearly resampled on the fly
+			on a time base starting at the first time of the channel group
+		"""
+		import h5py
+		from smo.math.io.HDF5Converter import ChunkedDatasetWriter, StreamingResampler
+		data = self.getDataMap()
+		groupNumber = 0
+		f = h5py.File(outputFileName, "w")
+		try:
+			for dataGroup in self.dataGroups: 
+				for channelGroup in dataGroup.channelGroups:
+					if (channelGroup.numberRecords <= 50):
+						continue
+					groupNumber += 1
+					groupName = "group%d"%groupNumber
+					print("Writing group '%s'"%groupName)
+					group = f.create_group(groupName)
+					timeChannel = None
+					if (resamplingInterval is not None):
+						timeChannel = self.findTimeChannel(channelGroup)
+						startTime = dataGroup.readChannelData(data, channelGroup, timeChannel, 0, 1)[0]
+						stopTime = dataGroup.readChannelData(data, channelGroup, timeChannel, 
+											channelGroup.numberRecords - 1, 1)[0]
+						resampler = StreamingResampler(startTime, stopTime, resamplingInterval)
+						timeWriter = ChunkedDatasetWriter(group, 'time', compression = compression)
+					# Select the channels and create their datasets
+					channels = []
+					writers = []
+					for channel in channelGroup.channels:
+						if (channelNames is not None and channel.name not in channelNames):
+							continue
+						name = channel.name
+						if (len(name) > 31):
+							name = name[:31]
+						if (channel is timeChannel or name in group):
+							continue
+						channels.append(channel)
+						writers.append(ChunkedDatasetWriter(group, name, compression = compression))
+					channelIndices = [channel.channelIndex for channel in channels]
+					if (timeChannel is not None):
+						channelIndices.append(timeChannel.channelIndex)
+					# Decode and write the records chunk by chunk
+					for firstRecord in range(0, channelGroup.numberRecords, chunkSize):
+						numberRecords = min(chunkSize, channelGroup.numberRecords - firstRecord)
+						rawValues = channelGroup.dataRecordDefinition.parseRecords(data, 
+								numberRecords, channelGroup.recordSize, 
+								offset = dataGroup.dataRecordsAddress + firstRecord * channelGroup.recordSize,
+								channelIndices = channelIndices)
+						values = [DataGroup.convertChannelValues(channel, channelValues, numberRecords)
+								for channel, channelValues in zip(channels, rawValues)]
+						if (timeChannel is not None):
+							time = DataGroup.convertChannelValues(timeChannel, rawValues[-1], numberRecords)
+							time, values = resampler.process(time, values)
+							timeWriter.append(time)
+						for writer, channelValues in zip(writers, values):
+							writer.append(channelValues)
+		finally:
+			f.close()
 	
 def main():
 	import glob
@@ -79,55 +79,211 @@ class MultiaxialDamageCalculator(object):
 			for j in range(numPhiSteps):
 				self.rotMatrices[i, j, ...] = STC.getRotationTwoAngleTransf(
 					theta = self.thetaList[i], phi = self.phiList[j])
+		# Projection weights of the packed stress components on the plane normals
+		# sigma_n = n0^2 s11 + n1^2 s22 + n2^2 s33 + n0 n1 (s12 + s21) + n0 n2 (s13 + s31) + n1 n2 (s23 + s32)
+		normals = self.rotMatrices[:, :, 0, :].reshape((numThetaSteps * numPhiSteps, 3))
+		self.planeWeights = np.zeros(shape = (numThetaSteps * numPhiSteps, 6), dtype = np.float64)
+		self.planeWeights[:, 0] = normals[:, 0] * normals[:, 0]
+		self.planeWeights[:, 1] = normals[:, 1] * normals[:, 1]
+		self.planeWeights[:, 2] = normals[:, 2] * normals[:, 2]
+		self.planeWeights[:, 3] = normals[:, 0] * normals[:, 1]
+		self.planeWeights[:, 4] = normals[:, 0] * normals[:, 2]
+		self.planeWeights[:, 5] = normals[:, 1] * normals[:, 2]
+	
+	@staticmethod
+	def packStresses(stresses):
+		"""
+		Packs a (N, 3, 3) stress tensor series into a contiguous (6, N) array
+		with rows s11, s22, s33, s12 + s21, s13 + s31, s23 + s32
+		"""
+		packedStresses = np.empty(shape = (6, stresses.shape[0]), dtype = np.float64)
+		packedStresses[0] = stresses[:, 0, 0]
+		packedStresses[1] = stresses[:, 1, 1]
+		packedStresses[2] = stresses[:, 2, 2]
+		np.add(stresses[:, 0, 1], stresses[:, 1, 0], out = packedStresses[3])
+		np.add(stresses[:, 0, 2], stresses[:, 2, 0], out = packedStresses[4])
+		np.add(stresses[:, 1, 2], stresses[:, 2, 1], out = packedStresses[5])
+		return packedStresses
+	
+	def computeNormalStresses(self, planeIndices):
+		"""
+		Computes the normal stress series for a group of planes with a single
+		matrix product over the packed stress components
+		:param planeIndices: flat plane indices (i * numPhi + j)
+		:return: a C-contiguous array of shape (len(planeIndices), N)
+		"""
+		return np.dot(self.planeWeights[planeIndices], self.packedStresses)
+	
+	def getPlaneChunks(self, planeChunkSize = 32):
+		"""
+		Splits the flat plane indices into consecutive chunks
+		"""
+		numPlanes = self.planeWeights.shape[0]
+		return [np.arange(chunkStart, min(chunkStart + planeChunkSize, numPlanes))
+				for chunkStart in range(0, numPlanes, planeChunkSize)]
+	
+	def iterNormalStresses(self, planeChunkSize = 32):
+		"""
+		Generator yielding (planeIndices, normalStresses) for consecutive chunks of planes,
+		so that the full (planes x samples) matrix never has to be kept in memory
+		"""
+		for planeIndices in self.getPlaneChunks(planeChunkSize):
+			yield planeIndices, self.computeNormalStresses(planeIndices)
 		
-	def computeDamage(self):
-		#numSamples = self.stressSeries.shape[0]
-		#SNCurveParameters = self.SNCurveParameters['Liner']
-		#stressValuesFull = np.zeros((numSamples, 3, 3))
-		self.damage = np.zeros(shape = (len(self.thetaList), len(self.phiList)), dtype = np.float64)
-		for i in range(len(self.thetaList)):
-			for j in range(len(self.phiList)):
-				rotMatrix = self.rotMatrices[i, j, ...]
-				r3 = rotMatrix[0, :]
-				# Compute the sigma33 component of the stress tensor in the rotated coordinate system
-				sv1 = np.tensordot(self.stressesScaled, r3, axes = ([2], [0]))
-				stressValues = np.tensordot(sv1, r3, axes = ([1], [0]))
-				if (self.useCompiledExtensions):
-					rainflowCalc = Mech.RainflowCounter(self.numStressBins)
-					rainflowCalc.setStresses(stressValues)
-					rainflowCalc.setMeanStressCorrection(self.meanStressCorrectionFactor)
-					rainflowCalc.setSNCurveParameters(self.SNCurveParameters['S_E'], self.SNCurveParameters['N_E'], self.SNCurveParameters['k'])
-					self.damage[i, j] = rainflowCalc.compute()
-				else:
-					from Rainflow import PercentileCalculator, RainflowCounter, DamageCalculator
-					# Create bins and distribute stress in bins
-					percCalc = PercentileCalculator(stressValues, self.numStressBins)
-					# Locate the minima/maxima
-					percCalc.locateExtrema()
-					# Initialize the rainflow counter
-					rainflowCalc = RainflowCounter(percCalc.extremaValues, percCalc.binCenters)
-					# Compute the Rainflow mattrix (3-point algorithm)
-					rainflowCalc.computeMatrix()
-					# Repeat the run on the residual
-					rainflowCalc.residualRepeatedRun()
-					# Initialize the damage calculator
-					damageCalc = DamageCalculator(rainflowCalc.rainflowMatrix, percCalc.binCenters)
-					# Set the S-N curve
-					#SNCurveParameters = S.SNCurveParameters['Liner']
-					#appLogger.info('Calculating with SN curve parameters: k = %f, S_E = %e, N_E = %e' % \
-					#			(SNCurveParameters['k'], SNCurveParameters['S_E'], SNCurveParameters['N_E']))
-					damageCalc.setSNCurveParameters(
-							S_E = self.SNCurveParameters['S_E'], 
-							N_E = self.SNCurveParameters['N_E'], 
-							k = self.SNCurveParameters['k']
-					)
-					# Apply mean stress correction to the Rainflow matrix amplitudes 
-					damageCalc.applyOneParameterMeanStressCorrection(
-							M = self.meanStressCorrectionFactor
-					)
-					# Compute the cumulative using Palmgren-Miner hypothesis (adding damages)
-					self.damage[i, j] = damageCalc.computeDamage()
-				
+	def computeDamage(self, parallelMode = None, numWorkers = None, planeChunkSize = 32):
+		"""
+		Computes the damage for each of the (theta, phi) planes. The normal stresses
+		are projected in chunks of planes, and the chunks are independent of each other, 
+		so they can be distributed over several workers. All modes produce identical 
+		damage matrices.
+		:param parallelMode: None (serial), 'threads' or 'processes'. 
+			The 'threads' mode relies on the compiled extensions releasing the GIL
+			while counting rainflow cycles, the 'processes' mode works in all cases
+		:param numWorkers: number of parallel workers (default: number of CPUs)
+		:param planeChunkSize: number of planes projected at once (bounds the memory 
+			to planeChunkSize x N values per worker)
+		"""
+		numTheta = len(self.thetaList)
+		numPhi = len(self.phiList)
+		self.packedStresses = self.packStresses(self.stressesScaled)
+		planeChunks = self.getPlaneChunks(planeChunkSize)
+		if (parallelMode is None):
+			chunkDamages = [self.computePlaneChunkDamage(planeIndices) for planeIndices in planeChunks]
+		else:
+			import multiprocessing
+			if (numWorkers is None):
+				numWorkers = multiprocessing.cpu_count()
+			if (parallelMode == 'threads'):
+				from multiprocessing.pool import ThreadPool
+				pool = ThreadPool(numWorkers)
+				try:
+					chunkDamages = pool.map(self.computePlaneChunkDamage, planeChunks)
+				finally:
+					pool.close()
+					pool.join()
+			elif (parallelMode == 'processes'):
+				pool = multiprocessing.Pool(numWorkers, 
+						initializer = _initPlaneDamageWorker, 
+						initargs = (self.SNCurveParameters, self.numStressBins, 
+							self.meanStressCorrectionFactor, self.useCompiledExtensions,
+							self.packedStresses, self.planeWeights))
+				try:
+					chunkDamages = pool.map(_computePlaneChunkDamageWorker, planeChunks)
+				finally:
+					pool.close()
+					pool.join()
+			else:
+				raise ValueError("Unknown parallel mode '{}', use None, 'threads' or 'processes'".format(parallelMode))
+		self.damage = np.concatenate(chunkDamages).reshape((numTheta, numPhi))
+	
+	def computeStreamingDamage(self, stressChunkGenerator, stressRange = None, planeChunkSize = 32):
+		"""
+		Computes the damage for each of the (theta, phi) planes, processing the
+		stress history chunk by chunk with streaming rainflow counters. Only one
+		chunk of stresses is kept in memory at a time.
+		:param stressChunkGenerator: callable returning a new iterator over the 
+			(n, 3, 3) stress chunks each time it is called
+		:param stressRange: (minStress, maxStress) used for the stress bins of all the
+			planes. If None, a first pass over the chunks determines the range of each 
+			plane, giving the same bins as the in-memory calculation.
+		:param planeChunkSize: number of planes projected at once
+		"""
+		numTheta = len(self.thetaList)
+		numPhi = len(self.phiList)
+		numPlanes = numTheta * numPhi
+		if (stressRange is None):
+			minStresses = np.empty(numPlanes)
+			minStresses.fill(np.Inf)
+			maxStresses = np.empty(numPlanes)
+			maxStresses.fill(-np.Inf)
+			for planeIndices, normalStresses in self.iterStreamingNormalStresses(stressChunkGenerator, planeChunkSize):
+				minStresses[planeIndices] = np.minimum(minStresses[planeIndices], normalStresses.min(axis = 1))
+				maxStresses[planeIndices] = np.maximum(maxStresses[planeIndices], normalStresses.max(axis = 1))
+		else:
+			minStresses = np.empty(numPlanes)
+			minStresses.fill(stressRange[0])
+			maxStresses = np.empty(numPlanes)
+			maxStresses.fill(stressRange[1])
+		# Create a counter for each plane (no damage is possible for constant stress)
+		if (self.useCompiledExtensions):
+			StreamingRainflowCounter = Mech.StreamingRainflowCounter
+		else:
+			from Rainflow import StreamingRainflowCounter
+		rainflowCounters = []
+		for k in range(numPlanes):
+			if (maxStresses[k] > minStresses[k]):
+				rainflowCalc = StreamingRainflowCounter.fromRange(minStresses[k], maxStresses[k], self.numStressBins)
+				rainflowCalc.setMeanStressCorrection(self.meanStressCorrectionFactor)
+				rainflowCalc.setSNCurveParameters(self.SNCurveParameters['S_E'], self.SNCurveParameters['N_E'], self.SNCurveParameters['k'])
+			else:
+				rainflowCalc = None
+			rainflowCounters.append(rainflowCalc)
+		# Feed the normal stresses to the counters
+		for planeIndices, normalStresses in self.iterStreamingNormalStresses(stressChunkGenerator, planeChunkSize):
+			for k, planeIndex in enumerate(planeIndices):
+				if (rainflowCounters[planeIndex] is not None):
+					rainflowCounters[planeIndex].addStresses(normalStresses[k])
+		self.damage = np.array([0. if rainflowCalc is None else rainflowCalc.getDamage() 
+				for rainflowCalc in rainflowCounters], dtype = np.float64).reshape((numTheta, numPhi))
+	
+	def iterStreamingNormalStresses(self, stressChunkGenerator, planeChunkSize = 32):
+		"""
+		Scales each stress chunk and yields (planeIndices, normalStresses) for it
+		"""
+		for stressChunk in stressChunkGenerator():
+			self.stressSeries = stressChunk
+			self.scaleStresses()
+			self.packedStresses = self.packStresses(self.stressesScaled)
+			for planeIndices, normalStresses in self.iterNormalStresses(planeChunkSize):
+				yield planeIndices, normalStresses
+	
+	def computePlaneChunkDamage(self, planeIndices):
+		"""
+		Computes the damage for a chunk of planes
+		:param planeIndices: flat plane indices (i * numPhi + j)
+		"""
+		normalStresses = self.computeNormalStresses(planeIndices)
+		chunkDamage = np.zeros(len(planeIndices), dtype = np.float64)
+		for k in range(len(planeIndices)):
+			chunkDamage[k] = self.computeStressSeriesDamage(normalStresses[k])
+		return chunkDamage
+		
+	def computeStressSeriesDamage(self, stressValues):
+		"""
+		Computes the damage for the normal stress series of a single plane
+		"""
+		if (self.useCompiledExtensions):
+			rainflowCalc = Mech.RainflowCounter(self.numStressBins)
+			rainflowCalc.setStresses(stressValues)
+			rainflowCalc.setMeanStressCorrection(self.meanStressCorrectionFactor)
+			rainflowCalc.setSNCurveParameters(self.SNCurveParameters['S_E'], self.SNCurveParameters['N_E'], self.SNCurveParameters['k'])
+			return rainflowCalc.compute()
+		else:
+			from Rainflow import PercentileCalculator, RainflowCounter, DamageCalculator
+			# Create bins and distribute stress in bins
+			percCalc = PercentileCalculator(stressValues, self.numStressBins)
+			# Locate the minima/maxima
+			percCalc.locateExtrema()
+			# Initialize the rainflow counter
+			rainflowCalc = RainflowCounter(percCalc.extremaValues, percCalc.binCenters)
+			# Compute the Rainflow mattrix (3-point algorithm)
+			rainflowCalc.computeMatrix()
+			# Repeat the run on the residual
+			rainflowCalc.residualRepeatedRun()
+			# Initialize the damage calculator
+			damageCalc = DamageCalculator(rainflowCalc.rainflowMatrix, percCalc.binCenters)
+			# Set the S-N curve
+			damageCalc.setSNCurveParameters(
+					S_E = self.SNCurveParameters['S_E'], 
+					N_E = self.SNCurveParameters['N_E'], 
+					k = self.SNCurveParameters['k']
+			)
+			# Apply mean stress correction to the Rainflow matrix amplitudes 
+			damageCalc.applyOneParameterMeanStressCorrection(
+					M = self.meanStressCorrectionFactor
+			)
+			# Compute the cumulative using Palmgren-Miner hypothesis (adding damages)
+			return damageCalc.computeDamage()
 	
 	def saveDamage(self, filePath, groupPath = 'Damage/damage'):
 		self.dataFile = h5py.File(filePath)
@@ -196,6 +352,46 @@ class MultiaxialDamageCalculator(object):
 		axes.set_title('Damage for {}, channel {}'.format(dataName, channelName))
 		fig.savefig(os.path.join(folderPath, '{}_{}.png'.format(dataName, channelName)))
 		
+""" Private: worker process state for the parallel plane sweep """
+_workerDamageCalculator = None
+
+def _initPlaneDamageWorker(SNCurveParameters, numStressBins, meanStressCorrectionFactor, 
+		useCompiledExtensions, packedStresses, planeWeights):
+	global _workerDamageCalculator
+	_workerDamageCalculator = MultiaxialDamageCalculator(
+				SNCurveParameters = SNCurveParameters, 
+				numStressBins = numStressBins, 
+				meanStressCorrectionFactor = meanStressCorrectionFactor,
+				useCompiledExtensions = useCompiledExtensions)
+	_workerDamageCalculator.packedStresses = packedStresses
+	_workerDamageCalculator.planeWeights = planeWeights
+
+def _computePlaneChunkDamageWorker(planeIndices):
+	return _workerDamageCalculator.computePlaneChunkDamage(planeIndices)
+
+""" Private: worker process state for the batch processing of input files """
+_workerExecutor = None
+
+def _initInputFileWorker():
+	global _workerExecutor
+	_workerExecutor = DamageCalculationExecutor()
+	# Worker processes cannot start process pools of their own
+	if (_workerExecutor.parallelMode == 'processes'):
+		_workerExecutor.parallelMode = None
+
+def _processInputFileWorker(inputFile):
+	fileType, fileName = inputFile
+	try:
+		if (fileType == 'csv'):
+			dataName, pData, TData = _workerExecutor.readCSVInputFile(fileName)
+		else:
+			dataName, pData, TData = _workerExecutor.readAMRInputFile(fileName)
+		channelDamages = _workerExecutor.computeChannelDamages(dataName, pData, TData, writeStresses = False)
+		return fileName, dataName, channelDamages, None
+	except Exception:
+		import traceback
+		return fileName, None, None, traceback.format_exc()
+
 class DamageCalculationExecutor(object):
 	def __init__(self):
 		# Create stress calculator
@@ -214,30 +410,76 @@ class DamageCalculationExecutor(object):
 		
 		# Set-up result structure to critical plane damage
 		self.critPlaneDamage = []
+		self.parallelMode = getattr(S, 'damageParallelMode', None)
 		
 	def compute(self, dataName, pData, TData):
+		channelDamages = self.computeChannelDamages(dataName, pData, TData)
+		self.saveDamages(dataName, channelDamages)
+	
+	def computeChannelDamages(self, dataName, pData, TData, writeStresses = True):
+		"""
+		Computes the critical plane damage matrices for all the channels
+		:return: list of (channelName, damage) tuples
+		"""
+		chunkSize = getattr(S, 'damageChunkSize', None)
+		if (chunkSize is not None):
+			return self.computeChunked(dataName, pData, TData, chunkSize)
 		appLogger.info('Computing stresses')
 		self.stressCalculator.computeStresses(
 					pData = pData,
 					TData = TData
 		)
 		# Write resulting stress
-		if (S.writeStressResultsToHdf5):
+		if (S.writeStressResultsToHdf5 and writeStresses):
 			self.stressCalculator.writeStresses(S.stressResultFile, dataName)
-			
-		critPlaneDamage = [dataName]
-		self.critPlaneDamage.append(critPlaneDamage)
-		# Calculate damage		
+		
+		# Calculate damage
+		channelDamages = []
 		for channel in self.stressCalculator.channelNames:
 			self.damageCalculator.stressSeries = self.stressCalculator.stressData[channel]
 			self.damageCalculator.scaleStresses()
-			self.damageCalculator.computeDamage()
+			self.damageCalculator.computeDamage(
+				parallelMode = self.parallelMode,
+				numWorkers = getattr(S, 'damageNumWorkers', None))
+			channelDamages.append((channel, self.damageCalculator.damage))
+		return channelDamages
+	
+	def computeChunked(self, dataName, pData, TData, chunkSize):
+		"""
+		Out-of-core version of `computeChannelDamages`: for each channel the stresses 
+		are interpolated, scaled and projected onto the planes chunk by chunk, and fed 
+		to streaming rainflow counters. The peak memory depends on the chunk size and 
+		not on the length of the recording. pData and TData may be any sliceable arrays 
+		(e.g. h5py datasets). The bins are fixed by the setting `damageStressRange`, 
+		or determined by an extra pass over the chunks if it is not set.
+		"""
+		if (S.writeStressResultsToHdf5):
+			appLogger.warning('Writing the stress results is not supported in chunked mode (damageChunkSize is set)')
+		channelDamages = []
+		for channel in self.stressCalculator.channelNames:
+			appLogger.info('Computing damage for channel {} in chunks of {} samples'.format(channel, chunkSize))
+			def stressChunkGenerator(channel = channel):
+				return self.stressCalculator.iterChannelStresses(channel, pData, TData, chunkSize)
+			self.damageCalculator.computeStreamingDamage(stressChunkGenerator, 
+				stressRange = getattr(S, 'damageStressRange', None))
+			channelDamages.append((channel, self.damageCalculator.damage))
+		return channelDamages
+	
+	def saveDamages(self, dataName, channelDamages):
+		"""
+		Writes the damage matrices of an input file to the HDF5 result file
+		and the plots, and adds a row to the critical plane damage table
+		"""
+		critPlaneDamage = [dataName]
+		self.critPlaneDamage.append(critPlaneDamage)
+		for channel, damage in channelDamages:
+			self.damageCalculator.damage = damage
 			self.damageCalculator.saveDamage(
 				filePath = S.damageHDFResultFile,
 				groupPath = '/' + dataName + '/' + channel)
 			if (S.saveDamagePlots):
 				self.damageCalculator.saveDamagePlot(S.damagePlotsFolder, dataName, channel, S.damagePlots_numContours)
-			critPlaneDamage.append(self.damageCalculator.damage.max())
+			critPlaneDamage.append(damage.max())
 	
 	def saveDamageCSV(self):
 		resFile = open(S.damageCSVResultFile, 'w')
@@ -249,77 +491,136 @@ class DamageCalculationExecutor(object):
 			resFile.write("".join([",%.3e"%d for d in dataset[1:]]))
 			resFile.write('\n')			
 		resFile.close()
+	
+	@staticmethod
+	def listInputFiles(filePattern):
+		return sorted(glob.glob(os.path.join(S.inputFolder, filePattern)))
 				
 	def processCSVInputFiles(self, filePattern = '*.csv'):
 		if (not S.readCSVFiles):
 			appLogger.info('Reading CSV input files disabled. You can enable it by setting "readCSVFiles = True" in Settings.py')
 			return
 		# Read each input file
-		for fileName in glob.glob(os.path.join(S.inputFolder, filePattern)):
-			dataName, _ = os.path.splitext(os.path.basename(fileName))
-			appLogger.info('From input file "{}" reading columns ({}, {}) ...'.format(
-						fileName, S.csvPressureChannel, S.csvTemperatureChannel))
-			#appLogger.info('Temperature unit: {}'.format(S.temperatureUnit))
-			data = np.genfromtxt(fileName, delimiter = ',', names = True)
-			appLogger.info('... {} values read'.format(len(data)))
-			pTData = data[[S.csvPressureChannel[0], S.csvTemperatureChannel[0]]].copy()
-			# Clean up the data
-			pTData, stat = RecArrayManipulator.removeNaN(pTData, maxConsecutiveNaNs = S.maxConsecutiveNaNs)
-			if (stat['numRemoved'] > 0):
-				appLogger.warning('{numRemoved} rows with NaN values removed from the input data, max NaN sequence length: {maxConsecutiveNaN}'.format(**stat))			
-			pData = pTData[S.csvPressureChannel[0]]
-			TData = pTData[S.csvTemperatureChannel[0]]
-			# Convert units if necessary
-			Q.convertUnit(pData, quantity = 'Pressure', 
-				fromUnit = S.csvPressureChannel[1], toUnit = 'bar')
-			Q.convertUnit(TData, quantity = 'Temperature', 
-				fromUnit = S.csvTemperatureChannel[1], toUnit = 'K')
+		for fileName in self.listInputFiles(filePattern):
+			dataName, pData, TData = self.readCSVInputFile(fileName)
 			# Compute damage
 			self.compute(dataName, 
 						pData = pData, TData = TData)
+	
+	def readCSVInputFile(self, fileName):
+		dataName, _ = os.path.splitext(os.path.basename(fileName))
+		appLogger.info('From input file "{}" reading columns ({}, {}) ...'.format(
+					fileName, S.csvPressureChannel, S.csvTemperatureChannel))
+		#appLogger.info('Temperature unit: {}'.format(S.temperatureUnit))
+		data = np.genfromtxt(fileName, delimiter = ',', names = True)
+		appLogger.info('... {} values read'.format(len(data)))
+		pTData = data[[S.csvPressureChannel[0], S.csvTemperatureChannel[0]]].copy()
+		# Clean up the data
+		pTData, stat = RecArrayManipulator.removeNaN(pTData, maxConsecutiveNaNs = S.maxConsecutiveNaNs)
+		if (stat['numRemoved'] > 0):
+			appLogger.warning('{numRemoved} rows with NaN values removed from the input data, max NaN sequence length: {maxConsecutiveNaN}'.format(**stat))			
+		pData = pTData[S.csvPressureChannel[0]]
+		TData = pTData[S.csvTemperatureChannel[0]]
+		# Convert units if necessary
+		Q.convertUnit(pData, quantity = 'Pressure', 
+			fromUnit = S.csvPressureChannel[1], toUnit = 'bar')
+		Q.convertUnit(TData, quantity = 'Temperature', 
+			fromUnit = S.csvTemperatureChannel[1], toUnit = 'K')
+		return dataName, pData, TData
 
 	def processAMRInputFiles(self, filePattern = '*.amr'):
 		if (not S.readAMRFiles):
 			appLogger.info('Reading AMR input files disabled. You can enable it by setting "readAMRFiles = True" in Settings.py')
 			return
-		from smo.math.io import AMRFileReader
 		# Read each input file
-		for fileName in glob.glob(os.path.join(S.inputFolder, filePattern)):
-			dataName, _ = os.path.splitext(os.path.basename(fileName))
-			appLogger.info('From input file "{}" reading channels ({}, {}) ...'.format(
-						fileName, S.amrPressureChannel, S.amrTemperatureChannel))
-			# Read the AMR file
-			reader = AMRFileReader()
-			reader.openFile(fileName)
-			pChannel = reader.findChannel(*S.amrPressureChannel)
-			TChannel = reader.findChannel(*S.amrTemperatureChannel)
-			# Get channel names
-			pName = S.amrPressureChannel[0]
-			TName = S.amrTemperatureChannel[0]
-			# Read channels data
-			pData = reader.getChannelData(pChannel)[['time', 'value']].copy()
-			TData = reader.getChannelData(TChannel)[['time', 'value']].copy()			
-			appLogger.info('... {} values read from {} channel'.format(len(pData), pName))
-			appLogger.info('... {} values read from {} channel'.format(len(TData), TName))
-			# Remove duplicate time rows
-			pData = reader.removeDuplicateTimes(pData)
-			TData = reader.removeDuplicateTimes(TData)
-			# Convert units if necessary
-			Q.convertUnit(pData, quantity = 'Pressure', 
-				fromUnit = S.amrPressureChannel[1], toUnit = 'bar')
-			Q.convertUnit(TData, quantity = 'Temperature', 
-				fromUnit = S.amrTemperatureChannel[1], toUnit = 'K')
-			# Merge and clean the channel data (use common time column)			
-			channelData = reader.mergeChannels(
-					channelList = [pData, TData], channelNames = [pName, TName], 
-					resamplingInterval = S.resamplingInterval, maxIntervalNoValue = S.maxSamplingInterval)
-			if (S.saveInputPlots):
-				self.plotAMRPTData(pData, TData, channelData, [pName, TName], dataName = dataName)
+		for fileName in self.listInputFiles(filePattern):
+			dataName, pData, TData = self.readAMRInputFile(fileName)
 			# Compute damage
 			self.compute(dataName, 
-					pData = channelData[pName], TData = channelData[TName])
-
+					pData = pData, TData = TData)
+	
+	def readAMRInputFile(self, fileName):
+		from smo.math.io import AMRFileReader
+		dataName, _ = os.path.splitext(os.path.basename(fileName))
+		appLogger.info('From input file "{}" reading channels ({}, {}) ...'.format(
+					fileName, S.amrPressureChannel, S.amrTemperatureChannel))
+		# Read the AMR file
+		reader = AMRFileReader()
+		reader.openFile(fileName)
+		# Get channel names
+		pName = S.amrPressureChannel[0]
+		TName = S.amrTemperatureChannel[0]
+		# Read channels data
+		pRecords, TRecords = reader.readChannels([S.amrPressureChannel, S.amrTemperatureChannel])
+		pData = pRecords[['time', 'value']].copy()
+		TData = TRecords[['time', 'value']].copy()
+		appLogger.info('... {} values read from {} channel'.format(len(pData), pName))
+		appLogger.info('... {} values read from {} channel'.format(len(TData), TName))
+		# Remove duplicate time rows
+		pData = reader.removeDuplicateTimes(pData)
+		TData = reader.removeDuplicateTimes(TData)
+		# Convert units if necessary
+		Q.convertUnit(pData, quantity = 'Pressure', 
+			fromUnit = S.amrPressureChannel[1], toUnit = 'bar')
+		Q.convertUnit(TData, quantity = 'Temperature', 
+			fromUnit = S.amrTemperatureChannel[1], toUnit = 'K')
+		# Merge and clean the channel data (use common time column)			
+		channelData = reader.mergeChannels(
+				channelList = [pData, TData], channelNames = [pName, TName], 
+				resamplingInterval = S.resamplingInterval, maxIntervalNoValue = S.maxSamplingInterval,
+				method = getattr(S, 'resamplingMethod', 'linear'))
+		if (S.saveInputPlots):
+			self.plotAMRPTData(pData, TData, channelData, [pName, TName], dataName = dataName)
+		return dataName, channelData[pName], channelData[TName]
 	
+	def processInputFilesBatch(self, numWorkers = None, fileTimeout = None):
+		"""
+		Processes all the enabled input files (CSV and AMR) with a pool of worker
+		processes. The workers read the files and compute the damage matrices, while
+		this process is the only writer of the HDF5 and CSV results. Results are written
+		in the order of the input files, whatever the order in which they are computed.
+		A failing input file is logged and skipped, without affecting the others.
+		:param numWorkers: number of worker processes (default: number of CPUs)
+		:param fileTimeout: maximum time [s] to wait for the result of an input file
+			(default: no limit). A file whose worker died (e.g. crashed in a compiled 
+			extension) never returns a result, so without a timeout the batch hangs.
+		"""
+		import multiprocessing
+		inputFiles = []
+		if (S.readCSVFiles):
+			inputFiles += [('csv', fileName) for fileName in self.listInputFiles('*.csv')]
+		if (S.readAMRFiles):
+			inputFiles += [('amr', fileName) for fileName in self.listInputFiles('*.amr')]
+		if (S.writeStressResultsToHdf5):
+			appLogger.warning('Writing the stress results is not supported in batch mode')
+		appLogger.info('Processing {} input files with {} worker processes'.format(
+				len(inputFiles), numWorkers or multiprocessing.cpu_count()))
+		pool = multiprocessing.Pool(numWorkers, initializer = _initInputFileWorker)
+		timedOut = False
+		try:
+			asyncResults = [(inputFile[1], pool.apply_async(_processInputFileWorker, (inputFile,))) 
+					for inputFile in inputFiles]
+			# Wait for the results in the order of the input files
+			for inputFileName, asyncResult in asyncResults:
+				try:
+					fileName, dataName, channelDamages, errorMessage = asyncResult.get(fileTimeout)
+				except multiprocessing.TimeoutError:
+					appLogger.error('Processing input file "{}" timed out after {} s, the worker may have died'.format(
+						inputFileName, fileTimeout))
+					timedOut = True
+					continue
+				if (errorMessage is not None):
+					appLogger.error('Processing input file "{}" failed:\n{}'.format(fileName, errorMessage))
+					continue
+				self.saveDamages(dataName, channelDamages)
+		finally:
+			if (timedOut):
+				# Workers may still be busy with the timed out files
+				pool.terminate()
+			else:
+				pool.close()
+			pool.join()
+
 	def plotAMRPTData(self, pData, TData, pTData, channelNames, dataName = ''):
 		import pylab as plt
 		from matplotlib.dates import AutoDateFormatter, DateFormatter
@@ -348,8 +649,13 @@ class DamageCalculationExecutor(object):
 def main():
 	_logConfigurator = SimpleAppLoggerConfgigurator('MultiaxialDamageCalculator', debug = S.DEBUG)
 	executor = DamageCalculationExecutor()
-	executor.processCSVInputFiles()
-	executor.processAMRInputFiles()
+	batchNumWorkers = getattr(S, 'batchNumWorkers', None)
+	if (batchNumWorkers is not None):
+		executor.processInputFilesBatch(numWorkers = batchNumWorkers, 
+				fileTimeout = getattr(S, 'batchFileTimeout', None))
+	else:
+		executor.processCSVInputFiles()
+		executor.processAMRInputFiles()
 	executor.saveDamageCSV()
 	
 def stat():
@@ -16,69 +16,115 @@ class PercentileCalculator:
 		self.binWidth = (self.globalMax - self.globalMin) / (numBins - 1)
 		self.binCenters = np.arange(numBins) * self.binWidth + self.globalMin
 
+	@staticmethod
+	def reversalIndices(x, hysteresis = None):
+		"""
+		Returns the indices of the points of `x` which can change the state of the
+		turning point search: the first point, the first point of each local extremum
+		(plateaus included) and the last point. The points inside monotonic runs 
+		are dropped, because they are either superseded by the end of the run, 
+		or trigger the same state change as the end of the run.
+		
+		If `hysteresis` is given, small notches are removed as well: 4 consecutive
+		reversals a, b, c, e with a < c < b < e (or a > c > b > e) and b, c closer
+		than `hysteresis` never trigger the search and are superseded by e.
+		"""
+		numValues = len(x)
+		if (numValues < 3):
+			return np.arange(numValues)
+		d = np.diff(x)
+		nonZero = np.flatnonzero(d)
+		if (len(nonZero) == 0):
+			return np.array([0, numValues - 1])
+		rising = d[nonZero] > 0
+		turningIndices = nonZero[:-1][rising[1:] != rising[:-1]] + 1
+		indices = np.unique(np.concatenate((
+				[0], turningIndices, [nonZero[-1] + 1, numValues - 1])))
+		if (hysteresis is None):
+			return indices
+		while (True):
+			numRemoved = 0
+			# The notches removed at once must not overlap, so the candidates 
+			# are taken in 3 groups with a spacing of at least 3
+			for group in range(3):
+				v = x[indices]
+				a = v[:-3]
+				b = v[1:-2]
+				c = v[2:-1]
+				e = v[3:]
+				notches = ((a < c) & (c < b) & (b < e) & (c >= b - hysteresis)) | \
+					((a > c) & (c > b) & (b > e) & (c <= b + hysteresis))
+				notchPositions = np.flatnonzero(notches) + 1
+				notchPositions = notchPositions[notchPositions % 3 == group]
+				if (len(notchPositions) > 0):
+					keep = np.ones(len(indices), dtype = np.bool)
+					keep[notchPositions] = False
+					keep[notchPositions + 1] = False
+					indices = indices[keep]
+					numRemoved += len(notchPositions)
+			# Stop when the passes are not worth it anymore
+			if (numRemoved * 100 <= len(indices)):
+				break
+		return indices
+
 	def locateExtrema(self):
 		"""
 		This function finds local extrema. It searches for alternating minima and maxima.
 		To eliminate noise, a treshold of `binWidth` is used. 
+		Only the points returned by `reversalIndices` are visited by the search,
+		the rest of the work is done with array operations. The result is the
+		same as visiting every point.
 		"""
-		# Create the arrays for storing the extrema positions and values 
-		extremaIndices = np.zeros(len(self.stressVector), dtype = np.int)
-		extremaValues = np.zeros(len(self.stressVector), dtype = np.float)
-		lastMinIndex = 0
-		lastMaxIndex = 0
-		lastMinValue = np.Inf
-		lastMaxValue = -np.Inf
-		j = 1
+		stressVector = self.stressVector
+		numValues = len(stressVector)
 		
 		# Add the first point
-		extremaIndices[0] = 0
-		extremaValues[0] = self.stressVector[0]
-
-		# Decide if we start searching for min or max
-		i = 1
-		while (abs(self.stressVector[i] - self.stressVector[0]) < self.binWidth):
-			i += 1
-		if (self.stressVector[i] > self.stressVector[0]):
-			lookingForMaximum = True
-		else:
-			lookingForMaximum = False
+		extremaIndices = [0]
+		extremaValues = [stressVector[0]]
 		
-		# Search in the internal points
-		while (i < len(self.stressVector)):
-			sp = self.stressVector[i]
-			if (sp > lastMaxValue):
-				lastMaxValue = sp
-				lastMaxIndex = i
-			if (sp < lastMinValue):
-				lastMinValue = sp
-				lastMinIndex = i
-
-			if (lookingForMaximum):
-				if (sp < lastMaxValue - self.binWidth):
-					extremaValues[j] = lastMaxValue
-					extremaIndices[j] = lastMaxIndex
-					j += 1
-					lastMinValue = sp
-					lastMinIndex = i
-					lookingForMaximum = False
-			else:
-				if (sp > lastMinValue + self.binWidth):
-					extremaValues[j] = lastMinValue
-					extremaIndices[j] = lastMinIndex
-					j += 1
+		# Decide if we start searching for min or max
+		startCandidates = np.flatnonzero(np.abs(stressVector[1:] - stressVector[0]) >= self.binWidth)
+		if (len(startCandidates) > 0):
+			iStart = startCandidates[0] + 1
+			lookingForMaximum = (stressVector[iStart] > stressVector[0])
+			lastMinIndex = 0
+			lastMaxIndex = 0
+			lastMinValue = np.Inf
+			lastMaxValue = -np.Inf
+			binWidth = self.binWidth
+			
+			# Search in the internal points
+			searchIndices = iStart + self.reversalIndices(stressVector[iStart:], binWidth)
+			for i, sp in zip(searchIndices.tolist(), stressVector[searchIndices].tolist()):
+				if (sp > lastMaxValue):
 					lastMaxValue = sp
 					lastMaxIndex = i
-					lookingForMaximum = True
-			i += 1
+				if (sp < lastMinValue):
+					lastMinValue = sp
+					lastMinIndex = i
+	
+				if (lookingForMaximum):
+					if (sp < lastMaxValue - binWidth):
+						extremaValues.append(lastMaxValue)
+						extremaIndices.append(lastMaxIndex)
+						lastMinValue = sp
+						lastMinIndex = i
+						lookingForMaximum = False
+				else:
+					if (sp > lastMinValue + binWidth):
+						extremaValues.append(lastMinValue)
+						extremaIndices.append(lastMinIndex)
+						lastMaxValue = sp
+						lastMaxIndex = i
+						lookingForMaximum = True
 		
 		# Add the last point
-		extremaIndices[j] = (len(self.stressVector) - 1)
-		extremaValues[j] = self.stressVector[-1]
-		j += 1
+		extremaIndices.append(numValues - 1)
+		extremaValues.append(stressVector[-1])
 		
-		# Trim the arrays and convert them to percentiles
-		self.extremaIndices = extremaIndices[:j]
-		self.extremaValues = np.floor((extremaValues[:j] - self.globalMin) / self.binWidth + 0.5).astype(np.int)
+		# Convert the arrays to percentiles
+		self.extremaIndices = np.array(extremaIndices, dtype = np.int)
+		self.extremaValues = np.floor((np.array(extremaValues, dtype = np.float) - self.globalMin) / self.binWidth + 0.5).astype(np.int)
 		
 	def plot(self):
 		ax1 = plt.subplot(211)
@@ -203,5 +249,225 @@ class DamageCalculator:
 		#appLogger.info(self.rainflowMatrix)
 		return self.damage
 
+class StreamingRainflowCounter:
+	"""
+	Rainflow counter processing the stress history in chunks. Only the state
+	of the turning point search, the residual stack and the rainflow matrix
+	are kept, so the memory doesn't depend on the length of the history.
+	The stress bins are fixed in advance by `binEdges`, instead of being derived 
+	from the global minimum and maximum. Values outside of the edges are counted 
+	in the outer bins. Turning points and cycles are found as in `PercentileCalculator` 
+	and `RainflowCounter`, so the damage at the end of the history is the same as 
+	the one of the batch calculation with the same bins.
+	"""
+	def __init__(self, binEdges, hysteresis = None):
+		"""
+		:param binEdges: monotonically increasing array of numBins + 1 bin edges
+		:param hysteresis: noise threshold for the turning point search 
+			(default: the smallest bin width)
+		"""
+		self.binEdges = np.array(binEdges, dtype = np.float)
+		if (len(self.binEdges) < 2 or np.any(np.diff(self.binEdges) <= 0)):
+			raise ValueError('The bin edges must be a monotonically increasing array with at least 2 values')
+		self.numBins = len(self.binEdges) - 1
+		self.binCenters = (self.binEdges[:-1] + self.binEdges[1:]) / 2
+		# Origin and width of uniform bins (set by `setUniformBins`)
+		self.binOrigin = None
+		self.binWidth = None
+		if (hysteresis is None):
+			hysteresis = np.min(np.diff(self.binEdges))
+		self.hysteresis = hysteresis
+		self.rainflowMatrix = np.zeros((self.numBins, self.numBins))
+		# Turning point search state
+		self.numSamples = 0
+		self.firstValue = None
+		self.lastValue = None
+		self.lookingForMaximum = None
+		self.lastMinValue = np.Inf
+		self.lastMaxValue = -np.Inf
+		# Residual stack state
+		self.residual = []
+		self.ir = 1
+		# S-N curve
+		self.S_E = None
+		self.N_E = None
+		self.k = None
+		self.M = 0.
+	
+	@staticmethod
+	def fromRange(minStress, maxStress, numBins):
+		"""
+		Creates a counter with the same bins as `PercentileCalculator` would use
+		for a history with the given global minimum and maximum
+		"""
+		binWidth = (maxStress - minStress) / float(numBins - 1)
+		binEdges = minStress + (np.arange(numBins + 1) - 0.5) * binWidth
+		counter = StreamingRainflowCounter(binEdges, hysteresis = binWidth)
+		counter.setUniformBins(minStress, binWidth)
+		return counter
+	
+	def setUniformBins(self, binOrigin, binWidth):
+		"""
+		Computes the bin indices as `PercentileCalculator` does, i.e. by rounding
+		(value - binOrigin) / binWidth, instead of comparing with the bin edges.
+		Values exactly on an edge are then assigned to the same bin as in the 
+		batch calculation.
+		:param binOrigin: center of the first bin
+		:param binWidth: width of the bins
+		"""
+		self.binOrigin = float(binOrigin)
+		self.binWidth = float(binWidth)
+		self.binCenters = np.arange(self.numBins) * self.binWidth + self.binOrigin
+	
+	def setSNCurveParameters(self, S_E, N_E, k):
+		self.S_E = S_E
+		self.N_E = N_E
+		self.k = k
+
+	def setMeanStressCorrection(self, M):
+		self.M = M
+	
+	def getBinIndex(self, value):
+		if (self.binWidth is not None):
+			binIndex = int(np.floor((value - self.binOrigin) / self.binWidth + 0.5))
+		else:
+			binIndex = np.searchsorted(self.binEdges, value, side = 'right') - 1
+		return min(max(binIndex, 0), self.numBins - 1)
+	
+	def addStresses(self, stressChunk):
+		"""
+		Processes the next chunk of the stress history
+		"""
+		stressChunk = np.asarray(stressChunk, dtype = np.float)
+		if (len(stressChunk) == 0):
+			return
+		i = 0
+		if (self.firstValue is None):
+			# Add the first point
+			self.firstValue = float(stressChunk[0])
+			self.addTurningPoint(self.firstValue)
+			i = 1
+		if (self.lookingForMaximum is None):
+			# Decide if we start searching for min or max
+			startCandidates = np.flatnonzero(np.abs(stressChunk[i:] - self.firstValue) >= self.hysteresis)
+			if (len(startCandidates) > 0):
+				i += startCandidates[0]
+				self.lookingForMaximum = bool(stressChunk[i] > self.firstValue)
+			else:
+				i = len(stressChunk)
+		searchValues = stressChunk[i:]
+		searchValues = searchValues[PercentileCalculator.reversalIndices(searchValues, self.hysteresis)].tolist()
+		lookingForMaximum = self.lookingForMaximum
+		lastMinValue = self.lastMinValue
+		lastMaxValue = self.lastMaxValue
+		for sp in searchValues:
+			if (sp > lastMaxValue):
+				lastMaxValue = sp
+			if (sp < lastMinValue):
+				lastMinValue = sp
+			if (lookingForMaximum):
+				if (sp < lastMaxValue - self.hysteresis):
+					self.addTurningPoint(lastMaxValue)
+					lastMinValue = sp
+					lookingForMaximum = False
+			else:
+				if (sp > lastMinValue + self.hysteresis):
+					self.addTurningPoint(lastMinValue)
+					lastMaxValue = sp
+					lookingForMaximum = True
+		self.lookingForMaximum = lookingForMaximum
+		self.lastMinValue = lastMinValue
+		self.lastMaxValue = lastMaxValue
+		self.lastValue = float(stressChunk[-1])
+		self.numSamples += len(stressChunk)
+	
+	def addTurningPoint(self, value):
+		self.ir = self.fillRainflowMatrix(self.getBinIndex(value), 
+				self.residual, self.ir, self.rainflowMatrix)
+	
+	@staticmethod
+	def fillRainflowMatrix(s, residual, ir, rainflowMatrix):
+		"""
+		Adds a single turning point to the residual stack (3-point algorithm),
+		counting the closed cycles in the rainflow matrix
+		:return: the updated value of `ir`
+		"""
+		repeat = True
+		while (repeat):
+			repeat = False
+			iz = len(residual)
+			if (iz > ir):
+				secLastRes = residual[iz - 2]
+				lastRes = residual[iz - 1]
+				if (s - lastRes) * (lastRes - secLastRes) >= 0:
+					residual.pop()
+					repeat = True
+				elif (abs(s - lastRes) >= abs(lastRes - secLastRes)):
+					rainflowMatrix[lastRes, secLastRes] += 1
+					del residual[-2:]
+					repeat = True
+			elif (iz == ir):
+				lastRes = residual[iz - 1]
+				if ((s - lastRes) * lastRes) >= 0:
+					residual.pop()
+					repeat = True
+				elif (abs(s) > abs(lastRes)):
+					ir += 1
+		residual.append(s)
+		return ir
+	
+	def getRainflowMatrix(self, includeResidual = True):
+		"""
+		Returns the current rainflow matrix
+		:param includeResidual: if True, the history is closed with the last 
+			sample and the cycles of the repeated residual are added, as in the 
+			batch calculation. The state of the counter is not modified.
+		"""
+		if (not includeResidual or self.firstValue is None):
+			return self.rainflowMatrix.copy()
+		rainflowMatrix = self.rainflowMatrix.copy()
+		residual = list(self.residual)
+		# Add the last point
+		self.fillRainflowMatrix(self.getBinIndex(self.lastValue), residual, self.ir, rainflowMatrix)
+		# Repeat the run on the residual
+		residual0 = residual[:-1]
+		repeatedResidual = []
+		ir = 1
+		for s in residual0 + residual0:
+			ir = self.fillRainflowMatrix(s, repeatedResidual, ir, rainflowMatrix)
+		return rainflowMatrix
+	
+	def getDamage(self, includeResidual = True):
+		"""
+		Returns the Miner damage of the history processed so far
+		"""
+		if (self.S_E is None):
+			raise ValueError('S-N curve parameters not set, call setSNCurveParameters first')
+		damageCalc = DamageCalculator(self.getRainflowMatrix(includeResidual), self.binCenters)
+		damageCalc.setSNCurveParameters(S_E = self.S_E, N_E = self.N_E, k = self.k)
+		damageCalc.applyOneParameterMeanStressCorrection(M = self.M)
+		return damageCalc.computeDamage()
+	
+	@staticmethod
+	def test():
+		stressVector = np.sin(np.arange(5000) * 0.05) * (1 + np.sin(np.arange(5000) * 0.0031)) \
+			+ 0.1 * np.sin(np.arange(5000) * 1.7)
+		numBins = 64
+		# Batch calculation
+		percCalc = PercentileCalculator(stressVector, numBins)
+		percCalc.locateExtrema()
+		rainflowCalc = RainflowCounter(percCalc.extremaValues, percCalc.binCenters)
+		rainflowCalc.computeMatrix()
+		rainflowCalc.residualRepeatedRun()
+		# Streaming calculation
+		streamCalc = StreamingRainflowCounter.fromRange(
+				np.min(stressVector), np.max(stressVector), numBins)
+		for chunkStart in range(0, len(stressVector), 777):
+			streamCalc.addStresses(stressVector[chunkStart : chunkStart + 777])
+		streamMatrix = streamCalc.getRainflowMatrix()
+		print('Batch cycles: {}, streaming cycles: {}, max difference: {}'.format(
+			np.sum(rainflowCalc.rainflowMatrix), np.sum(streamMatrix), 
+			np.max(np.abs(rainflowCalc.rainflowMatrix - streamMatrix))))
+
 if __name__ == '__main__':
 	PercentileCalculator.test()
\ No newline at end of file
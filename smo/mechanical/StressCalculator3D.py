@@ -7,50 +7,103 @@ appLogger = logging.getLogger('AppLogger')
 """ Private: Settings """
 stressTypeNames = ['s11', 's22', 's33', 's12', 's13', 's23']
 
+""" Private: Positions of the stress components in a flattened 3x3 tensor """
+tensorColumns = [0, 4, 8, 1, 2, 5]
+tensorDuplicateColumns = [-1, -1, -1, 3, 6, 7]
+
 class StressCalculator3D(object):
 	def __init__(self, stressTablesPath, useCompiledExtensions = True):
 		self.useCompiledExtensions = useCompiledExtensions
 		self.createInterpFunctions(stressTablesPath)
 				
 	def createInterpFunctions(self, stressTablesPath):
+		"""
+		Creates a single interpolator per channel for the 6 stress components, 
+		with the tables stored as one contiguous (np, nT, 6) array. The grid cell 
+		and the weights are then computed once per sample for all the components.
+		"""
 		if self.useCompiledExtensions:
-			from smo_ext.Math import Interpolator2D
+			from smo_ext.Math import TableInterpolator2D
 		else:
 			from smo.math.Interpolators import Interpolator2D
 		# Create stress interpolators
-		h5File = h5py.File(stressTablesPath)
+		h5File = h5py.File(stressTablesPath, 'r')
 		self.channelNames = [str(grp) for grp in h5File]
 		
 		self.stressInterpolators = {}
 		for channelName in self.channelNames:
 			appLogger.info("Creating interpolators for channel '%s'"%(channelName))
-			TArr = np.array(h5File['/%s/T'%channelName])
-			pArr = np.array(h5File['/%s/p'%channelName])
-			self.stressInterpolators[channelName] = {}
-			for stressTypeName in stressTypeNames:
-				# Read stress data from hdf5 StressTables
-				stressMatrix = np.array(h5File['/%s/%s'%(channelName, stressTypeName)])
-				
-				# Create stress interpolator function
-				fInterp = Interpolator2D(TArr, pArr, stressMatrix)
-	
-				self.stressInterpolators[channelName][stressTypeName] = fInterp	
+			TArr = np.array(h5File['/%s/T'%channelName], dtype = np.float64)
+			pArr = np.array(h5File['/%s/p'%channelName], dtype = np.float64)
+			# Read stress data from hdf5 StressTables
+			stressTable = np.empty(shape = (len(pArr), len(TArr), len(stressTypeNames)), dtype = np.float64)
+			for k, stressTypeName in enumerate(stressTypeNames):
+				stressTable[..., k] = h5File['/%s/%s'%(channelName, stressTypeName)]
+			# Create stress interpolator function
+			if self.useCompiledExtensions:
+				self.stressInterpolators[channelName] = TableInterpolator2D(TArr, pArr, stressTable)
+			else:
+				self.stressInterpolators[channelName] = Interpolator2D(TArr, pArr, stressTable)
 		h5File.close()
-		
-	def computeStresses(self, pData, TData):
+	
+	def computeStresses(self, pData, TData, packed = False, fillSymmetric = True):
+		"""
+		Computes the stress tensors for all the channels
+		:param packed: if True, the stresses of each channel are stored as (N, 6) arrays
+			with components in the order of `stressTypeNames`, otherwise as (N, 3, 3) tensors
+		:param fillSymmetric: if False, only the upper triangle of the (N, 3, 3) tensors is written
+		"""
 		numbMeasurments = len(pData) #number measurements
-		stressDType = [(channel, np.float64, (3, 3)) for channel in self.channelNames]
+		if (packed):
+			stressDType = [(channel, np.float64, (len(stressTypeNames),)) for channel in self.channelNames]
+		else:
+			stressDType = [(channel, np.float64, (3, 3)) for channel in self.channelNames]
 		self.stressData = np.zeros(shape = (numbMeasurments), dtype = stressDType)
 		
 		for channelName in self.channelNames:
-			channelData = self.stressData[channelName]
-			channelData[:, 0, 0] = self.stressInterpolators[channelName]['s11'](TData, pData)
-			channelData[:, 1, 1] = self.stressInterpolators[channelName]['s22'](TData, pData)
-			channelData[:, 2, 2] = self.stressInterpolators[channelName]['s33'](TData, pData)
-			channelData[:, 0, 1] = channelData[:, 1, 0] = self.stressInterpolators[channelName]['s12'](TData, pData)
-			channelData[:, 0, 2] = channelData[:, 2, 0] = self.stressInterpolators[channelName]['s13'](TData, pData)
-			channelData[:, 1, 2] = channelData[:, 2, 1] = self.stressInterpolators[channelName]['s23'](TData, pData)
+			self.computeChannelStresses(channelName, pData, TData, 
+					out = self.stressData[channelName], fillSymmetric = fillSymmetric)
+	
+	def computeChannelStresses(self, channelName, pData, TData, out, fillSymmetric = True):
+		"""
+		Computes the stresses of a single channel into a preallocated (N, 6) or (N, 3, 3) array
+		"""
+		TData = np.ascontiguousarray(TData, dtype = np.float64)
+		pData = np.ascontiguousarray(pData, dtype = np.float64)
+		# View the output as a 2D array without copying
+		out2D = out.view()
+		if (out.ndim == 3):
+			out2D.shape = (out.shape[0], 9)
+			outColumns = tensorColumns
+			duplicateColumns = tensorDuplicateColumns if fillSymmetric else [-1] * len(stressTypeNames)
+		else:
+			outColumns = range(len(stressTypeNames))
+			duplicateColumns = [-1] * len(stressTypeNames)
+		interpolator = self.stressInterpolators[channelName]
+		if self.useCompiledExtensions:
+			interpolator(TData, pData, out2D, outColumns, duplicateColumns)
+		else:
+			stresses = interpolator(TData, pData)
+			for k in range(len(stressTypeNames)):
+				out2D[:, outColumns[k]] = stresses[:, k]
+				if (duplicateColumns[k] >= 0):
+					out2D[:, duplicateColumns[k]] = stresses[:, k]
+		return out
 		
+	def iterChannelStresses(self, channelName, pData, TData, chunkSize):
+		"""
+		Generator computing the (n, 3, 3) stresses of a single channel chunk by chunk.
+		The same buffer is reused for all the chunks, so it must be consumed 
+		(or copied) before the next chunk is requested.
+		"""
+		numSamples = len(pData)
+		buffer = np.zeros(shape = (min(chunkSize, numSamples), 3, 3), dtype = np.float64)
+		for chunkStart in range(0, numSamples, chunkSize):
+			chunkEnd = min(chunkStart + chunkSize, numSamples)
+			out = buffer[:chunkEnd - chunkStart]
+			yield self.computeChannelStresses(channelName, 
+					pData[chunkStart:chunkEnd], TData[chunkStart:chunkEnd], out = out)
+
 	def writeStresses(self, filePath, datasetName):
 		h5File = h5py.File(filePath)
 		appLogger.info('Writing stress dataset "%s" to file %s'%(datasetName, filePath))
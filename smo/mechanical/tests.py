@@ -0,0 +1,79 @@
+'''
+Created on Oct 18, 2026
+
+@author: Atanas Pavlov
+@copyright: SysMo Ltd, Bulgaria
+'''
+import unittest
+import numpy as np
+from smo.mechanical.Rainflow import PercentileCalculator, RainflowCounter, StreamingRainflowCounter
+
+try:
+	from smo_ext.Mechanical import StreamingRainflowCounter as CStreamingRainflowCounter
+except ImportError:
+	CStreamingRainflowCounter = None
+
+"""
+======================================
+Rainflow.py
+======================================
+"""
+
+def batchRainflowMatrix(stressVector, numBins):
+	percCalc = PercentileCalculator(stressVector, numBins)
+	percCalc.locateExtrema()
+	rainflowCalc = RainflowCounter(percCalc.extremaValues, percCalc.binCenters)
+	rainflowCalc.computeMatrix()
+	rainflowCalc.residualRepeatedRun()
+	return rainflowCalc.rainflowMatrix
+
+def streamingRainflowMatrix(counterClass, stressVector, numBins, chunkSize):
+	counter = counterClass.fromRange(np.min(stressVector), np.max(stressVector), numBins)
+	for chunkStart in range(0, len(stressVector), chunkSize):
+		counter.addStresses(stressVector[chunkStart : chunkStart + chunkSize])
+	return counter.getRainflowMatrix()
+
+class TestStreamingRainflowCounter(unittest.TestCase):
+	def setUp(self):
+		self.counterClasses = [StreamingRainflowCounter]
+		if (CStreamingRainflowCounter is not None):
+			self.counterClasses.append(CStreamingRainflowCounter)
+	
+	def checkSameAsBatch(self, stressVector, numBins, chunkSize = 97):
+		batchMatrix = batchRainflowMatrix(stressVector, numBins)
+		for counterClass in self.counterClasses:
+			streamMatrix = streamingRainflowMatrix(counterClass, stressVector, numBins, chunkSize)
+			np.testing.assert_array_equal(streamMatrix, batchMatrix)
+	
+	def testBinOnEdge(self):
+		# -21 and -3 are on bin edges, where comparing with the computed edges
+		# and rounding disagree in floating point
+		stressVector = np.array([-30., 0., -21., 3., -3., -21., 6., -30., -3.])
+		self.checkSameAsBatch(stressVector, numBins = 15, chunkSize = 3)
+	
+	def testIntegerSignals(self):
+		# Quantized signals put many values on the bin edges
+		random = np.random.RandomState(1234)
+		for numBins in [7, 10, 15, 16, 32, 64, 100]:
+			for _ in range(10):
+				minStress = random.randint(-30, 0)
+				maxStress = random.randint(1, 40)
+				stressVector = random.randint(minStress, maxStress + 1, size = 2000).astype(np.float)
+				self.checkSameAsBatch(stressVector, numBins)
+	
+	def testSmoothSignal(self):
+		t = np.arange(5000)
+		stressVector = np.sin(t * 0.05) * (1 + np.sin(t * 0.0031)) + 0.1 * np.sin(t * 1.7)
+		self.checkSameAsBatch(stressVector, numBins = 64, chunkSize = 777)
+	
+	def testDamageWithoutSNCurve(self):
+		counter = StreamingRainflowCounter.fromRange(-1., 1., 10)
+		counter.addStresses(np.array([-1., 1., -1.]))
+		self.assertRaises(ValueError, counter.getDamage)
+		if (CStreamingRainflowCounter is not None):
+			counter = CStreamingRainflowCounter.fromRange(-1., 1., 10)
+			counter.addStresses(np.array([-1., 1., -1.]))
+			self.assertRaises(RuntimeError, counter.getDamage)
+
+if __name__ == '__main__':
+	unittest.main()
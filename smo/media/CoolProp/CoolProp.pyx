@@ -2,6 +2,9 @@ from libcpp.string cimport string
 from libcpp cimport bool
 from numpy.math cimport INFINITY
 cimport CoolProp_Imports as CP
+import os
+import hashlib
+import numpy as np
 
 cdef class Fluid:
 	""" 
@@ -138,6 +141,213 @@ cdef class Fluid:
 			'rhoV': rhoVout
 			}
 
+	def enableLUT(self, **options):
+		"""enableLUT(**options)
+		Makes the states of this fluid use a property table (see :func:`enableLUT`)
+		"""
+		enableLUT(self.fluidName, **options)
+
+	def disableLUT(self):
+		"""disableLUT()
+		Makes the states of this fluid use the full equation of state
+		"""
+		disableLUT(self.fluidName)
+
+	def usesLUT(self):
+		"""usesLUT()
+		Checks if the states of this fluid use a property table
+		"""
+		return lutSelection.get(canonicalName(self), lutDefaults['enabled'])
+
+#============================================================================
+# Property tables (LUT)
+
+# Default options of the property tables, see :func:`setLUTDefaults`
+lutDefaults = {
+	'enabled': False,
+	'Np': 200,
+	'Nh': 200,
+	'NT': 200,
+	'tolerance': 1e-4,
+	'criticalBand': 0.05,
+	'saturationBand': 0.01,
+	'cacheFolder': os.path.join(os.path.expanduser('~'), '.smo', 'CoolPropTables'),
+}
+# Fluids for which the tables are explicitly enabled (True) or disabled (False)
+lutSelection = {}
+# Options of the tables of specific fluids
+lutOptions = {}
+# Loaded tables by fluid name and options
+propertyTables = {}
+# Tables used by the fluid states, by fluid name
+activeTables = {}
+
+cdef class PropertyTable:
+	"""
+	Tables of the temperature and density of a fluid as functions of (p, h) and (T, p).
+	The fluid states use the interpolated T and rho as the initial values of a few Newton
+	iterations on (T, rho), instead of the iterative solution of the equation of state.
+	The p and h (resp. p) of the states match the inputs within a relative tolerance of 1e-9,
+	and the rest of the properties are computed by the equation of state from T and rho.
+	"""
+	cdef CP.SmoFlow_PropertyTable* ptr
+	cdef Fluid fluid
+
+	def __init__(self, fluid, Np, Nh, NT, pMin, pMax, TMin, TMax,
+			tolerance, criticalBand, saturationBand):
+		"""__init__(fluid, Np, Nh, NT, pMin, pMax, TMin, TMax, tolerance, criticalBand, saturationBand)
+		:param fluid: :class:`Fluid` object
+		:param Np: number of pressure nodes
+		:param Nh: number of enthalpy nodes
+		:param NT: number of temperature nodes
+		:param pMin: minimum pressure
+		:param pMax: maximum pressure
+		:param TMin: minimum temperature
+		:param TMax: maximum temperature
+		:param tolerance: maximum relative interpolation error of T and rho, checked at
+			9 points of each cell (this is an estimate, not a strict bound). It affects
+			the number of iterations, not the accuracy of the states.
+		:param criticalBand: relative size of the region around the critical point
+			in which the equation of state is used
+		:param saturationBand: relative size of the region around the saturation
+			line in which the equation of state is used
+		"""
+		pass
+
+	def __cinit__(self, Fluid fluid, int Np, int Nh, int NT,
+			double pMin, double pMax, double TMin, double TMax,
+			double tolerance, double criticalBand, double saturationBand):
+		self.fluid = fluid
+		self.ptr = new CP.SmoFlow_PropertyTable(fluid.ptr, Np, Nh, NT,
+				pMin, pMax, TMin, TMax, tolerance, criticalBand, saturationBand)
+
+	def __dealloc__(self):
+		del self.ptr
+
+	def build(self):
+		"""build()
+		Computes the tables with the equation of state
+		"""
+		self.ptr.build()
+
+	def save(self, string filePath):
+		"""save(filePath)"""
+		self.ptr.save(filePath)
+
+	def load(self, string filePath):
+		"""load(filePath)
+		Reads tables saved with the same options\n
+		Returns True on success
+		"""
+		return self.ptr.load(filePath)
+
+	property maxError:
+		"""maximum relative interpolation error of T and rho at the check points of the (p, h) and (T, p) tables"""
+		def __get__(self):
+			return {'ph': self.ptr.maxError_ph, 'Tp': self.ptr.maxError_Tp}
+
+	property validFraction:
+		"""fraction of the cells of the (p, h) and (T, p) tables which are used"""
+		def __get__(self):
+			return {'ph': self.ptr.validFraction_ph(), 'Tp': self.ptr.validFraction_Tp()}
+
+cdef object canonicalName(Fluid fluid):
+	# Fluids may be created by their aliases
+	return fluid.ptr.get_name()
+
+cdef registerPropertyTable(Fluid fluid, PropertyTable table):
+	CP.SmoFlow_PropertyTable_setTable(fluid.ptr, table.ptr if table is not None else NULL)
+
+def getVersion():
+	"""getVersion()
+	Returns the version of the CoolProp library
+	"""
+	return CP.get_global_param_string('version')
+
+def setLUTDefaults(**options):
+	"""setLUTDefaults(**options)
+	Sets the default options of the property tables, e.g. ``enabled = True``
+	to make all the fluids use tables (unless disabled for the fluid)
+	"""
+	unknownOptions = set(options.keys()) - set(lutDefaults.keys())
+	if (len(unknownOptions) > 0):
+		raise KeyError('Unknown property table options: ' + ', '.join(unknownOptions))
+	lutDefaults.update(options)
+
+def enableLUT(fluidName, **options):
+	"""enableLUT(fluidName, **options)
+	:param fluidName: name of fluid
+	:param options: options overriding the defaults (see :func:`setLUTDefaults`) and
+		the pressure and temperature ranges (pMin, pMax, TMin, TMax) of the tables
+
+	Makes the states of the fluid use a property table. The table is loaded from
+	the cache folder or built (and saved there) when the next state is created.
+	"""
+	cdef Fluid fluid = Fluid(fluidName)
+	name = canonicalName(fluid)
+	lutSelection[name] = True
+	if (options != lutOptions.get(name, {})):
+		lutOptions[name] = options
+		# Use the table with the new options from the next state on
+		activeTables.pop(name, None)
+		registerPropertyTable(fluid, None)
+
+def disableLUT(fluidName):
+	"""disableLUT(fluidName)
+	Makes the states of the fluid use the full equation of state
+	"""
+	cdef Fluid fluid = Fluid(fluidName)
+	name = canonicalName(fluid)
+	lutSelection[name] = False
+	activeTables.pop(name, None)
+	registerPropertyTable(fluid, None)
+
+def getPropertyTable(Fluid fluid):
+	"""getPropertyTable(fluid)
+	Returns the property table of a fluid with the current options,
+	loading it from the cache folder or building it
+	"""
+	name = canonicalName(fluid)
+	options = dict(lutDefaults)
+	options.update(lutOptions.get(name, {}))
+	tableOptions = (
+		int(options['Np']), int(options['Nh']), int(options['NT']),
+		float(options.get('pMin', max(fluid.ptr.params.ptriple, 100.))),
+		float(options.get('pMax', fluid.ptr.limits.pmax)),
+		float(options.get('TMin', max(fluid.ptr.params.Ttriple, fluid.ptr.limits.Tmin))),
+		float(options.get('TMax', fluid.ptr.limits.Tmax)),
+		float(options['tolerance']), float(options['criticalBand']), float(options['saturationBand'])
+	)
+	table = propertyTables.get((name, tableOptions))
+	if (table is not None):
+		return table
+	table = PropertyTable(fluid, *tableOptions)
+	# The tables depend on the options and the equation of state
+	tableKey = repr((name, getVersion(), tableOptions))
+	filePath = os.path.join(options['cacheFolder'],
+			'{0}_{1}.lut'.format(name, hashlib.md5(tableKey).hexdigest()))
+	if (not table.load(filePath)):
+		table.build()
+		if (not os.path.exists(options['cacheFolder'])):
+			os.makedirs(options['cacheFolder'])
+		# Write to a temporary file first, so that other processes never read partial files
+		tmpFilePath = '{0}.{1}.tmp'.format(filePath, os.getpid())
+		table.save(tmpFilePath)
+		os.rename(tmpFilePath, filePath)
+	# The tables are never released, since states in other threads may be using them
+	propertyTables[(name, tableOptions)] = table
+	return table
+
+def loadLUT(Fluid fluid):
+	"""loadLUT(fluid)
+	Makes the states of the fluid use its property table, if selected
+	"""
+	name = canonicalName(fluid)
+	if (lutSelection.get(name, lutDefaults['enabled']) and name not in activeTables):
+		table = getPropertyTable(fluid)
+		registerPropertyTable(fluid, table)
+		activeTables[name] = table
+
 #============================================================================
 
 cdef class SaturationState:
@@ -288,6 +498,8 @@ cdef class FluidState:
 			self.ptr = new CP.SmoFlow_CoolPropState((<Fluid>fluid).ptr)
 		else:
 			raise TypeError('The argument of FluidState constructor must be either str or Fluid')
+		if (lutDefaults['enabled'] or len(lutSelection) > 0):
+			loadLUT(self.fluid)
 		
 		self._SatL = SaturationStateLiquid(self)
 		self._SatV = SaturationStateVapor(self)
@@ -649,4 +861,176 @@ cdef class FluidState:
 			'h': self.h,
 			's': self.s,
 			'q': self.q
-		}
\ No newline at end of file
+		}
+
+#============================================================================
+
+# Properties computed by FluidStateArray
+stateArrayOutputs = {
+	'T': CP.OUTPUT_T,
+	'p': CP.OUTPUT_P,
+	'rho': CP.OUTPUT_RHO,
+	'v': CP.OUTPUT_V,
+	'h': CP.OUTPUT_H,
+	's': CP.OUTPUT_S,
+	'u': CP.OUTPUT_U,
+	'q': CP.OUTPUT_Q,
+	'dT': CP.OUTPUT_DT,
+	'cp': CP.OUTPUT_CP,
+	'cv': CP.OUTPUT_CV,
+	'beta': CP.OUTPUT_BETA,
+	'mu': CP.OUTPUT_MU,
+	'cond': CP.OUTPUT_COND,
+	'Pr': CP.OUTPUT_PR,
+	'gamma': CP.OUTPUT_GAMMA,
+}
+
+cdef class FluidStateArray:
+	"""
+	Fluid states for arrays of state variable values. The states are computed in C++
+	with the GIL released, and the requested properties are returned as numpy arrays
+	"""
+	cdef Fluid fluid
+	cdef public int numThreads
+	cdef public object properties
+
+	def __init__(self, fluid, numThreads = 1, properties = ('T', 'p', 'rho', 'h', 's', 'q')):
+		"""__init__(fluid, numThreads = 1, properties = ('T', 'p', 'rho', 'h', 's', 'q'))
+		:param fluid: name of fluid or :class:`Fluid` object
+		:param numThreads: number of threads between which the states are split
+		:param properties: default properties computed by the update functions
+		"""
+		pass
+
+	def __cinit__(self, fluid, numThreads = 1, properties = ('T', 'p', 'rho', 'h', 's', 'q')):
+		if (isinstance(fluid, str) or isinstance(fluid, unicode)):
+			self.fluid = Fluid(fluid)
+		elif (isinstance(fluid, Fluid)):
+			self.fluid = fluid
+		else:
+			raise TypeError('The argument of FluidStateArray constructor must be either str or Fluid')
+		self.numThreads = numThreads
+		self.properties = properties
+		if (lutDefaults['enabled'] or len(lutSelection) > 0):
+			loadLUT(self.fluid)
+
+	property fluid:
+		"""fluid"""
+		def __get__(self):
+			return self.fluid
+
+	def update(self,
+			string state1, state1Values,
+			string state2, state2Values,
+			properties = None):
+		"""update(state1, state1Values, state2, state2Values, properties = None)
+		:param state1: name of first state variable
+		:param state1Values: values of first state variable
+		:param state2: name of second state variable
+		:param state2Values: values of second state variable
+		:param properties: names of the computed properties (default: self.properties)
+
+		Computes the fluid states for the (broadcast) arrays of state variable values.\n
+		Returns dictionary of property arrays with the shape of the inputs,
+		the properties of the states which cannot be computed are NaN
+		"""
+		cdef long p1Index = CP.get_param_index(state1)
+		cdef long p2Index = CP.get_param_index(state2)
+		if (p1Index < 0 or p2Index < 0):
+			raise ValueError('Invalid state variables {0}, {1}'.format(state1, state2))
+		if (properties is None):
+			properties = self.properties
+		for name in properties:
+			if (name not in stateArrayOutputs):
+				raise KeyError('Unknown property {0}, must be one of {1}'.format(name, ', '.join(stateArrayOutputs.keys())))
+		values1, values2 = np.broadcast_arrays(
+			np.asarray(state1Values, dtype = np.float64), np.asarray(state2Values, dtype = np.float64))
+		shape = values1.shape
+		results = np.empty((len(properties), values1.size))
+		if (values1.size > 0):
+			self.computeStates(p1Index, np.ascontiguousarray(values1.ravel()),
+				p2Index, np.ascontiguousarray(values2.ravel()),
+				np.array([stateArrayOutputs[name] for name in properties], dtype = np.int_), results)
+		return {name: results[k].reshape(shape) for k, name in enumerate(properties)}
+
+	cdef computeStates(self, long p1Index, double[::1] values1, long p2Index, double[::1] values2,
+			long[::1] outputs, double[:, ::1] results):
+		cdef CP.Fluid* pFluid = self.fluid.ptr
+		cdef long n = values1.shape[0]
+		cdef int numOutputs = outputs.shape[0]
+		cdef int numThreads = self.numThreads
+		with nogil:
+			CP.SmoFlow_updateStates(pFluid, p1Index, &values1[0], p2Index, &values2[0], n,
+				&outputs[0], numOutputs, &results[0, 0], numThreads)
+
+	def update_Tp(self, T, p, properties = None):
+		"""update_Tp(T, p, properties = None)
+		:param T: temperature array
+		:param p: pressure array
+		
+		Computes fluid states by temperature and presure
+		"""
+		return self.update('T', T, 'P', p, properties)
+
+	def update_Trho(self, T, rho, properties = None):
+		"""update_Trho(T, rho, properties = None)
+		:param T: temperature array
+		:param rho: density array
+		
+		Computes fluid states by temperature and density
+		"""
+		return self.update('T', T, 'D', rho, properties)
+
+	def update_Ts(self, T, s, properties = None):
+		"""update_Ts(T, s, properties = None)
+		:param T: temperature array
+		:param s: specific entropy array
+		
+		Computes fluid states by temperature and specific entropy
+		"""
+		return self.update('T', T, 'S', s, properties)
+
+	def update_prho(self, p, rho, properties = None):
+		"""update_prho(p, rho, properties = None)
+		:param p: pressure array
+		:param rho: density array
+		
+		Computes fluid states by pressure and density
+		"""
+		return self.update('P', p, 'D', rho, properties)
+
+	def update_ph(self, p, h, properties = None):
+		"""update_ph(p, h, properties = None)
+		:param p: pressure array
+		:param h: specific enthalpy array
+		
+		Computes fluid states by pressure and specific enthalpy
+		"""
+		return self.update('P', p, 'H', h, properties)
+
+	def update_ps(self, p, s, properties = None):
+		"""update_ps(p, s, properties = None)
+		:param p: pressure array
+		:param s: specific entropy array
+		
+		Computes fluid states by pressure and specific entropy
+		"""
+		return self.update('P', p, 'S', s, properties)
+
+	def update_pq(self, p, q, properties = None):
+		"""update_pq(p, q, properties = None)
+		:param p: pressure array
+		:param q: vapor quality array
+		
+		Computes fluid states by pressure and vapor quality
+		"""
+		return self.update('P', p, 'Q', q, properties)
+
+	def update_Tq(self, T, q, properties = None):
+		"""update_Tq(T, q, properties = None)
+		:param T: temperature array
+		:param q: vapor quality array
+		
+		Computes fluid states by temperature and vapor quality
+		"""
+		return self.update('T', T, 'Q', q, properties)
@@ -7,6 +7,7 @@ cdef extern from "CoolProp/CoolProp.h":
 	long get_Fluid_index(string FluidName) except +
 	Fluid* get_fluid(long iFluid) except +
 	long get_param_index(string param) except +
+	string get_global_param_string(string ParamName) except +
 
 	cdef cppclass PressureUnit:
 		double Pa
@@ -32,6 +33,7 @@ cdef extern from "CoolProp/CoolProp.h":
 	
 	
 	cdef cppclass Fluid:
+		string get_name()
 		string get_EOSReference() except +
 		string get_TransportReference() except +
 		vector[string] get_aliases() except +
@@ -49,7 +51,43 @@ cdef extern from "CoolProp/CoolProp.h":
 		
 
 
+cdef extern from "SmoFlowPropertyTable.h":
+	cdef cppclass SmoFlow_PropertyTable:
+		SmoFlow_PropertyTable(Fluid* pFluid, int Np, int Nh, int NT,
+				double pMin, double pMax, double TMin, double TMax,
+				double tolerance, double criticalBand, double saturationBand) except +
+		void build() except +
+		void save(string filePath) except +
+		bool load(string filePath) except +
+		double maxError_ph, maxError_Tp
+		double validFraction_ph()
+		double validFraction_Tp()
+
+	void SmoFlow_PropertyTable_setTable "SmoFlow_PropertyTable::setTable"(Fluid* pFluid, SmoFlow_PropertyTable* table)
+
 cdef extern from "SmoFlowMediaExt.h":
+	cdef enum SmoFlow_StateOutput:
+		OUTPUT_T
+		OUTPUT_P
+		OUTPUT_RHO
+		OUTPUT_V
+		OUTPUT_H
+		OUTPUT_S
+		OUTPUT_U
+		OUTPUT_Q
+		OUTPUT_DT
+		OUTPUT_CP
+		OUTPUT_CV
+		OUTPUT_BETA
+		OUTPUT_MU
+		OUTPUT_COND
+		OUTPUT_PR
+		OUTPUT_GAMMA
+
+	void SmoFlow_updateStates(Fluid* pFluid,
+			long iInput1, double* values1, long iInput2, double* values2, long n,
+			long* outputs, int numOutputs, double* results, int numThreads) nogil
+
 	cdef cppclass CoolPropStateClassSI:
 		double T()
 		double rho()
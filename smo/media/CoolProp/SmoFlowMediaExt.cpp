@@ -1,5 +1,8 @@
 #include "SmoFlowMediaExt.h"
 #include <iostream>
+#include <vector>
+#include <thread>
+#include <algorithm>
 
 void SmoFlow_CoolPropState::createTwoPhaseStates() {
 	// Only build the Saturation classes if this is a top-level CPState for which no_SatLSatV() has not been called
@@ -17,6 +20,148 @@ void SmoFlow_CoolPropState::createTwoPhaseStates() {
 	enable_EXTTP();
 }
 
+// Relative tolerance of the inputs reproduced by the states computed from the property tables
+static const double tableSolverTolerance = 1e-9;
+// Absolute tolerance of the enthalpy [J/kg], for enthalpies close to 0
+static const double tableSolverEnthalpyTolerance = 1e-6;
+static const int tableSolverMaxIterations = 5;
+// Maximum relative change of T and rho from the table values, so that the iterations
+// cannot end on a metastable state
+static const double tableSolverMaxCorrection = 0.05;
+
+void SmoFlow_CoolPropState::update(long iInput1, double Value1, long iInput2, double Value2, double T0, double rho0) {
+	updateWithTable(SmoFlow_PropertyTable::getTable(pFluid), iInput1, Value1, iInput2, Value2, T0, rho0);
+}
+
+void SmoFlow_CoolPropState::updateWithTable(SmoFlow_PropertyTable* table,
+		long iInput1, double Value1, long iInput2, double Value2, double T0, double rho0) {
+	if (table != NULL) {
+		double T, rho;
+		if (match_pair(iInput1, iInput2, iP, iH)) {
+			sort_pair(&iInput1, &Value1, &iInput2, &Value2, iP, iH);
+			if (table->lookup_ph(Value1, Value2, T, rho)) {
+				if (solve_ph(Value1, Value2, T, rho)) {
+					return;
+				}
+				// Use the table values as initial guess of the full equation of state
+				T0 = T;
+				rho0 = rho;
+			}
+		} else if (match_pair(iInput1, iInput2, iT, iP)) {
+			sort_pair(&iInput1, &Value1, &iInput2, &Value2, iT, iP);
+			if (table->lookup_Tp(Value1, Value2, rho)) {
+				if (solve_Tp(Value1, Value2, rho)) {
+					return;
+				}
+			}
+		}
+	}
+	// Full equation of state
+	CoolPropStateClassSI::update(iInput1, Value1, iInput2, Value2, T0, rho0);
+}
+
+void SmoFlow_CoolPropState::update_Trho_singlePhase(double T, double rho) {
+	// The table lookups exclude the saturation dome and a band around it, so the
+	// saturation solve done by update(iT, iD) for subcritical temperatures is skipped
+	flag_SinglePhase = true;
+	try {
+		CoolPropStateClassSI::update(iT, T, iD, rho);
+	} catch (...) {
+		flag_SinglePhase = false;
+		throw;
+	}
+	flag_SinglePhase = false;
+}
+
+bool SmoFlow_CoolPropState::solve_ph(double pIn, double hIn, double T, double rho) {
+	double T0 = T;
+	double rho0 = rho;
+	for (int iter = 0; iter < tableSolverMaxIterations; iter++) {
+		update_Trho_singlePhase(T, rho);
+		double pError = p() - pIn;
+		double hError = h() - hIn;
+		if (fabs(pError) <= tableSolverTolerance * fabs(pIn) &&
+				fabs(hError) <= tableSolverTolerance * fabs(hIn) + tableSolverEnthalpyTolerance) {
+			return true;
+		}
+		// Newton step for (T, rho)
+		double dpdT = dpdT_constrho();
+		double dpdrho = CoolPropStateClassSI::dpdrho_constT();
+		double dhdT = dhdT_constrho();
+		double dhdrho = dhdrho_constT();
+		double det = dpdT * dhdrho - dpdrho * dhdT;
+		if (!(det != 0)) {
+			return false;
+		}
+		T -= (dhdrho * pError - dpdrho * hError) / det;
+		rho -= (dpdT * hError - dhdT * pError) / det;
+		if (!(fabs(T - T0) <= tableSolverMaxCorrection * T0 &&
+				fabs(rho - rho0) <= tableSolverMaxCorrection * rho0)) {
+			return false;
+		}
+	}
+	return false;
+}
+
+bool SmoFlow_CoolPropState::solve_Tp(double TIn, double pIn, double rho) {
+	double rho0 = rho;
+	for (int iter = 0; iter < tableSolverMaxIterations; iter++) {
+		update_Trho_singlePhase(TIn, rho);
+		double pError = p() - pIn;
+		if (fabs(pError) <= tableSolverTolerance * fabs(pIn)) {
+			return true;
+		}
+		// Newton step for rho
+		double dpdrho = CoolPropStateClassSI::dpdrho_constT();
+		if (!(dpdrho > 0)) {
+			return false;
+		}
+		rho -= pError / dpdrho;
+		if (!(fabs(rho - rho0) <= tableSolverMaxCorrection * rho0)) {
+			return false;
+		}
+	}
+	return false;
+}
+
+double SmoFlow_CoolPropState::output(long iOutput) {
+	switch (iOutput) {
+	case OUTPUT_T:
+		return T();
+	case OUTPUT_P:
+		return p();
+	case OUTPUT_RHO:
+		return rho();
+	case OUTPUT_V:
+		return 1. / rho();
+	case OUTPUT_H:
+		return h();
+	case OUTPUT_S:
+		return s();
+	case OUTPUT_U:
+		return u();
+	case OUTPUT_Q:
+		return q();
+	case OUTPUT_DT:
+		return dT();
+	case OUTPUT_CP:
+		return cp();
+	case OUTPUT_CV:
+		return cv();
+	case OUTPUT_BETA:
+		return beta();
+	case OUTPUT_MU:
+		return viscosity();
+	case OUTPUT_COND:
+		return conductivity();
+	case OUTPUT_PR:
+		return Prandtl();
+	case OUTPUT_GAMMA:
+		return gamma();
+	default:
+		return NAN;
+	}
+}
 
 double SmoFlow_CoolPropState::q() {
 	double _q;
@@ -242,3 +387,56 @@ double SmoFlow_CoolPropState::dsdT_constv() {
 	return _dsdT_constv;
 }
 
+
+static void updateStatesChunk(Fluid* pFluid, SmoFlow_PropertyTable* table,
+		long iInput1, const double* values1, long iInput2, const double* values2, long n,
+		long start, long end, const long* outputs, int numOutputs, double* results) {
+	// Each thread uses its own state
+	SmoFlow_CoolPropState* state = NULL;
+	try {
+		state = new SmoFlow_CoolPropState(pFluid);
+	} catch (...) {}
+	for (long i = start; i < end; i++) {
+		bool updated = false;
+		if (state != NULL) {
+			try {
+				state->updateWithTable(table, iInput1, values1[i], iInput2, values2[i]);
+				updated = true;
+			} catch (...) {}
+		}
+		for (int k = 0; k < numOutputs; k++) {
+			double value = NAN;
+			if (updated) {
+				try {
+					value = state->output(outputs[k]);
+				} catch (...) {}
+			}
+			results[k * n + i] = value;
+		}
+	}
+	delete state;
+}
+
+void SmoFlow_updateStates(Fluid* pFluid,
+		long iInput1, const double* values1, long iInput2, const double* values2, long n,
+		const long* outputs, int numOutputs, double* results, int numThreads) {
+	// The threads don't access the table map, which may be modified from Python meanwhile
+	SmoFlow_PropertyTable* table = SmoFlow_PropertyTable::getTable(pFluid);
+	if (numThreads > n) {
+		numThreads = n;
+	}
+	if (numThreads <= 1) {
+		updateStatesChunk(pFluid, table, iInput1, values1, iInput2, values2, n,
+				0, n, outputs, numOutputs, results);
+		return;
+	}
+	long chunkSize = (n + numThreads - 1) / numThreads;
+	std::vector<std::thread> threads;
+	for (long start = 0; start < n; start += chunkSize) {
+		threads.push_back(std::thread(updateStatesChunk, pFluid, table, iInput1, values1, iInput2, values2, n,
+				start, std::min(start + chunkSize, n), outputs, numOutputs, results));
+	}
+	for (size_t k = 0; k < threads.size(); k++) {
+		threads[k].join();
+	}
+}
@@ -5,6 +5,27 @@
 #define SMOFLOWMEDIAEXT_H
 
 #include "CoolProp/CPState.h"
+#include "SmoFlowPropertyTable.h"
+
+// Properties computed by SmoFlow_updateStates
+enum SmoFlow_StateOutput {
+	OUTPUT_T,
+	OUTPUT_P,
+	OUTPUT_RHO,
+	OUTPUT_V,
+	OUTPUT_H,
+	OUTPUT_S,
+	OUTPUT_U,
+	OUTPUT_Q,
+	OUTPUT_DT,
+	OUTPUT_CP,
+	OUTPUT_CV,
+	OUTPUT_BETA,
+	OUTPUT_MU,
+	OUTPUT_COND,
+	OUTPUT_PR,
+	OUTPUT_GAMMA
+};
 
 class SmoFlow_CoolPropState : public CoolPropStateClassSI {
 public:
@@ -17,6 +38,18 @@ public:
 
 	void createTwoPhaseStates();
 
+	// Uses the property table of the fluid (if any) for the (p, h) and (T, p) inputs.
+	// The table values are corrected with Newton iterations on (T, rho), so that p and h
+	// (resp. p) of the state match the inputs within a relative tolerance of 1e-9. The
+	// other properties are computed by the equation of state from the resulting T and rho.
+	void update(long iInput1, double Value1, long iInput2, double Value2, double T0 = -1, double rho0 = -1);
+	// Same as update, with the property table to use (NULL for the full equation of state)
+	void updateWithTable(SmoFlow_PropertyTable* table,
+			long iInput1, double Value1, long iInput2, double Value2, double T0 = -1, double rho0 = -1);
+
+	// Value of a property (one of SmoFlow_StateOutput)
+	double output(long iOutput);
+
 	double q();
 	double dT();
 	double u();
@@ -25,6 +58,13 @@ public:
 	double gamma();
 	double beta();
 
+	// Newton iterations on (T, rho) starting from the property table values,
+	// return false if the state doesn't converge close to the table values
+	bool solve_ph(double pIn, double hIn, double T, double rho);
+	bool solve_Tp(double TIn, double pIn, double rho);
+	// Update with (T, rho) without the saturation (phase) check
+	void update_Trho_singlePhase(double T, double rho);
+
 	CoolPropStateClassSI* getSatL() {
 		return SatL;
 	}
@@ -55,4 +95,14 @@ public:
 	double dpdT_sat();
 };
 
+/**
+ * Updates a state of the fluid for each pair of input values and stores the
+ * property outputs[k] of state i in results[k * n + i] (NAN if it cannot be computed).
+ * The states are split in contiguous chunks between numThreads threads. The property
+ * table of the fluid is looked up once, before starting the threads.
+ */
+void SmoFlow_updateStates(Fluid* pFluid,
+		long iInput1, const double* values1, long iInput2, const double* values2, long n,
+		const long* outputs, int numOutputs, double* results, int numThreads);
+
 #endif // SMOFLOWMEDIAEXT_H
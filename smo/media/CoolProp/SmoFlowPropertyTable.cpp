@@ -0,0 +1,569 @@
+#include "SmoFlowPropertyTable.h"
+#include <cmath>
+#include <fstream>
+#include <stdexcept>
+#include <algorithm>
+
+#define PROPERTY_TABLE_FILE_ID "SmoFlowPropertyTable"
+#define PROPERTY_TABLE_FILE_VERSION 1
+
+template <class T>
+static void writeValue(std::ostream &out, const T &value) {
+	out.write(reinterpret_cast<const char*>(&value), sizeof(T));
+}
+
+template <class T>
+static void readValue(std::istream &in, T &value) {
+	in.read(reinterpret_cast<char*>(&value), sizeof(T));
+}
+
+template <class T>
+static void writeVector(std::ostream &out, const std::vector<T> &values) {
+	writeValue(out, (long) values.size());
+	if (values.size() > 0) {
+		out.write(reinterpret_cast<const char*>(&values[0]), values.size() * sizeof(T));
+	}
+}
+
+template <class T>
+static void readVector(std::istream &in, std::vector<T> &values) {
+	long size = 0;
+	readValue(in, size);
+	if (!in || size < 0) {
+		throw std::runtime_error("Corrupted property table file");
+	}
+	values.resize(size);
+	if (size > 0) {
+		in.read(reinterpret_cast<char*>(&values[0]), size * sizeof(T));
+	}
+}
+
+static void writeString(std::ostream &out, const std::string &value) {
+	writeVector(out, std::vector<char>(value.begin(), value.end()));
+}
+
+static std::string readString(std::istream &in) {
+	std::vector<char> chars;
+	readVector(in, chars);
+	return std::string(chars.begin(), chars.end());
+}
+
+/// Linear interpolation in values given at uniformly spaced x
+static double interpolateUniform(const std::vector<double> &values, double xMin, double xMax, double x) {
+	double s = (x - xMin) / (xMax - xMin) * (values.size() - 1);
+	int k = std::max(0, std::min((int) values.size() - 2, (int) s));
+	double t = s - k;
+	return (1 - t) * values[k] + t * values[k + 1];
+}
+
+/// Catmull-Rom weights of the 4 nodes around the interval [0, 1]
+static void cubicWeights(double t, double* w) {
+	double t2 = t * t;
+	double t3 = t2 * t;
+	w[0] = 0.5 * (-t3 + 2 * t2 - t);
+	w[1] = 0.5 * (3 * t3 - 5 * t2 + 2);
+	w[2] = 0.5 * (-3 * t3 + 4 * t2 + t);
+	w[3] = 0.5 * (t3 - t2);
+}
+
+//============================================================================
+// SmoFlow_BicubicGrid
+
+void SmoFlow_BicubicGrid::init(int nx, int ny, int nValues,
+		double xMin, double xMax, double yMin, double yMax) {
+	if (nx < 4 || ny < 4) {
+		throw std::runtime_error("Property tables must have at least 4 nodes in each direction");
+	}
+	this->nx = nx;
+	this->ny = ny;
+	this->nValues = nValues;
+	this->xMin = xMin;
+	this->xMax = xMax;
+	this->yMin = yMin;
+	this->yMax = yMax;
+	dx = (xMax - xMin) / (nx - 1);
+	dy = (yMax - yMin) / (ny - 1);
+	values.assign(nx * ny * nValues, NAN);
+	phases.assign(nx * ny, PHASE_INVALID);
+	validCells.assign((nx - 1) * (ny - 1), 0);
+}
+
+bool SmoFlow_BicubicGrid::locate(double x, double y, int &i, int &j, double &tx, double &ty) {
+	if (!(x >= xMin && x <= xMax && y >= yMin && y <= yMax)) {
+		return false;
+	}
+	double sx = (x - xMin) / dx;
+	double sy = (y - yMin) / dy;
+	i = std::min(nx - 2, (int) sx);
+	j = std::min(ny - 2, (int) sy);
+	tx = sx - i;
+	ty = sy - j;
+	return true;
+}
+
+void SmoFlow_BicubicGrid::interpolate(int i, int j, double tx, double ty, double* out) {
+	double wx[4], wy[4];
+	cubicWeights(tx, wx);
+	cubicWeights(ty, wy);
+	for (int k = 0; k < nValues; k++) {
+		out[k] = 0;
+	}
+	for (int a = 0; a < 4; a++) {
+		for (int b = 0; b < 4; b++) {
+			double w = wx[a] * wy[b];
+			for (int k = 0; k < nValues; k++) {
+				out[k] += w * nodeValue(i - 1 + a, j - 1 + b, k);
+			}
+		}
+	}
+}
+
+double SmoFlow_BicubicGrid::nodeValue(int i, int j, int k) {
+	// Nodes outside the grid are extrapolated linearly
+	if (i < 0) {
+		return 2 * nodeValue(0, j, k) - nodeValue(1, j, k);
+	} else if (i >= nx) {
+		return 2 * nodeValue(nx - 1, j, k) - nodeValue(nx - 2, j, k);
+	} else if (j < 0) {
+		return 2 * nodeValue(i, 0, k) - nodeValue(i, 1, k);
+	} else if (j >= ny) {
+		return 2 * nodeValue(i, ny - 1, k) - nodeValue(i, ny - 2, k);
+	}
+	return values[(i * ny + j) * nValues + k];
+}
+
+bool SmoFlow_BicubicGrid::stencilValid(int i, int j) {
+	bool hasLiquid = false;
+	bool hasVapor = false;
+	for (int ii = std::max(0, i - 1); ii <= std::min(nx - 1, i + 2); ii++) {
+		for (int jj = std::max(0, j - 1); jj <= std::min(ny - 1, j + 2); jj++) {
+			char phase = phases[ii * ny + jj];
+			if (phase == PHASE_INVALID) {
+				return false;
+			}
+			hasLiquid = hasLiquid || (phase == PHASE_LIQUID);
+			hasVapor = hasVapor || (phase == PHASE_VAPOR);
+		}
+	}
+	return !(hasLiquid && hasVapor);
+}
+
+double SmoFlow_BicubicGrid::validFraction() {
+	if (validCells.size() == 0) {
+		return 0;
+	}
+	return std::count(validCells.begin(), validCells.end(), 1) / (double) validCells.size();
+}
+
+void SmoFlow_BicubicGrid::write(std::ostream &out) {
+	writeValue(out, nx);
+	writeValue(out, ny);
+	writeValue(out, nValues);
+	writeValue(out, xMin);
+	writeValue(out, xMax);
+	writeValue(out, yMin);
+	writeValue(out, yMax);
+	writeVector(out, values);
+	writeVector(out, phases);
+	writeVector(out, validCells);
+}
+
+void SmoFlow_BicubicGrid::read(std::istream &in) {
+	int _nx, _ny, _nValues;
+	double _xMin, _xMax, _yMin, _yMax;
+	readValue(in, _nx);
+	readValue(in, _ny);
+	readValue(in, _nValues);
+	readValue(in, _xMin);
+	readValue(in, _xMax);
+	readValue(in, _yMin);
+	readValue(in, _yMax);
+	if (!in) {
+		throw std::runtime_error("Corrupted property table file");
+	}
+	init(_nx, _ny, _nValues, _xMin, _xMax, _yMin, _yMax);
+	readVector(in, values);
+	readVector(in, phases);
+	readVector(in, validCells);
+	if (!in || values.size() != (size_t) (nx * ny * nValues) || phases.size() != (size_t) (nx * ny)
+			|| validCells.size() != (size_t) ((nx - 1) * (ny - 1))) {
+		throw std::runtime_error("Corrupted property table file");
+	}
+}
+
+//============================================================================
+// SmoFlow_PropertyTable
+
+std::map<Fluid*, SmoFlow_PropertyTable*> SmoFlow_PropertyTable::tables;
+std::mutex SmoFlow_PropertyTable::tablesMutex;
+
+SmoFlow_PropertyTable* SmoFlow_PropertyTable::getTable(Fluid* pFluid) {
+	std::lock_guard<std::mutex> lock(tablesMutex);
+	std::map<Fluid*, SmoFlow_PropertyTable*>::iterator it = tables.find(pFluid);
+	if (it == tables.end()) {
+		return NULL;
+	}
+	return it->second;
+}
+
+void SmoFlow_PropertyTable::setTable(Fluid* pFluid, SmoFlow_PropertyTable* table) {
+	std::lock_guard<std::mutex> lock(tablesMutex);
+	if (table == NULL) {
+		tables.erase(pFluid);
+	} else {
+		tables[pFluid] = table;
+	}
+}
+
+SmoFlow_PropertyTable::SmoFlow_PropertyTable(Fluid* pFluid, int Np, int Nh, int NT,
+		double pMin, double pMax, double TMin, double TMax,
+		double tolerance, double criticalBand, double saturationBand) {
+	this->pFluid = pFluid;
+	this->Np = Np;
+	this->Nh = Nh;
+	this->NT = NT;
+	this->pMin = pMin;
+	this->pMax = pMax;
+	this->TMin = TMin;
+	this->TMax = TMax;
+	this->tolerance = tolerance;
+	this->criticalBand = criticalBand;
+	this->saturationBand = saturationBand;
+	pCrit = pFluid->crit.p.Pa;
+	TCrit = pFluid->crit.T;
+	rhoCrit = pFluid->crit.rho;
+	hMin = hMax = NAN;
+	maxError_ph = maxError_Tp = 0;
+	NSat = 0;
+	satLogpMax = satTMax = NAN;
+}
+
+char SmoFlow_PropertyTable::evaluate(CoolPropStateClassSI &state,
+		long iInput1, double Value1, long iInput2, double Value2, double &T, double &rho) {
+	try {
+		state.update(iInput1, Value1, iInput2, Value2);
+	} catch (...) {
+		return PHASE_INVALID;
+	}
+	if (state.TwoPhase) {
+		return PHASE_INVALID;
+	}
+	T = state.T();
+	rho = state.rho();
+	if (!(std::isfinite(T) && std::isfinite(rho) && rho > 0)) {
+		return PHASE_INVALID;
+	}
+	if (state.p() >= pCrit) {
+		return PHASE_SUPERCRITICAL;
+	} else if (rho > rhoCrit) {
+		return PHASE_LIQUID;
+	} else {
+		return PHASE_VAPOR;
+	}
+}
+
+bool SmoFlow_PropertyTable::nearCriticalPoint(double TLow, double THigh, double pLow, double pHigh) {
+	return (THigh > TCrit * (1 - criticalBand) && TLow < TCrit * (1 + criticalBand)
+			&& pHigh > pCrit * (1 - criticalBand) && pLow < pCrit * (1 + criticalBand));
+}
+
+void SmoFlow_PropertyTable::buildSaturationCurves(CoolPropStateClassSI &state) {
+	NSat = Np;
+	satLogpMax = log(pCrit * (1 - criticalBand));
+	satTMax = TCrit * (1 - criticalBand);
+	satHL.clear();
+	satHV.clear();
+	satLogp.clear();
+	if (satLogpMax > ph.xMin) {
+		satHL.resize(NSat);
+		satHV.resize(NSat);
+		for (int k = 0; k < NSat; k++) {
+			double p = exp(ph.xMin + k * (satLogpMax - ph.xMin) / (NSat - 1));
+			try {
+				state.update(iP, p, iQ, 0);
+				satHL[k] = state.h();
+				state.update(iP, p, iQ, 1);
+				satHV[k] = state.h();
+			} catch (...) {
+				satHL[k] = satHV[k] = NAN;
+			}
+		}
+	}
+	if (satTMax > Tp.xMin) {
+		satLogp.resize(NSat);
+		for (int k = 0; k < NSat; k++) {
+			double T = Tp.xMin + k * (satTMax - Tp.xMin) / (NSat - 1);
+			try {
+				state.update(iT, T, iQ, 0);
+				satLogp[k] = log(state.p());
+			} catch (...) {
+				satLogp[k] = NAN;
+			}
+		}
+	}
+}
+
+// Points at which the interpolation is compared to the equation of state:
+// middles of the cell and its edges, and the middles of the cell quarters
+static const int numCheckPoints = 9;
+static const double checkPoints[numCheckPoints][2] = {
+		{0.5, 0.5}, {0.5, 0}, {0.5, 1}, {0, 0.5}, {1, 0.5},
+		{0.25, 0.25}, {0.25, 0.75}, {0.75, 0.25}, {0.75, 0.75}
+};
+
+double SmoFlow_PropertyTable::checkCell_ph(CoolPropStateClassSI &state, int i, int j) {
+	double TLow = INFINITY, THigh = -INFINITY;
+	for (int a = 0; a < 2; a++) {
+		for (int b = 0; b < 2; b++) {
+			double T = ph.nodeValues(i + a, j + b)[0];
+			TLow = std::min(TLow, T);
+			THigh = std::max(THigh, T);
+		}
+	}
+	if (nearCriticalPoint(TLow, THigh, exp(ph.x(i)), exp(ph.x(i + 1)))) {
+		return INFINITY;
+	}
+	double maxError = 0;
+	for (int k = 0; k < numCheckPoints; k++) {
+		double tx = checkPoints[k][0];
+		double ty = checkPoints[k][1];
+		double T, rho, values[2];
+		if (evaluate(state, iP, exp(ph.x(i) + tx * ph.dx), iH, ph.y(j) + ty * ph.dy, T, rho) == PHASE_INVALID) {
+			return INFINITY;
+		}
+		ph.interpolate(i, j, tx, ty, values);
+		maxError = std::max(maxError, fabs(values[0] - T) / T);
+		maxError = std::max(maxError, fabs(exp(values[1]) - rho) / rho);
+	}
+	return maxError;
+}
+
+double SmoFlow_PropertyTable::checkCell_Tp(CoolPropStateClassSI &state, int i, int j) {
+	if (nearCriticalPoint(Tp.x(i), Tp.x(i + 1), exp(Tp.y(j)), exp(Tp.y(j + 1)))) {
+		return INFINITY;
+	}
+	double maxError = 0;
+	for (int k = 0; k < numCheckPoints; k++) {
+		double tx = checkPoints[k][0];
+		double ty = checkPoints[k][1];
+		double T, rho, logRho;
+		if (evaluate(state, iT, Tp.x(i) + tx * Tp.dx, iP, exp(Tp.y(j) + ty * Tp.dy), T, rho) == PHASE_INVALID) {
+			return INFINITY;
+		}
+		Tp.interpolate(i, j, tx, ty, &logRho);
+		maxError = std::max(maxError, fabs(exp(logRho) - rho) / rho);
+	}
+	return maxError;
+}
+
+void SmoFlow_PropertyTable::build() {
+	CoolPropStateClassSI state(pFluid);
+	double T, rho;
+
+	// Enthalpy range: from the cold compressed (or saturated) liquid to the hot gas
+	hMin = INFINITY;
+	hMax = -INFINITY;
+	if (evaluate(state, iT, TMin, iP, pMax, T, rho) != PHASE_INVALID) {
+		hMin = state.h();
+	}
+	if (TMin < TCrit) {
+		try {
+			state.update(iT, TMin, iQ, 0);
+			hMin = std::min(hMin, state.h());
+		} catch (...) {}
+	}
+	if (evaluate(state, iT, TMax, iP, pMin, T, rho) != PHASE_INVALID) {
+		hMax = state.h();
+	}
+	if (!(std::isfinite(hMin) && std::isfinite(hMax) && hMax > hMin)) {
+		throw std::runtime_error("Failed determining the enthalpy range of the property table for " + pFluid->get_name());
+	}
+
+	ph.init(Np, Nh, 2, log(pMin), log(pMax), hMin, hMax);
+	for (int i = 0; i < ph.nx; i++) {
+		for (int j = 0; j < ph.ny; j++) {
+			char phase = evaluate(state, iP, exp(ph.x(i)), iH, ph.y(j), T, rho);
+			ph.phases[i * ph.ny + j] = phase;
+			if (phase != PHASE_INVALID) {
+				double* values = ph.nodeValues(i, j);
+				values[0] = T;
+				values[1] = log(rho);
+			}
+		}
+	}
+
+	Tp.init(NT, Np, 1, TMin, TMax, log(pMin), log(pMax));
+	for (int i = 0; i < Tp.nx; i++) {
+		for (int j = 0; j < Tp.ny; j++) {
+			char phase = evaluate(state, iT, Tp.x(i), iP, exp(Tp.y(j)), T, rho);
+			Tp.phases[i * Tp.ny + j] = phase;
+			if (phase != PHASE_INVALID) {
+				Tp.nodeValues(i, j)[0] = log(rho);
+			}
+		}
+	}
+
+	buildSaturationCurves(state);
+
+	maxError_ph = 0;
+	for (int i = 0; i < ph.nx - 1; i++) {
+		for (int j = 0; j < ph.ny - 1; j++) {
+			double error = ph.stencilValid(i, j) ? checkCell_ph(state, i, j) : INFINITY;
+			ph.setValid(i, j, error <= tolerance);
+			if (error <= tolerance) {
+				maxError_ph = std::max(maxError_ph, error);
+			}
+		}
+	}
+
+	maxError_Tp = 0;
+	for (int i = 0; i < Tp.nx - 1; i++) {
+		for (int j = 0; j < Tp.ny - 1; j++) {
+			double error = Tp.stencilValid(i, j) ? checkCell_Tp(state, i, j) : INFINITY;
+			Tp.setValid(i, j, error <= tolerance);
+			if (error <= tolerance) {
+				maxError_Tp = std::max(maxError_Tp, error);
+			}
+		}
+	}
+}
+
+void SmoFlow_PropertyTable::save(std::string filePath) {
+	std::ofstream out(filePath.c_str(), std::ios::binary);
+	if (!out) {
+		throw std::runtime_error("Cannot write property table file " + filePath);
+	}
+	writeString(out, PROPERTY_TABLE_FILE_ID);
+	writeValue(out, (int) PROPERTY_TABLE_FILE_VERSION);
+	writeString(out, pFluid->get_name());
+	writeValue(out, Np);
+	writeValue(out, Nh);
+	writeValue(out, NT);
+	writeValue(out, pMin);
+	writeValue(out, pMax);
+	writeValue(out, TMin);
+	writeValue(out, TMax);
+	writeValue(out, tolerance);
+	writeValue(out, criticalBand);
+	writeValue(out, saturationBand);
+
+	writeValue(out, hMin);
+	writeValue(out, hMax);
+	writeValue(out, maxError_ph);
+	writeValue(out, maxError_Tp);
+	writeValue(out, NSat);
+	writeValue(out, satLogpMax);
+	writeValue(out, satTMax);
+	writeVector(out, satHL);
+	writeVector(out, satHV);
+	writeVector(out, satLogp);
+	ph.write(out);
+	Tp.write(out);
+}
+
+bool SmoFlow_PropertyTable::load(std::string filePath) {
+	std::ifstream in(filePath.c_str(), std::ios::binary);
+	if (!in) {
+		return false;
+	}
+	try {
+		if (readString(in) != PROPERTY_TABLE_FILE_ID) {
+			return false;
+		}
+		int version, _Np, _Nh, _NT;
+		double _pMin, _pMax, _TMin, _TMax, _tolerance, _criticalBand, _saturationBand;
+		readValue(in, version);
+		if (version != PROPERTY_TABLE_FILE_VERSION || readString(in) != pFluid->get_name()) {
+			return false;
+		}
+		readValue(in, _Np);
+		readValue(in, _Nh);
+		readValue(in, _NT);
+		readValue(in, _pMin);
+		readValue(in, _pMax);
+		readValue(in, _TMin);
+		readValue(in, _TMax);
+		readValue(in, _tolerance);
+		readValue(in, _criticalBand);
+		readValue(in, _saturationBand);
+		if (!in || _Np != Np || _Nh != Nh || _NT != NT || _pMin != pMin || _pMax != pMax
+				|| _TMin != TMin || _TMax != TMax || _tolerance != tolerance
+				|| _criticalBand != criticalBand || _saturationBand != saturationBand) {
+			return false;
+		}
+
+		readValue(in, hMin);
+		readValue(in, hMax);
+		readValue(in, maxError_ph);
+		readValue(in, maxError_Tp);
+		readValue(in, NSat);
+		readValue(in, satLogpMax);
+		readValue(in, satTMax);
+		readVector(in, satHL);
+		readVector(in, satHV);
+		readVector(in, satLogp);
+		ph.read(in);
+		Tp.read(in);
+	} catch (std::exception &e) {
+		return false;
+	}
+	return (bool) in;
+}
+
+bool SmoFlow_PropertyTable::lookup_ph(double p, double h, double &T, double &rho) {
+	if (!(p > 0)) {
+		return false;
+	}
+	double logp = log(p);
+	int i, j;
+	double tx, ty;
+	if (!ph.locate(logp, h, i, j, tx, ty) || !ph.isValid(i, j)) {
+		return false;
+	}
+	if (p < pCrit) {
+		// Pressures just below the critical point are not checked
+		if (satHL.empty() || logp > satLogpMax) {
+			return false;
+		}
+		double hL = interpolateUniform(satHL, ph.xMin, satLogpMax, logp);
+		double hV = interpolateUniform(satHV, ph.xMin, satLogpMax, logp);
+		if (!(hV > hL)) {
+			return false;
+		}
+		double band = saturationBand * (hV - hL);
+		if (h > hL - band && h < hV + band) {
+			return false;
+		}
+	}
+	double values[2];
+	ph.interpolate(i, j, tx, ty, values);
+	T = values[0];
+	rho = exp(values[1]);
+	return true;
+}
+
+bool SmoFlow_PropertyTable::lookup_Tp(double T, double p, double &rho) {
+	if (!(p > 0)) {
+		return false;
+	}
+	double logp = log(p);
+	int i, j;
+	double tx, ty;
+	if (!Tp.locate(T, logp, i, j, tx, ty) || !Tp.isValid(i, j)) {
+		return false;
+	}
+	if (T < TCrit && p < pCrit) {
+		// Temperatures just below the critical point are not checked
+		if (satLogp.empty() || T > satTMax) {
+			return false;
+		}
+		double logpSat = interpolateUniform(satLogp, Tp.xMin, satTMax, T);
+		if (!(fabs(logp - logpSat) >= saturationBand)) {
+			return false;
+		}
+	}
+	double logRho;
+	Tp.interpolate(i, j, tx, ty, &logRho);
+	rho = exp(logRho);
+	return true;
+}
@@ -0,0 +1,138 @@
+/**
+ * file: SmoFlowPropertyTable.h
+ */
+#ifndef SMOFLOWPROPERTYTABLE_H
+#define SMOFLOWPROPERTYTABLE_H
+
+#include <map>
+#include <mutex>
+#include <string>
+#include <vector>
+#include <iostream>
+#include "CoolProp/CPState.h"
+
+enum SmoFlow_Phase {
+	PHASE_INVALID = 0,
+	PHASE_LIQUID = 1,
+	PHASE_VAPOR = 2,
+	PHASE_SUPERCRITICAL = 3
+};
+
+/**
+ * Uniform 2D grid of node values with bicubic (Catmull-Rom) interpolation
+ * and a mask of the cells in which the interpolation may be used
+ */
+class SmoFlow_BicubicGrid {
+public:
+	int nx, ny, nValues;
+	double xMin, xMax, yMin, yMax, dx, dy;
+	// Node values, indexed by (i * ny + j) * nValues + k
+	std::vector<double> values;
+	// Phase of the nodes
+	std::vector<char> phases;
+	// Cells in which the interpolation is valid, indexed by i * (ny - 1) + j
+	std::vector<char> validCells;
+
+	void init(int nx, int ny, int nValues, double xMin, double xMax, double yMin, double yMax);
+	double x(int i) {
+		return xMin + i * dx;
+	}
+	double y(int j) {
+		return yMin + j * dy;
+	}
+	double* nodeValues(int i, int j) {
+		return &values[(i * ny + j) * nValues];
+	}
+	/// Value k at node (i, j), extrapolated linearly for the nodes outside the grid
+	double nodeValue(int i, int j, int k);
+	bool isValid(int i, int j) {
+		return validCells[i * (ny - 1) + j] != 0;
+	}
+	void setValid(int i, int j, bool valid) {
+		validCells[i * (ny - 1) + j] = valid;
+	}
+	/// Finds the cell containing a point, returns false if the point is outside the grid
+	bool locate(double x, double y, int &i, int &j, double &tx, double &ty);
+	/// Interpolates the values at the point with local coordinates (tx, ty) in cell (i, j)
+	void interpolate(int i, int j, double tx, double ty, double* out);
+	/// Checks that the nodes used by the interpolation in a cell are single-phase
+	/// and not on both sides of the saturation dome
+	bool stencilValid(int i, int j);
+	/// Fraction of the cells in which the interpolation is valid
+	double validFraction();
+
+	void write(std::ostream &out);
+	void read(std::istream &in);
+};
+
+/**
+ * Tables of the temperature and density of a fluid as functions of (log(p), h) and
+ * (T, log(p)), computed in advance with the full equation of state. The looked up
+ * values are the initial values of the Newton iterations of SmoFlow_CoolPropState::update.
+ *
+ * The interpolation error is checked against the equation of state in the middle of
+ * each cell and its edges, and cells exceeding the tolerance, crossing the saturation
+ * dome or near the critical point are marked invalid. Lookups in invalid cells,
+ * outside the tables or within the saturation band fail, so that the caller falls
+ * back to the equation of state.
+ */
+class SmoFlow_PropertyTable {
+public:
+	SmoFlow_PropertyTable(Fluid* pFluid, int Np, int Nh, int NT,
+			double pMin, double pMax, double TMin, double TMax,
+			double tolerance, double criticalBand, double saturationBand);
+
+	/// Computes the tables with the equation of state
+	void build();
+	void save(std::string filePath);
+	/// Reads tables saved with the same options, returns false if not possible
+	bool load(std::string filePath);
+
+	/// Computes T and rho from p and h, returns false if the tables cannot be used
+	bool lookup_ph(double p, double h, double &T, double &rho);
+	/// Computes rho from T and p, returns false if the tables cannot be used
+	bool lookup_Tp(double T, double p, double &rho);
+
+	/// Maximum relative interpolation error of T and rho at the check points of the valid cells
+	double maxError_ph, maxError_Tp;
+	double validFraction_ph() {
+		return ph.validFraction();
+	}
+	double validFraction_Tp() {
+		return Tp.validFraction();
+	}
+
+	/// Table used by the states of a fluid (NULL if none). The tables may be replaced
+	/// while states are updated in other threads, but they must not be deleted.
+	static SmoFlow_PropertyTable* getTable(Fluid* pFluid);
+	static void setTable(Fluid* pFluid, SmoFlow_PropertyTable* table);
+
+protected:
+	Fluid* pFluid;
+	int Np, Nh, NT;
+	double pMin, pMax, TMin, TMax, hMin, hMax;
+	double tolerance, criticalBand, saturationBand;
+	double pCrit, TCrit, rhoCrit;
+	// Values T, log(rho) at nodes (log(p), h)
+	SmoFlow_BicubicGrid ph;
+	// Value log(rho) at nodes (T, log(p))
+	SmoFlow_BicubicGrid Tp;
+	// Saturation curves for the saturation band checks: hL, hV at uniform log(p)
+	// and log(psat) at uniform T, up to the critical band
+	int NSat;
+	double satLogpMax, satTMax;
+	std::vector<double> satHL, satHV, satLogp;
+
+	/// Evaluates the equation of state, returns the phase (PHASE_INVALID if two-phase or failed)
+	char evaluate(CoolPropStateClassSI &state, long iInput1, double Value1, long iInput2, double Value2,
+			double &T, double &rho);
+	bool nearCriticalPoint(double TLow, double THigh, double pLow, double pHigh);
+	void buildSaturationCurves(CoolPropStateClassSI &state);
+	double checkCell_ph(CoolPropStateClassSI &state, int i, int j);
+	double checkCell_Tp(CoolPropStateClassSI &state, int i, int j);
+
+	static std::map<Fluid*, SmoFlow_PropertyTable*> tables;
+	static std::mutex tablesMutex;
+};
+
+#endif // SMOFLOWPROPERTYTABLE_H
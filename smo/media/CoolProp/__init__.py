@@ -1 +1 @@
-from CoolProp import Fluid, FluidState
\ No newline at end of file
+from CoolProp import Fluid, FluidState, FluidStateArray
\ No newline at end of file
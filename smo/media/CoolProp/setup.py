@@ -2,15 +2,17 @@ from distutils.core import setup
 from distutils.extension import Extension
 from Cython.Build import cythonize
 import os
+import numpy as np
 
 coolPropSrcFolder = '/data/Workspace/Projects/SysMo/SmoFlow3D/coolprop/' 
-CXXFLAGS = ["-I" + coolPropSrcFolder]
-LDFLAGS = ["-L/data/Workspace/Projects/SysMo/SmoFlow3D/smoflow3d/com.sysmo.smoflow3d/bin"]
+CXXFLAGS = ["-I" + coolPropSrcFolder, "-std=c++11", "-pthread"]
+LDFLAGS = ["-L/data/Workspace/Projects/SysMo/SmoFlow3D/smoflow3d/com.sysmo.smoflow3d/bin", "-pthread"]
 
 pyCoolProp = Extension(
 		"CoolProp",
-		['CoolProp.pyx', 'SmoFlowMediaExt.cpp'],
+		['CoolProp.pyx', 'SmoFlowMediaExt.cpp', 'SmoFlowPropertyTable.cpp'],
 	   language="c++",
+	   include_dirs = [np.get_include()],
 	   extra_compile_args = CXXFLAGS,
 	   extra_link_args = LDFLAGS,
 	   libraries = ["CoolProp"]
@@ -18,9 +20,10 @@ pyCoolProp = Extension(
 
 setup(
       name = "CoolProp",
+      # Always regenerate CoolProp.cpp, which is tracked and may be older than the .pyx/.pxd
       ext_modules = cythonize([
            pyCoolProp
-      ])
+      ], force = True)
 )
 
 # Build with
@@ -7,7 +7,7 @@ Created on Feb 18, 2015
 import numpy as np
 import math
 from smo.math.util import formatNumber
-from smo.media.CoolProp.CoolProp import FluidState, Fluid
+from smo.media.CoolProp.CoolProp import FluidState, FluidStateArray, Fluid
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 import os, tempfile
@@ -265,7 +265,7 @@ class PHDiagram(StateDiagram):
 				print(e)
 			
 	def plotIsochores(self):
-		fState = FluidState(self.fluid)
+		fStates = FluidStateArray(self.fluid)
 		rhoArr1 = np.logspace(np.log10(self.rhoMin), np.log10(self.critical.rho), num = 20, endpoint = False)
 		rhoArr2 = np.logspace(np.log10(self.critical.rho), np.log10(self.rhoMax), num = 5)
 		rhoArr = np.zeros(len(rhoArr1) + len(rhoArr2))
@@ -277,12 +277,12 @@ class PHDiagram(StateDiagram):
 		h_level_high = self.critical.h + (self.hMax - self.critical.h) * 1 / 2. 
 		for rho in rhoArr:
 			try:
-				hArr = np.zeros(len(TArr))
-				pArr = np.zeros(len(TArr))
+				states = fStates.update_Trho(TArr, rho, properties = ('h', 'p'))
+				hArr = states['h']
+				pArr = states['p']
+				if (np.isnan(pArr).any()):
+					raise RuntimeError('Failed computing the isochore states')
 				for i in range(len(TArr)):
-					fState.update_Trho(TArr[i], rho)
-					hArr[i] = fState.h
-					pArr[i] = fState.p
 					# Putting labels
 					# Determining annotated point and label text offest
 					
@@ -329,7 +329,7 @@ class PHDiagram(StateDiagram):
 				print(e)
 		
 	def plotIsotherms(self):
-		fState = FluidState(self.fluid)
+		fStates = FluidStateArray(self.fluid)
 		TArr = np.logspace(np.log10(self.TMin), np.log10(self.TMax), num = 20)
 		TOrders = np.floor(np.log10(TArr))
 		TArr = np.ceil(TArr / 10**(TOrders - 2)) * 10**(TOrders - 2)
@@ -352,12 +352,12 @@ class PHDiagram(StateDiagram):
 					rhoArr1 = np.logspace(np.log10(self.rhoMin), np.log10(fSatV.rho), num = 100)
 					rhoArr2 = np.logspace(np.log10(fSatL.rho), np.log10(f1.rho), num = 100)
 				rhoArr = np.hstack((rhoArr1, rhoArr2))
-				hArr = np.zeros(len(rhoArr))
-				pArr = np.zeros(len(rhoArr))
+				states = fStates.update_Trho(T, rhoArr, properties = ('h', 'p'))
+				hArr = states['h']
+				pArr = states['p']
+				if (np.isnan(pArr).any()):
+					raise RuntimeError('Failed computing the isotherm states')
 				for i in range(len(rhoArr)):
-					fState.update_Trho(T, rhoArr[i])
-					hArr[i] = fState.h
-					pArr[i] = fState.p
 					# Determining label location
 					if (T < self.critical.T):
 						if (i == len(rhoArr1)):
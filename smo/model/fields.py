@@ -1,4 +1,5 @@
 import os
+import base64
 from collections import OrderedDict
 import copy
 import numpy as np
@@ -8,6 +9,42 @@ from smo.model.actions import ActionBar
 from SmoWeb.settings import MEDIA_ROOT
 tmpFolderPath = os.path.join (MEDIA_ROOT, 'tmp')
 
+# Binary encoding of structured arrays, which can be requested instead of lists of rows
+base64ColumnsEncoding = 'base64Columns'
+
+def encodeArrayColumn(column):
+	if (column.dtype.kind in 'iuf'):
+		if (column.dtype == np.float32):
+			dtype = 'float32'
+			column = column.astype('<f4', copy = False)
+		else:
+			dtype = 'float64'
+			column = column.astype('<f8', copy = False)
+		return {'dtype': dtype, 'data': base64.b64encode(np.ascontiguousarray(column).data)}
+	else:
+		return {'values': column.tolist()}
+
+def encodeStructuredArray(value, arrayEncoding):
+	"""
+	Encodes a structured array column by column. The numeric columns are 
+	encoded as base64 strings of their little endian float64 (or float32) buffers, 
+	the other columns are kept as lists of values. Plain 2D arrays are encoded 
+	in the same way, with their columns ``value[:, j]``, and other plain arrays 
+	are returned as lists.
+	
+	:param value: numpy structured array or plain array
+	:param str arrayEncoding: the encoding to use (:data:`base64ColumnsEncoding`)
+	"""
+	if (arrayEncoding != base64ColumnsEncoding):
+		raise ValueError('Unknown array encoding {0}'.format(arrayEncoding))
+	if (value.dtype.names is not None):
+		columns = [encodeArrayColumn(value[name]) for name in value.dtype.names]
+	elif (value.ndim == 2):
+		columns = [encodeArrayColumn(value[:, j]) for j in range(value.shape[1])]
+	else:
+		return value.tolist()
+	return {'encoding': arrayEncoding, 'shape': [len(value), len(columns)], 'columns': columns}
+
 class Field(object):
 	"""
 	Abstract base class for all the field types.
@@ -52,6 +89,13 @@ class Field(object):
 		"""
 		raise NotImplementedError
 	
+	def getEncodedValueRepr(self, value, arrayEncoding):
+		"""
+		Same as :func:`getValueRepr`, but array values are encoded with ``arrayEncoding``,
+		if the field supports it
+		"""
+		return self.getValueRepr(value)
+	
 	def toFormDict(self):
 		"""
 		Converts the definition of the field to a form suitable for JSON serialization
@@ -451,6 +495,9 @@ class RecordArray(Field):
 	
 	def getValueRepr(self, value):
 		return value.tolist()
+	
+	def getEncodedValueRepr(self, value, arrayEncoding):
+		return encodeStructuredArray(value, arrayEncoding)
 
 	def toFormDict(self):
 		fieldDict = super(RecordArray, self).toFormDict()
@@ -596,6 +643,12 @@ class DataSeriesView(Field):
 			return value
 		else:
 			return value.tolist()
+	
+	def getEncodedValueRepr(self, value, arrayEncoding):
+		if (self.useHdfStorage == True):
+			return value
+		else:
+			return encodeStructuredArray(value, arrayEncoding)
 
 	def toFormDict(self):
 		fieldDict = super(DataSeriesView, self).toFormDict()
@@ -1,4 +1,7 @@
 import fields
+import time
+import json
+import hashlib
 from collections import OrderedDict
 from smo.model.fields import FieldGroup, BasicGroup, ModelView, SuperGroup
 from smo.web.blocks import HtmlBlock, JsBlock
@@ -205,6 +208,9 @@ class NumericalModel(object):
 		* :attr:`description`: ModelDescription object representing a description for the model, also used as tooltip of the model's thumbnail
 		* :attr:`async`: Boolean value indicating if the computation is to be done asynchronously
 		* :attr:`progressOptions`: dictionary of progress display options in an asynchronous computation. Includes keys 'suffix', a string, and 'fractionOutput', boolean indicating if the progress value is to show in fraction format  
+		* :attr:`cacheResults`: Boolean value indicating if the results of the compute action can be cached, i.e. if they depend only on the input field values (default is False)
+		* :attr:`resultCacheTTL`: time in seconds after which the cached results expire (default is None, no expiration)
+		* :attr:`progressUpdateInterval`: minimum time in seconds between two progress updates sent by :func:`updateProgress` (default is 0.5)
 		* :attr:`declared_fields`: OrderedDict containing the fields declared in the model
 		* :attr:`declared_submodels`: OrderedDict containing the submodels declared in the model
 		* :attr:`declared_attrs`: dictionary containing the declared fields and submodels
@@ -215,6 +221,11 @@ class NumericalModel(object):
 	"""
 
 	__metaclass__ = NumericalModelMeta
+	# Cached definitions of the model views, by (model class, model view name)
+	modelViewSchemas = {}
+	cacheResults = False
+	resultCacheTTL = None
+	progressUpdateInterval = 0.5
 	
 	def __new__(cls, *args, **kwargs):
 		"""Constructor for all numerical models. 
@@ -255,31 +266,73 @@ class NumericalModel(object):
 		i = self.declared_basicGroups[basicGroupName].fields.index(self.declared_fields[fieldName])
 		self.declared_basicGroups[basicGroupName].fields[i] = newField
 		self.declared_fields[fieldName] = newField
+		# The field definitions are changed for the class
+		self.clearModelViewSchemas()
 	
-	def modelView2Json(self, modelView):
+	def modelView2Json(self, modelView, arrayEncoding = None, schemaETag = None):
 		"""Creates JSON representation of the modelView including 
-		field definitions, field values and actions"""
+		field definitions, field values and actions
+		
+		:param str arrayEncoding: if not None, the values of array fields are encoded
+			with it (see :func:`smo.model.fields.encodeStructuredArray`) instead of 
+			being converted to lists
+		:param str schemaETag: the ETag of the definitions held by the client. If it 
+			is still valid, the definitions and actions are not included
+		"""
 		if (isinstance(modelView, basestring)):
 			modelView = self.declared_modelViews[modelView]
-		definitions = [] 
+		schema = self.getModelViewSchema(modelView)
 		fieldValues = {}
-		actions = []
 		for group in modelView.superGroups:
 			if (isinstance(group, fields.SubModelGroup)):
-				groupContent = self.subModelGroup2Json(group, fieldValues)
-			elif (isinstance(group, fields.SuperGroup)):
-				groupContent = self.superGroup2Json(group, fieldValues)
+				self.subModelGroupValues2Json(group, fieldValues, arrayEncoding)
 			else:
-				raise TypeError("The argument to 'groupList2Json' must be a list of SuperGroups" )		
-			definitions.append(groupContent)
-		if (modelView.actionBar is not None):
-			for action in modelView.actionBar.actionList:
-				actions.append(action.toJson())
-		print fieldValues
-		return {'definitions': definitions, 'values': fieldValues, 'actions': actions, 
-					'keepDefaultDefs': modelView.keepDefaultDefs, 'computeAsync' : self.async}
+				self.superGroupValues2Json(group, fieldValues, arrayEncoding)
+		result = {'values': fieldValues, 'keepDefaultDefs': modelView.keepDefaultDefs, 
+				'computeAsync' : self.async, 'schemaETag': schema['eTag']}
+		if (schemaETag != schema['eTag']):
+			result['definitions'] = schema['definitions']
+			result['actions'] = schema['actions']
+		return result
+	
+	@classmethod
+	def getModelViewSchema(cls, modelView):
+		"""
+		Returns the definitions and actions of the modelView, which depend only on the
+		class. They are created once and cached in :attr:`modelViewSchemas` together 
+		with an ETag computed from their content
+		"""
+		key = (cls, modelView.name)
+		schema = NumericalModel.modelViewSchemas.get(key)
+		if (schema is None):
+			definitions = [] 
+			actions = []
+			for group in modelView.superGroups:
+				if (isinstance(group, fields.SubModelGroup)):
+					groupContent = cls.subModelGroup2Json(group)
+				elif (isinstance(group, fields.SuperGroup)):
+					groupContent = cls.superGroup2Json(group)
+				else:
+					raise TypeError("The argument to 'groupList2Json' must be a list of SuperGroups" )		
+				definitions.append(groupContent)
+			if (modelView.actionBar is not None):
+				for action in modelView.actionBar.actionList:
+					actions.append(action.toJson())
+			eTag = hashlib.md5(json.dumps([definitions, actions], sort_keys = True, default = str)).hexdigest()
+			schema = {'definitions': definitions, 'actions': actions, 'eTag': eTag}
+			NumericalModel.modelViewSchemas[key] = schema
+		return schema
+	
+	@classmethod
+	def clearModelViewSchemas(cls):
+		"""
+		Clears the cached definitions of all the model views (needed when fields 
+		are redefined, since the definitions of sub-models are included in their parents)
+		"""
+		NumericalModel.modelViewSchemas.clear()
 
-	def superGroup2Json(self, group, fieldValues):
+	@classmethod
+	def superGroup2Json(cls, group):
 		"""
 		Provides JSON serializaton of super-group 
 		"""
@@ -289,16 +342,17 @@ class NumericalModel(object):
 		subgroupList = []		
 		for subgroup in group.groups:
 			if (isinstance(subgroup, fields.SubModelGroup)):
-				groupContent = self.subModelGroup2Json(subgroup, fieldValues)
+				groupContent = cls.subModelGroup2Json(subgroup)
 			elif (isinstance(subgroup, fields.BasicGroup)):
-				groupContent = self.basicGroup2Json(subgroup, fieldValues)
+				groupContent = cls.basicGroup2Json(subgroup)
 			else:
 				raise TypeError("SuperGroup can only contain Field groups and View groups, not {}".format(type(subgroup)))
 			subgroupList.append(groupContent)
 		jsonObject['groups'] = subgroupList				
 		return jsonObject
 		
-	def basicGroup2Json(self, group, fieldValues):
+	@classmethod
+	def basicGroup2Json(cls, group):
 		"""
 		Provides JSON serializaton of field-group and view-group 
 		"""
@@ -313,20 +367,18 @@ class NumericalModel(object):
 		fieldList = []
 		for field in group.fields:
 			fieldList.append(field.toFormDict())
-			fieldValues[field.name] = field.getValueRepr(self.__getattr__(field.name))
 		jsonObject['fields'] = fieldList
 		return jsonObject
 	
-	def subModelGroup2Json(self, group, fieldValues):
+	@classmethod
+	def subModelGroup2Json(cls, group):
 		"""
 		Provides JSON serializaton of sub-model group
 		"""
-		instance = self.__getattr__(group.name)
-		subFieldValues = {}
 		if (isinstance(group.group, BasicGroup)):
-			jsonObject = instance.basicGroup2Json(group.group, subFieldValues)
+			jsonObject = group.klass.basicGroup2Json(group.group)
 		elif (isinstance(group.group, SuperGroup)):
-			jsonObject = instance.superGroup2Json(group.group, subFieldValues)
+			jsonObject = group.klass.superGroup2Json(group.group)
 		else:
 			pass			
 		jsonObject['name'] = group.name
@@ -335,9 +387,40 @@ class NumericalModel(object):
 		if (group.show is not None):
 			jsonObject['show'] = group.show
 		jsonObject['dataSourceRoot'] = group.name
-		fieldValues[group.name] = subFieldValues
 		return jsonObject
 	
+	def superGroupValues2Json(self, group, fieldValues, arrayEncoding = None):
+		"""
+		Adds the values of the fields in a super-group to the ``fieldValues`` dictionary
+		"""
+		for subgroup in group.groups:
+			if (isinstance(subgroup, fields.SubModelGroup)):
+				self.subModelGroupValues2Json(subgroup, fieldValues, arrayEncoding)
+			else:
+				self.basicGroupValues2Json(subgroup, fieldValues, arrayEncoding)
+	
+	def basicGroupValues2Json(self, group, fieldValues, arrayEncoding = None):
+		"""
+		Adds the values of the fields in a field-group or view-group to the ``fieldValues`` dictionary
+		"""
+		for field in group.fields:
+			if (arrayEncoding is None):
+				fieldValues[field.name] = field.getValueRepr(self.__getattr__(field.name))
+			else:
+				fieldValues[field.name] = field.getEncodedValueRepr(self.__getattr__(field.name), arrayEncoding)
+	
+	def subModelGroupValues2Json(self, group, fieldValues, arrayEncoding = None):
+		"""
+		Adds the values of the fields in a sub-model group to the ``fieldValues`` dictionary
+		"""
+		instance = self.__getattr__(group.name)
+		subFieldValues = {}
+		if (isinstance(group.group, BasicGroup)):
+			instance.basicGroupValues2Json(group.group, subFieldValues, arrayEncoding)
+		elif (isinstance(group.group, SuperGroup)):
+			instance.superGroupValues2Json(group.group, subFieldValues, arrayEncoding)
+		fieldValues[group.name] = subFieldValues
+	
 	def fieldValuesFromJson(self, jsonDict):
 		"""
 		Sets field values from dictionary representing JSON object
@@ -357,6 +440,14 @@ class NumericalModel(object):
 		
 		:param current: the current progress value 
 		:param total: the total progress value
+		
+		The updates are skipped if less than :attr:`progressUpdateInterval` seconds 
+		passed since the last one, except for the final one (``current >= total``)
 		"""
+		now = time.time()
+		if (current < total and 
+				now - self.__dict__.get('lastProgressUpdate', 0) < self.progressUpdateInterval):
+			return
+		self.lastProgressUpdate = now
 		self.task.update_state(state='PROGRESS', 
 									meta={'current': current, 'total': total})
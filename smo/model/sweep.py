@@ -0,0 +1,171 @@
+'''
+Created on Oct 18, 2026
+
+Parameter sweeps: evaluation of a numerical model over a list or grid of input values
+'''
+import copy
+import itertools
+import multiprocessing
+from collections import OrderedDict
+from smo.model.model import modelRegistry
+import smo.model.fields as F
+
+def setPathValue(values, path, value):
+	"""
+	Sets a value in a (nested) field value dictionary. Fields of sub-models are
+	specified by dotted paths, e.g. 'fluidSource.T'
+	"""
+	parts = path.split('.')
+	for part in parts[:-1]:
+		values = values.setdefault(part, {})
+	values[parts[-1]] = value
+
+def getPathValue(instance, path):
+	"""
+	Returns the JSON representation of the value of a (sub-model) field of a model instance
+	"""
+	parts = path.split('.')
+	for part in parts[:-1]:
+		instance = instance.__getattr__(part)
+	field = instance.declared_fields[parts[-1]]
+	return field.getValueRepr(instance.__getattr__(parts[-1]))
+
+def evaluateSweepPoint(modelName, parameters, outputs):
+	"""
+	Computes a model with the given field values
+
+	:param str modelName: name of the model in the model registry
+	:param dict parameters: field values (in the format used by the client)
+	:param list outputs: paths of the fields whose values are returned
+	:return: list of output values
+	"""
+	model = modelRegistry[modelName]
+	instance = model()
+	instance.fieldValuesFromJson(parameters)
+	if (model.async):
+		# There is no task to report the progress to
+		instance.updateProgress = lambda current, total: None
+		instance.computeAsync()
+	else:
+		instance.compute()
+	return [getPathValue(instance, path) for path in outputs]
+
+def _evaluateSweepPointWorker(args):
+	index, modelName, parameters, outputs = args
+	try:
+		return index, evaluateSweepPoint(modelName, parameters, outputs), None
+	except Exception, e:
+		return index, None, '{0}: {1}'.format(type(e).__name__, e)
+
+class ParameterSweep(object):
+	"""
+	Evaluation of a model for a set of points, each of them defined by the values
+	of some of the input fields (overrides), which replace those of a base parameter set.
+	The results are collected in a table with a column for each overridden field
+	and each output field
+	"""
+	def __init__(self, model, base = None, overrides = None, grid = None, outputs = None):
+		"""
+		:param model: the model class
+		:param dict base: the field values common for all the points (defaults are used for the missing fields)
+		:param list overrides: list of dictionaries ``{fieldPath: value}``, one for each point
+		:param grid: ordered list of ``(fieldPath, values)`` pairs (or dictionary),
+			the points of the grid are added to the overrides
+		:param list outputs: paths of the output fields (default: all the Quantity
+			fields of the model which are not overridden)
+		"""
+		self.model = model
+		self.base = base if base is not None else {}
+		self.points = list(overrides) if overrides is not None else []
+		if (grid is not None):
+			if (isinstance(grid, dict)):
+				grid = grid.items()
+			gridPaths = [path for path, _ in grid]
+			for gridValues in itertools.product(*[values for _, values in grid]):
+				self.points.append(OrderedDict(zip(gridPaths, gridValues)))
+		self.inputColumns = []
+		for point in self.points:
+			for path in point:
+				if (path not in self.inputColumns):
+					self.inputColumns.append(path)
+		if (outputs is None):
+			outputs = [name for name, field in model.declared_fields.iteritems()
+						if isinstance(field, F.Quantity) and name not in self.inputColumns]
+		self.outputs = list(outputs)
+
+	def __len__(self):
+		return len(self.points)
+
+	def getParameters(self, index):
+		"""
+		Field values for the computation of a point
+		"""
+		parameters = copy.deepcopy(self.base)
+		for path, value in self.points[index].iteritems():
+			setPathValue(parameters, path, value)
+		return parameters
+
+	def getInputValues(self, index):
+		"""
+		Values of the input columns for a point (from the base parameters, if not overridden)
+		"""
+		point = self.points[index]
+		inputValues = []
+		for path in self.inputColumns:
+			if (path in point):
+				inputValues.append(point[path])
+			else:
+				value = self.base
+				for part in path.split('.'):
+					value = value.get(part) if isinstance(value, dict) else None
+				inputValues.append(value)
+		return inputValues
+
+	def makeRow(self, index, outputValues):
+		if (outputValues is None):
+			outputValues = [None] * len(self.outputs)
+		return self.getInputValues(index) + list(outputValues)
+
+	@property
+	def columns(self):
+		return self.inputColumns + self.outputs
+
+	def iterResults(self, numWorkers = None):
+		"""
+		Generator evaluating the points with a process pool and yielding the results
+		as they finish
+
+		:param int numWorkers: number of processes (default: number of CPUs,
+			1 for evaluating in the current process). Use 1 in multithreaded 
+			processes, like the web server, which cannot be forked safely.
+		:return: tuples (index, row, error), with error being None or the error message
+		"""
+		tasks = ((i, self.model.__name__, self.getParameters(i), self.outputs)
+				for i in range(len(self.points)))
+		if (numWorkers == 1):
+			results = itertools.imap(_evaluateSweepPointWorker, tasks)
+			pool = None
+		else:
+			pool = multiprocessing.Pool(numWorkers)
+			results = pool.imap_unordered(_evaluateSweepPointWorker, tasks)
+		try:
+			for index, outputValues, error in results:
+				yield index, self.makeRow(index, outputValues), error
+		finally:
+			if (pool is not None):
+				pool.terminate()
+
+	def run(self, numWorkers = None):
+		"""
+		Evaluates all the points
+
+		:return: table as dictionary with keys 'columns', 'rows' (in the order of the
+			points) and 'errors' (dictionary of error messages by point index)
+		"""
+		rows = [None] * len(self.points)
+		errors = {}
+		for index, row, error in self.iterResults(numWorkers):
+			rows[index] = row
+			if (error is not None):
+				errors[index] = error
+		return {'columns': self.columns, 'rows': rows, 'errors': errors}
@@ -0,0 +1,121 @@
+'''
+Created on Oct 18, 2026
+
+@author: Atanas Pavlov
+@copyright: SysMo Ltd, Bulgaria
+'''
+import base64
+import unittest
+import numpy as np
+import smo.model.fields as F
+from smo.model.model import NumericalModel
+from smo.model.sweep import ParameterSweep
+
+"""
+======================================
+fields.py
+======================================
+"""
+
+def decodeColumn(column):
+	if ('values' in column):
+		return np.array(column['values'])
+	dtype = '<f4' if column['dtype'] == 'float32' else '<f8'
+	return np.frombuffer(base64.b64decode(column['data']), dtype = dtype)
+
+class TestArrayEncoding(unittest.TestCase):
+	def setUp(self):
+		self.plotView = F.PlotView((
+				('pressure', F.Quantity('Pressure', default = (1, 'Pa'))),
+				('temperature', F.Quantity('Temperature', default = (1, 'K')))
+			))
+	
+	def testStructuredArray(self):
+		value = np.zeros((3,), dtype = [('p', np.float64), ('T', np.float32), ('name', 'S5')])
+		value['p'] = [1e5, 2e5, 3e5]
+		value['T'] = [0.1, 300., 400.]
+		value['name'] = ['a', 'b', 'c']
+		encoded = F.encodeStructuredArray(value, F.base64ColumnsEncoding)
+		self.assertEqual(encoded['encoding'], F.base64ColumnsEncoding)
+		self.assertEqual(encoded['shape'], [3, 3])
+		self.assertEqual(encoded['columns'][1]['dtype'], 'float32')
+		np.testing.assert_array_equal(decodeColumn(encoded['columns'][0]), value['p'])
+		np.testing.assert_array_equal(decodeColumn(encoded['columns'][1]), value['T'])
+		self.assertEqual(encoded['columns'][2]['values'], ['a', 'b', 'c'])
+	
+	def testPlainArray(self):
+		value = np.arange(10.).reshape((5, 2))
+		encoded = self.plotView.getEncodedValueRepr(value, F.base64ColumnsEncoding)
+		self.assertEqual(encoded['shape'], [5, 2])
+		for j in range(2):
+			np.testing.assert_array_equal(decodeColumn(encoded['columns'][j]), value[:, j])
+	
+	def testPlainArrayColumnSelection(self):
+		# Non-contiguous columns, as in data[:, (0, 1)]
+		data = np.arange(15).reshape((5, 3))
+		value = data[:, (0, 2)]
+		encoded = self.plotView.getEncodedValueRepr(value, F.base64ColumnsEncoding)
+		self.assertEqual(encoded['columns'][1]['dtype'], 'float64')
+		np.testing.assert_array_equal(decodeColumn(encoded['columns'][1]), value[:, 1])
+	
+	def testPlainArrayOtherShapes(self):
+		value = np.arange(4.)
+		self.assertEqual(F.encodeStructuredArray(value, F.base64ColumnsEncoding), value.tolist())
+	
+	def testUnknownEncoding(self):
+		self.assertRaises(ValueError, F.encodeStructuredArray, np.zeros((2, 2)), 'unknown')
+
+"""
+======================================
+sweep.py
+======================================
+"""
+
+class SweepTestModel(NumericalModel):
+	x = F.Quantity(default = 1.)
+	y = F.Quantity(default = 2.)
+	z = F.Quantity(default = 0.)
+	modelBlocks = []
+	
+	def compute(self):
+		if (self.x < 0):
+			raise ValueError('Negative x')
+		self.z = self.x * self.y
+
+class TestParameterSweep(unittest.TestCase):
+	def testGrid(self):
+		sweep = ParameterSweep(SweepTestModel, grid = [('x', [1., 2.]), ('y', [3., 4., 5.])])
+		self.assertEqual(len(sweep), 6)
+		self.assertEqual(sweep.columns, ['x', 'y', 'z'])
+		self.assertEqual(sweep.getParameters(1), {'x': 1., 'y': 4.})
+		result = sweep.run(numWorkers = 1)
+		self.assertEqual(result['columns'], ['x', 'y', 'z'])
+		self.assertEqual(result['rows'], [[1., 3., 3.], [1., 4., 4.], [1., 5., 5.], 
+				[2., 3., 6.], [2., 4., 8.], [2., 5., 10.]])
+		self.assertEqual(result['errors'], {})
+	
+	def testOverrides(self):
+		sweep = ParameterSweep(SweepTestModel, base = {'y': 10.}, 
+				overrides = [{'x': 2.}, {'x': 3., 'y': 1.}], outputs = ['z'])
+		self.assertEqual(sweep.columns, ['x', 'y', 'z'])
+		# Values of the columns which are not overridden are taken from the base
+		self.assertEqual(sweep.getInputValues(0), [2., 10.])
+		self.assertEqual(sweep.run(numWorkers = 1)['rows'], [[2., 10., 20.], [3., 1., 3.]])
+	
+	def testErrors(self):
+		sweep = ParameterSweep(SweepTestModel, overrides = [{'x': 1.}, {'x': -1.}, {'x': 2.}], outputs = ['z'])
+		result = sweep.run(numWorkers = 1)
+		self.assertEqual(result['rows'], [[1., 2.], [-1., None], [2., 4.]])
+		self.assertEqual(result['errors'].keys(), [1])
+		self.assertIn('Negative x', result['errors'][1])
+	
+	def testProcessPool(self):
+		sweep = ParameterSweep(SweepTestModel, grid = {'x': range(10)}, outputs = ['z'])
+		rows = {}
+		for index, row, error in sweep.iterResults(numWorkers = 2):
+			self.assertIsNone(error)
+			rows[index] = row
+		self.assertEqual([rows[i] for i in range(10)], [[x, 2. * x] for x in range(10)])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,115 @@
+'''
+Created on Oct 18, 2026
+
+Per-process cache of reusable heavy resources (meshes, fluids, interpolators etc.)
+'''
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import logging
+appLogger = logging.getLogger('AppLogger')
+
+def estimateSize(obj, maxDepth = 4, _visited = None):
+	"""
+	Rough estimate of the memory used by an object in bytes, dominated by the
+	numpy arrays reachable through its attributes, dictionaries and sequences
+	"""
+	if (_visited is None):
+		_visited = set()
+	if (id(obj) in _visited):
+		return 0
+	_visited.add(id(obj))
+	if (isinstance(obj, np.ndarray)):
+		return obj.nbytes
+	size = sys.getsizeof(obj, 0)
+	if (maxDepth == 0):
+		return size
+	if (isinstance(obj, dict)):
+		children = obj.values()
+	elif (isinstance(obj, (list, tuple, set, frozenset))):
+		children = obj
+	elif (hasattr(obj, '__dict__')):
+		children = obj.__dict__.values()
+	else:
+		children = []
+	for child in children:
+		size += estimateSize(child, maxDepth - 1, _visited)
+	return size
+
+class WarmResourceCache(object):
+	"""
+	LRU cache of resources which are expensive to create and can be reused by
+	subsequent computations in the same process. The resources are keyed by a
+	namespace (e.g. the resource type) and a hashable key made of the inputs they
+	depend on, and the least recently used ones are evicted when their estimated
+	total size exceeds maxBytes. The cached resources must not be modified by the users.
+	"""
+	def __init__(self, maxBytes = 512 * 2**20):
+		self.maxBytes = maxBytes
+		self.entries = OrderedDict()
+		self.totalBytes = 0
+		self.lock = threading.RLock()
+		self.preloaders = []
+
+	def get(self, namespace, key, factory, sizeFunc = estimateSize):
+		"""
+		Returns the cached resource, creating it with ``factory()`` if not present
+
+		:param namespace: resource type
+		:param key: hashable object identifying the resource within the namespace
+		:param factory: function without arguments creating the resource
+		:param sizeFunc: function estimating the size of the resource in bytes
+		"""
+		cacheKey = (namespace, key)
+		with self.lock:
+			entry = self.entries.pop(cacheKey, None)
+			if (entry is not None):
+				# Mark as recently used
+				self.entries[cacheKey] = entry
+				return entry[0]
+		resource = factory()
+		size = sizeFunc(resource)
+		with self.lock:
+			if (cacheKey in self.entries):
+				# Created concurrently by another thread
+				return self.entries[cacheKey][0]
+			if (size > self.maxBytes):
+				appLogger.info("Resource {0} too large to cache ({1} bytes)".format(namespace, size))
+				return resource
+			self.entries[cacheKey] = (resource, size)
+			self.totalBytes += size
+			self.evict()
+		return resource
+
+	def evict(self):
+		with self.lock:
+			while (self.totalBytes > self.maxBytes and len(self.entries) > 0):
+				_, (_, size) = self.entries.popitem(last = False)
+				self.totalBytes -= size
+
+	def clear(self):
+		with self.lock:
+			self.entries.clear()
+			self.totalBytes = 0
+
+	def registerPreloader(self, preloader):
+		"""
+		Registers a function without arguments, which creates the commonly used
+		resources by calling :func:`get`. It is run by :func:`preload`
+		"""
+		self.preloaders.append(preloader)
+		return preloader
+
+	def preload(self):
+		"""
+		Runs the registered preloaders, e.g. on worker process startup
+		"""
+		for preloader in self.preloaders:
+			try:
+				preloader()
+			except Exception, e:
+				appLogger.warning("Failed preloading resources with {0}: {1}".format(preloader.__name__, e))
+
+# Resources of the current process
+warmResources = WarmResourceCache()
@@ -0,0 +1,191 @@
+'''
+Created on Oct 18, 2026
+
+Memoization of the results of deterministic compute actions
+'''
+import os
+import sys
+import json
+import time
+import inspect
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+logger = logging.getLogger('django.request.smo.cache')
+
+class MongoCacheTier(object):
+	"""
+	Shared cache tier storing the results as documents in a MongoDB collection
+	"""
+	def __init__(self, collection):
+		self.collection = collection
+
+	def get(self, key):
+		"""
+		:return: (value, expiresAt) or None
+		"""
+		record = self.collection.find_one({'_id': key})
+		if (record is None):
+			return None
+		if (record['expiresAt'] is not None and record['expiresAt'] < time.time()):
+			self.collection.remove({'_id': key})
+			return None
+		return json.loads(record['value']), record['expiresAt']
+
+	def put(self, key, value, expiresAt):
+		self.collection.save({'_id': key, 'value': json.dumps(value), 'expiresAt': expiresAt})
+
+class DiskCacheTier(object):
+	"""
+	Shared cache tier storing the results as JSON files in a local folder
+	"""
+	def __init__(self, folder):
+		self.folder = folder
+		if (not os.path.exists(folder)):
+			os.makedirs(folder)
+
+	def get(self, key):
+		"""
+		:return: (value, expiresAt) or None
+		"""
+		filePath = os.path.join(self.folder, key + '.json')
+		if (not os.path.exists(filePath)):
+			return None
+		with open(filePath) as f:
+			record = json.load(f)
+		if (record['expiresAt'] is not None and record['expiresAt'] < time.time()):
+			os.remove(filePath)
+			return None
+		return record['value'], record['expiresAt']
+
+	def put(self, key, value, expiresAt):
+		filePath = os.path.join(self.folder, key + '.json')
+		# Write to a temporary file first, so that readers never see partial files
+		tmpFilePath = '{0}.{1}.{2}.tmp'.format(filePath, os.getpid(), threading.current_thread().ident)
+		with open(tmpFilePath, 'w') as f:
+			json.dump({'value': value, 'expiresAt': expiresAt}, f)
+		os.rename(tmpFilePath, filePath)
+
+class ComputeResultCache(object):
+	"""
+	Cache of the responses of the compute action for models with ``cacheResults = True``.
+	The key is made of the model class, the view, the canonicalized field values sent by
+	the client, the array encoding and a code version, so that changing the code 
+	invalidates the old results. The code version combines the deployment ``version``,
+	the CoolProp version and a hash of the source code of the model and of the loaded
+	modules of the ``smo`` package and of the package of the model.
+
+	There is a bounded in-process LRU tier and an optional shared tier
+	(:class:`MongoCacheTier` or :class:`DiskCacheTier`). The entries expire after
+	the ``resultCacheTTL`` (in seconds) of the model, if it is not None.
+	"""
+	def __init__(self, maxSize = 256, sharedTier = None, version = None):
+		"""
+		:param version: version of the deployment (e.g. a release number or a 
+			revision), changing it invalidates all the results of the shared tier
+		"""
+		self.maxSize = maxSize
+		self.sharedTier = sharedTier
+		self.version = version
+		self.entries = OrderedDict()
+		self.codeVersions = {}
+		self.lock = threading.Lock()
+
+	@staticmethod
+	def getCoolPropVersion():
+		try:
+			from smo.media.CoolProp.CoolProp import getVersion
+		except ImportError:
+			return None
+		return getVersion()
+
+	def getSourceFiles(self, model):
+		"""
+		Source files of the model class and its bases, and of the loaded modules of
+		the ``smo`` package and of the top-level package of the model, which include
+		the modules used by the model computations
+		"""
+		sourceFiles = set()
+		for klass in inspect.getmro(model):
+			try:
+				sourceFiles.add(inspect.getsourcefile(klass))
+			except TypeError:
+				# Built-in classes
+				pass
+		packages = set(['smo', model.__module__.split('.')[0]])
+		for moduleName, module in sys.modules.items():
+			if (module is None or moduleName.split('.')[0] not in packages):
+				continue
+			try:
+				sourceFiles.add(inspect.getsourcefile(module))
+			except TypeError:
+				# Built-in modules
+				pass
+		return sorted(f for f in sourceFiles if f is not None)
+
+	def getCodeVersion(self, model):
+		"""
+		Hash of the deployment version, the CoolProp version and the source files
+		returned by :meth:`getSourceFiles`
+		"""
+		version = self.codeVersions.get(model)
+		if (version is None):
+			digest = hashlib.md5()
+			digest.update(json.dumps([self.version, self.getCoolPropVersion()]))
+			for sourceFile in self.getSourceFiles(model):
+				with open(sourceFile, 'rb') as f:
+					digest.update(f.read())
+			version = digest.hexdigest()
+			self.codeVersions[model] = version
+		return version
+
+	def makeKey(self, model, view, parameters, arrayEncoding = None):
+		canonicalValues = json.dumps(parameters, sort_keys = True, separators = (',', ':'))
+		keyData = json.dumps([model.__module__, model.__name__, view.name,
+				self.getCodeVersion(model), arrayEncoding, canonicalValues])
+		return hashlib.sha1(keyData).hexdigest()
+
+	def get(self, key):
+		with self.lock:
+			entry = self.entries.get(key)
+			if (entry is not None):
+				expiresAt, value = entry
+				if (expiresAt is None or expiresAt >= time.time()):
+					# Mark as recently used
+					del self.entries[key]
+					self.entries[key] = entry
+					return value
+				del self.entries[key]
+		if (self.sharedTier is not None):
+			try:
+				record = self.sharedTier.get(key)
+			except Exception, e:
+				logger.warning('Failed reading the shared result cache: {0}'.format(e))
+				record = None
+			if (record is not None):
+				value, expiresAt = record
+				self.putLocal(key, value, expiresAt)
+				return value
+		return None
+
+	def put(self, key, value, ttl = None):
+		expiresAt = None if ttl is None else time.time() + ttl
+		self.putLocal(key, value, expiresAt)
+		if (self.sharedTier is not None):
+			try:
+				self.sharedTier.put(key, value, expiresAt)
+			except Exception, e:
+				logger.warning('Failed writing to the shared result cache: {0}'.format(e))
+
+	def putLocal(self, key, value, expiresAt):
+		with self.lock:
+			if (key in self.entries):
+				del self.entries[key]
+			self.entries[key] = (expiresAt, value)
+			while (len(self.entries) > self.maxSize):
+				self.entries.popitem(last = False)
+
+	def clear(self):
+		with self.lock:
+			self.entries.clear()
@@ -0,0 +1,71 @@
+'''
+Created on Oct 18, 2026
+
+Streaming of the progress of asynchronous computations through the message broker
+'''
+import json
+import socket
+import logging
+from kombu import Exchange, Queue, Consumer
+logger = logging.getLogger('django.request.smo.progress')
+
+# Exchange of the progress messages, routed by job ID
+progressExchange = Exchange('smo.progress', type = 'direct', durable = False, delivery_mode = 'transient')
+
+finalStates = ('SUCCESS', 'FAILURE', 'REVOKED')
+
+def publishProgress(app, jobID, state, current = None, total = None):
+	"""
+	Publishes a progress message of a job to the subscribed progress streams (if any)
+
+	:param app: the celery application, whose broker connection pool is used
+	"""
+	message = {'state': state}
+	if (current is not None):
+		message.update({'current': current, 'total': total})
+	try:
+		with app.producer_or_acquire() as producer:
+			producer.publish(message, exchange = progressExchange, routing_key = jobID,
+							serializer = 'json', declare = [progressExchange])
+	except Exception, e:
+		# The progress can still be obtained from the result backend
+		logger.warning('Failed publishing progress of job {0}: {1}'.format(jobID, e))
+
+def formatEvent(message):
+	return 'data: {0}\n\n'.format(json.dumps(message))
+
+def iterProgressEvents(connection, jobID, getJobState, heartbeatInterval = 10.):
+	"""
+	Generator of Server-Sent Events with the progress messages of a job,
+	ending with the first message in a final state
+
+	:param connection: kombu connection to the broker
+	:param getJobState: function returning the state message of the job, read from the
+		result backend. It is used when subscribing, since the messages published
+		before are lost, and on each heartbeat, to detect jobs killed without a final message
+	:param heartbeatInterval: maximum time in seconds between 2 events
+	"""
+	messages = []
+	queue = Queue('', exchange = progressExchange, routing_key = jobID,
+				exclusive = True, auto_delete = True, durable = False)
+	with connection:
+		consumer = Consumer(connection, queues = [queue], no_ack = True, accept = ['json'],
+						callbacks = [lambda body, message: messages.append(body)])
+		with consumer:
+			message = getJobState()
+			yield formatEvent(message)
+			if (message['state'] in finalStates):
+				return
+			while True:
+				try:
+					connection.drain_events(timeout = heartbeatInterval)
+				except socket.timeout:
+					message = getJobState()
+					yield formatEvent(message)
+					if (message['state'] in finalStates):
+						return
+				while (len(messages) > 0):
+					message = messages.pop(0)
+					yield formatEvent(message)
+					if (message['state'] in finalStates):
+						return
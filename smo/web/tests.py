@@ -0,0 +1,146 @@
+'''
+Created on Oct 18, 2026
+
+@author: Atanas Pavlov
+@copyright: SysMo Ltd, Bulgaria
+'''
+import os
+import inspect
+import shutil
+import tempfile
+import unittest
+import smo.model.fields as F
+from smo.model.model import NumericalModel
+import smo.web.view as V
+from smo.web.cache import ComputeResultCache, DiskCacheTier
+
+"""
+======================================
+view.py
+======================================
+"""
+
+class SweepActionModel(NumericalModel):
+	x = F.Quantity(default = 1.)
+	z = F.Quantity(default = 0.)
+	modelBlocks = []
+
+	def compute(self):
+		self.z = 2 * self.x
+
+class AsyncSweepActionModel(SweepActionModel):
+	async = True
+
+class TestSweepActions(unittest.TestCase):
+	def setUp(self):
+		# The actions don't use the router
+		self.view = V.ModularPageView.__new__(V.ModularPageView)
+
+	def testSweep(self):
+		result = V.ModularPageView.sweep(self.view, SweepActionModel, None,
+				{'grid': [['x', [1., 2., 3.]]], 'outputs': ['z']})
+		self.assertEqual(result['rows'], [[1., 2.], [2., 4.], [3., 6.]])
+
+	def testSweepAsyncModel(self):
+		with self.assertRaisesRegexp(ValueError, 'startSweep'):
+			V.ModularPageView.sweep(self.view, AsyncSweepActionModel, None,
+					{'grid': [['x', [1., 2.]]]})
+
+	def testSweepMaxPoints(self):
+		parameters = {'grid': [['x', range(V.sweepMaxRequestPoints + 1)]]}
+		with self.assertRaisesRegexp(ValueError, 'more than the maximum'):
+			V.ModularPageView.sweep(self.view, SweepActionModel, None, parameters)
+		# The celery workers accept larger sweeps
+		sweep = self.view.createSweep(SweepActionModel, parameters, V.sweepMaxPoints)
+		self.assertEqual(len(sweep), V.sweepMaxRequestPoints + 1)
+
+"""
+======================================
+cache.py
+======================================
+"""
+
+class CacheTestView(object):
+	def __init__(self, name):
+		self.name = name
+
+class FailingCacheTier(object):
+	def get(self, key):
+		raise IOError('get failed')
+	
+	def put(self, key, value, expiresAt):
+		raise IOError('put failed')
+
+class TestComputeResultCache(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+	
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+	
+	def testLRU(self):
+		cache = ComputeResultCache(maxSize = 2)
+		cache.put('a', 1)
+		cache.put('b', 2)
+		self.assertEqual(cache.get('a'), 1)
+		# 'b' is the least recently used
+		cache.put('c', 3)
+		self.assertIsNone(cache.get('b'))
+		self.assertEqual(cache.get('a'), 1)
+		self.assertEqual(cache.get('c'), 3)
+		cache.clear()
+		self.assertIsNone(cache.get('a'))
+	
+	def testTTL(self):
+		cache = ComputeResultCache()
+		cache.put('expired', 1, ttl = -1)
+		cache.put('valid', 2, ttl = 3600)
+		cache.put('forever', 3)
+		self.assertIsNone(cache.get('expired'))
+		self.assertNotIn('expired', cache.entries)
+		self.assertEqual(cache.get('valid'), 2)
+		self.assertEqual(cache.get('forever'), 3)
+	
+	def testDiskTier(self):
+		folder = os.path.join(self.tempDir, 'cache')
+		cache = ComputeResultCache(sharedTier = DiskCacheTier(folder))
+		cache.put('key', {'values': [1, 2.5, 'x']})
+		cache.put('expired', 1, ttl = -1)
+		self.assertEqual(sorted(os.listdir(folder)), ['expired.json', 'key.json'])
+		# Another process sharing the folder
+		otherCache = ComputeResultCache(sharedTier = DiskCacheTier(folder))
+		self.assertEqual(otherCache.get('key'), {'values': [1, 2.5, 'x']})
+		self.assertIn('key', otherCache.entries)
+		self.assertIsNone(otherCache.get('expired'))
+		self.assertEqual(os.listdir(folder), ['key.json'])
+	
+	def testSharedTierErrors(self):
+		cache = ComputeResultCache(sharedTier = FailingCacheTier())
+		cache.put('key', 1)
+		self.assertEqual(cache.get('key'), 1)
+		self.assertIsNone(cache.get('missing'))
+	
+	def testKey(self):
+		cache = ComputeResultCache(version = '1.0')
+		view = CacheTestView('resultView')
+		key = cache.makeKey(SweepActionModel, view, {'x': 1, 'y': {'a': 2, 'b': 3}})
+		# The order of the field values doesn't matter
+		self.assertEqual(key, cache.makeKey(SweepActionModel, view, {'y': {'b': 3, 'a': 2}, 'x': 1}))
+		self.assertNotEqual(key, cache.makeKey(SweepActionModel, view, {'x': 2, 'y': {'a': 2, 'b': 3}}))
+		self.assertNotEqual(key, cache.makeKey(SweepActionModel, CacheTestView('other'), {'x': 1, 'y': {'a': 2, 'b': 3}}))
+		self.assertNotEqual(key, cache.makeKey(SweepActionModel, view, {'x': 1, 'y': {'a': 2, 'b': 3}}, 
+				arrayEncoding = 'base64Columns'))
+		self.assertNotEqual(key, cache.makeKey(AsyncSweepActionModel, view, {'x': 1, 'y': {'a': 2, 'b': 3}}))
+		# A new deployment version invalidates the results
+		otherVersion = ComputeResultCache(version = '1.1')
+		self.assertNotEqual(key, otherVersion.makeKey(SweepActionModel, view, {'x': 1, 'y': {'a': 2, 'b': 3}}))
+	
+	def testSourceFiles(self):
+		cache = ComputeResultCache()
+		sourceFiles = [os.path.realpath(f) for f in cache.getSourceFiles(SweepActionModel)]
+		for module in (F, V, NumericalModel):
+			self.assertIn(os.path.realpath(inspect.getsourcefile(module)), sourceFiles)
+		self.assertEqual(cache.getCodeVersion(SweepActionModel), cache.getCodeVersion(SweepActionModel))
+
+if __name__ == '__main__':
+	unittest.main()
@@ -1,12 +1,20 @@
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render_to_response, RequestContext
 from SmoWeb.settings import JINJA_TEMPLATE_IMPORTS, db
+import SmoWeb.settings
 import json
+import threading
 import traceback
 import logging
 #from smo.data.hdf import HDFInterface
-from SmoWebBase.tasks import celeryCompute
-from celery.result import AsyncResult
+from smo.data.hdf import hdfFilePool
+from smo.data.decimation import MinMaxDecimator
+from smo.web.cache import ComputeResultCache, MongoCacheTier, DiskCacheTier
+from smo.web.progress import iterProgressEvents
+from smo.model.sweep import ParameterSweep
+from SmoWebBase.tasks import celeryCompute, celerySweepPoint
+from celery import group
+from celery.result import AsyncResult, GroupResult
 from celery.task.control import revoke
 import h5py
 import numpy as np
@@ -14,6 +22,28 @@ logger = logging.getLogger('django.request.smo.view')
 
 from bson.objectid import ObjectId
 
+def createComputeResultCache(cacheSettings):
+	"""
+	Creates the cache for the compute results of the models with ``cacheResults = True``
+	
+	:param dict cacheSettings: may contain 'maxSize' (number of results kept in memory), 
+		'sharedTier' ('mongodb', 'disk' or None), 'folder' (for the disk tier) and
+		'version' (version of the deployment)
+	"""
+	sharedTier = None
+	if (cacheSettings.get('sharedTier') == 'mongodb'):
+		sharedTier = MongoCacheTier(db.computeResultCache)
+	elif (cacheSettings.get('sharedTier') == 'disk'):
+		sharedTier = DiskCacheTier(cacheSettings['folder'])
+	return ComputeResultCache(maxSize = cacheSettings.get('maxSize', 256), sharedTier = sharedTier,
+			version = cacheSettings.get('version'))
+
+computeResultCache = createComputeResultCache(getattr(SmoWeb.settings, 'COMPUTE_RESULT_CACHE', {}))
+
+# Limits for parameter sweeps (in the request process and by the celery workers)
+sweepMaxRequestPoints = getattr(SmoWeb.settings, 'SWEEP_MAX_REQUEST_POINTS', 100)
+sweepMaxPoints = getattr(SmoWeb.settings, 'SWEEP_MAX_POINTS', 10000)
+
 class Action(object):
 	"""
 	Abstract base class for all action types
@@ -128,6 +158,8 @@ class ModularPageView(object):
 	
 	def __init__(self, router):
 		self.router = router
+		# Options of the request being processed by the current thread
+		self.requestOptions = threading.local()
 		
 	def view(self, request):
 		"""
@@ -147,6 +179,8 @@ class ModularPageView(object):
 		Function handling HTTP GET request
 		"""
 		parameters = request.GET
+		if ('progressJobID' in parameters):
+			return self.streamProgress(parameters['progressJobID'])
 		modelView = None
 		self.recordIdDict = {}
 		if (hasattr(self, 'modules') and len(self.modules) > 0):
@@ -185,6 +219,22 @@ class ModularPageView(object):
 		return render_to_response(self.template, context, 
 						context_instance=RequestContext(request))
 	
+	def streamProgress(self, jobID):
+		"""
+		Streams the progress of an asynchronous computation as Server-Sent Events
+		"""
+		def getJobState():
+			job = AsyncResult(jobID)
+			state = job.state
+			message = {'state': state}
+			if (state == 'PROGRESS'):
+				message.update({'current': job.info['current'], 'total': job.info['total']})
+			return message
+		events = iterProgressEvents(celeryCompute.app.connection(), jobID, getJobState)
+		response = StreamingHttpResponse(events, content_type = 'text/event-stream')
+		response['Cache-Control'] = 'no-cache'
+		return response
+	
 	def post(self, request):
 		"""
 		Function handling HTTP POST request
@@ -196,6 +246,10 @@ class ModularPageView(object):
 		parameters = {}
 		if ('parameters' in data):
 			parameters = data['parameters']
+		# Encoding of array values supported by the client (None for lists of rows)
+		self.requestOptions.arrayEncoding = data.get('arrayEncoding')
+		# ETag of the model view definitions held by the client
+		self.requestOptions.schemaETag = data.get('schemaETag')
 		
 		# Get the calling model view  
 		model = None
@@ -228,7 +282,11 @@ class ModularPageView(object):
 		response = {}
 		if (actionName in self.postActions.keys()):
 			try:
-				response['data'] = self.postActions[actionName](self, model, view, parameters)
+				result = self.postActions[actionName](self, model, view, parameters)
+				if (isinstance(result, StreamingHttpResponse)):
+					# Actions streaming their results handle the errors themselves
+					return result
+				response['data'] = result
 				response['errStatus'] = False
 			except Exception, e:
 				response['errStatus'] = True
@@ -253,7 +311,8 @@ class ModularPageView(object):
 				instance.fieldValuesFromJson(record['values'])
 			else: 
 				raise ValueError("Unknown view data record with id: {0}".format(viewRecordId))
-		return instance.modelView2Json(view)
+		return instance.modelView2Json(view, arrayEncoding = self.requestOptions.arrayEncoding,
+				schemaETag = self.requestOptions.schemaETag)
 		
 	@action.post()
 	def save(self, model, view, parameters):
@@ -269,16 +328,33 @@ class ModularPageView(object):
 		"""
 		Predefined compute action
 		"""
-		instance = model()
-		instance.fieldValuesFromJson(parameters)
-		instance.compute()
-		return instance.modelView2Json(view)
+		if (not model.cacheResults):
+			instance = model()
+			instance.fieldValuesFromJson(parameters)
+			instance.compute()
+			return instance.modelView2Json(view, arrayEncoding = self.requestOptions.arrayEncoding,
+					schemaETag = self.requestOptions.schemaETag)
+		# The full response (with the definitions) is cached 
+		cacheKey = computeResultCache.makeKey(model, view, parameters, self.requestOptions.arrayEncoding)
+		response = computeResultCache.get(cacheKey)
+		if (response is None):
+			instance = model()
+			instance.fieldValuesFromJson(parameters)
+			instance.compute()
+			response = instance.modelView2Json(view, arrayEncoding = self.requestOptions.arrayEncoding)
+			computeResultCache.put(cacheKey, response, model.resultCacheTTL)
+		if (response['schemaETag'] == self.requestOptions.schemaETag):
+			response = dict(response)
+			del response['definitions']
+			del response['actions']
+		return response
 	
 	@action.post()
 	def loadEg(self, model, view, parameters):
 		instance = model()
 		getattr(instance, parameters)()
-		return instance.modelView2Json(view)
+		return instance.modelView2Json(view, arrayEncoding = self.requestOptions.arrayEncoding,
+				schemaETag = self.requestOptions.schemaETag)
 	
 	
 	@action.post()
@@ -288,19 +364,29 @@ class ModularPageView(object):
 		for field in parameters:
 			# Looping over received data about storage fields
 			fieldDict = {}
-			h5File = h5py.File(field['hdfFile'], 'r')
 			datasetPath = field['hdfGroup'] + '/' + field['dataset']
-			if field['datasetColumns'] is None:
-				fieldDict[field['name']] = h5File[datasetPath][...].tolist()
-			else:
-				fieldDict[field['name']] = np.array(h5File[datasetPath][tuple(field['datasetColumns'])]).transpose().tolist()
-			h5File.close()
+			# The result files are written by the celery workers, so the handle
+			# must not be kept open after the request
+			with hdfFilePool.open(field['hdfFile'], 'r', keepOpen = False) as h5File:
+				if field.get('targetPoints') is not None:
+					# Min/max decimation of the (optional) time window, for plotting
+					fieldDict[field['name']] = MinMaxDecimator().load(
+							h5File[field['hdfGroup']], field['dataset'],
+							columns = field['datasetColumns'],
+							targetPoints = int(field['targetPoints']),
+							tStart = field.get('tStart'), tEnd = field.get('tEnd')).tolist()
+				elif field['datasetColumns'] is None:
+					fieldDict[field['name']] = h5File[datasetPath][...].tolist()
+				else:
+					fieldDict[field['name']] = np.array(h5File[datasetPath][tuple(field['datasetColumns'])]).transpose().tolist()
 			resultList.append(fieldDict)
 		return resultList
 	
 	@action.post()
 	def startCompute(self, model, view, parameters):
-		job = celeryCompute.delay(model.__name__, view.name, parameters)
+		job = celeryCompute.delay(model.__name__, view.name, parameters, 
+					arrayEncoding = self.requestOptions.arrayEncoding,
+					schemaETag = self.requestOptions.schemaETag)
 		if (job.failed()):
 			raise job.result
 		return {'jobID': job.id,
@@ -330,6 +416,81 @@ class ModularPageView(object):
 			return {'state': job.state}
 		else:
 			return {}
+	
+	def createSweep(self, model, parameters, maxPoints):
+		"""
+		Creates a parameter sweep from the action parameters 'base' (field values), 
+		'overrides' (list of {fieldPath: value}), 'grid' (list of [fieldPath, values]) and 
+		'outputs' (list of field paths)
+		:param maxPoints: maximum number of points of the sweep
+		"""
+		sweep = ParameterSweep(model, base = parameters.get('base'), 
+					overrides = parameters.get('overrides'), grid = parameters.get('grid'),
+					outputs = parameters.get('outputs'))
+		if (len(sweep) > maxPoints):
+			raise ValueError('The sweep has {0} points, more than the maximum of {1}'.format(len(sweep), maxPoints))
+		return sweep
+	
+	@action.post()
+	def sweep(self, model, view, parameters):
+		"""
+		Action evaluating the model over a list or grid of inputs in the request process.
+		No process pool is used, since forking the multithreaded server process is not safe;
+		parallel sweeps are evaluated by the celery workers (see `startSweep`).
+		Only small sweeps of synchronous models are accepted, since they block the request.
+		"""
+		if (model.async == True):
+			raise ValueError('The model {0} is asynchronous, use the startSweep action to sweep it'.format(model.__name__))
+		sweep = self.createSweep(model, parameters, sweepMaxRequestPoints)
+		if (not parameters.get('stream', False)):
+			return sweep.run(numWorkers = 1)
+		# Stream the rows as they finish, as lines of JSON
+		def iterLines():
+			yield json.dumps({'columns': sweep.columns, 'numPoints': len(sweep)}) + '\n'
+			for index, row, error in sweep.iterResults(numWorkers = 1):
+				yield json.dumps({'index': index, 'row': row, 'error': error}) + '\n'
+		return StreamingHttpResponse(iterLines(), content_type = 'application/x-ndjson')
+	
+	@action.post()
+	def startSweep(self, model, view, parameters):
+		"""
+		Action starting the evaluation of the model over a list or grid of inputs as a celery group
+		"""
+		sweep = self.createSweep(model, parameters, sweepMaxPoints)
+		job = group(celerySweepPoint.s(model.__name__, sweep.getParameters(i), 
+					sweep.outputs, sweep.getInputValues(i)) for i in range(len(sweep))).apply_async()
+		job.save()
+		return {'sweepID': job.id, 'columns': sweep.columns, 'numPoints': len(sweep)}
+	
+	@action.post()
+	def checkSweep(self, model, view, parameters):
+		"""
+		Action returning the rows of a sweep finished since the last check 
+		(parameter 'received' is the list of the indices of the rows already received)
+		"""
+		job = GroupResult.restore(parameters['sweepID'])
+		if (job is None):
+			raise ValueError('Unknown sweep {0}'.format(parameters['sweepID']))
+		received = set(parameters.get('received', []))
+		rows = {}
+		errors = {}
+		for index, result in enumerate(job.results):
+			if (index in received or not result.ready()):
+				continue
+			if (result.successful()):
+				rows[index] = result.result
+			else:
+				errors[index] = str(result.result)
+		numFinished = len(received) + len(rows) + len(errors)
+		return {'rows': rows, 'errors': errors, 'numFinished': numFinished, 'numPoints': len(job.results),
+				'state': 'SUCCESS' if numFinished == len(job.results) else 'PROGRESS'}
+	
+	@action.post()
+	def abortSweep(self, model, view, parameters):
+		job = GroupResult.restore(parameters['sweepID'])
+		if (job is not None):
+			job.revoke(terminate=True)
+		return {}
 		
 				
 	@classmethod
@@ -1,4 +1,5 @@
 cimport numpy as np
+from libcpp.vector cimport vector
 
 cdef extern from "math/ArrayInterface.h":
 	cdef cppclass MemoryView1D[T]:
@@ -26,3 +27,10 @@ cdef extern from "math/Interpolators.h":
 				MemoryView2D[double]* zValues, BoundaryHandling boundaryHandling) except +
 		double call 'operator()' (double xValue, double yValue) except +
 		void call 'operator()' (MemoryView1D[double]* inXValues, MemoryView1D[double]* inYValues, MemoryView1D[double]* outZValues) except +
+
+	cdef cppclass BiLinearTableInterpolator:
+		BiLinearTableInterpolator(MemoryView1D[double]* xValues, MemoryView1D[double]* yValues,
+				MemoryView3D[double]* zValues, BoundaryHandling boundaryHandling) except +
+		int getNumTables()
+		void call 'operator()' (MemoryView1D[double]* inXValues, MemoryView1D[double]* inYValues, MemoryView2D[double]* outValues,
+				vector[int]& outColumns, vector[int]& duplicateColumns) nogil except +
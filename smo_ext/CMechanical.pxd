@@ -6,7 +6,19 @@ cdef extern from "mechanical/RainflowCounter.h":
 		void setStresses(MemoryView1D[double]* sValues) except +
 		void setMeanStressCorrection(double M)
 		void setSNCurveParameters(double S_E, double N_E, double k)
-		double compute() except +
+		double compute() nogil except +
+
+cdef extern from "mechanical/StreamingRainflowCounter.h":
+	cdef cppclass StreamingRainflowCounter:
+		StreamingRainflowCounter(MemoryView1D[double]* binEdges, double hysteresis) except +
+		void setMeanStressCorrection(double M)
+		void setSNCurveParameters(double S_E, double N_E, double k)
+		void setUniformBins(double binOrigin, double binWidth) except +
+		void addStresses(MemoryView1D[double]* sValues) nogil except +
+		void getRainflowMatrix(MemoryView2D[double]* matrix, bint includeResidual) except +
+		double getDamage(bint includeResidual) except +
+		long getNumSamples()
+		int getNumBins()
 
 cdef extern from "mechanical/StressTensorCalculator.h" namespace "StressTensorCalculator":
 	void computePrincipalStresses(MemoryView2D[double]* stresses, MemoryView1D[double]* principalStresses) except +
@@ -1,6 +1,7 @@
 import numpy as np
 cimport numpy as np
 cimport CMath
+from libcpp.vector cimport vector
 
 cdef CMath.MemoryView1D[double]* createMemoryView1D(double [:] a):
 	return new CMath.MemoryView1D[double](&a[0], a.shape[0], a.strides[0])
@@ -49,4 +50,48 @@ cdef class Interpolator2D:
 		self.ptr.call(x, y, z)
 		del x, y, z
 		return zValues
-		
\ No newline at end of file
+
+cdef class TableInterpolator2D:
+	"""
+	Bilinear interpolation of several tables sharing the same grid, 
+	zData has shape (ny, nx, nTables)
+	"""
+	cdef CMath.BiLinearTableInterpolator* ptr
+	def __cinit__(self, double[:] xData not None, double[:] yData not None, double [:, :, :] zData not None):
+		cdef CMath.MemoryView1D[double]* x = createMemoryView1D(xData)
+		cdef CMath.MemoryView1D[double]* y = createMemoryView1D(yData)
+		cdef CMath.MemoryView3D[double]* z = createMemoryView3D(zData)
+		try:
+			self.ptr = new CMath.BiLinearTableInterpolator(x, y, z, CMath.ibhLinear)
+		finally:
+			del x, y, z
+	
+	def __dealloc__(self):
+		del self.ptr
+	
+	def __call__(self, double[:] xValues not None, double[:] yValues not None, out = None, 
+			outColumns = None, duplicateColumns = None):
+		"""
+		Interpolates all the tables and returns an array of shape (N, nTables), 
+		or writes the value of table k to column outColumns[k] (and duplicateColumns[k] 
+		if not negative) of a preallocated 2D output array
+		"""
+		numTables = self.ptr.getNumTables()
+		if (out is None):
+			out = np.zeros(shape = (xValues.shape[0], numTables))
+		if (outColumns is None):
+			outColumns = range(numTables)
+		if (duplicateColumns is None):
+			duplicateColumns = [-1] * numTables
+		cdef double[:, :] outView = out
+		cdef vector[int] columns = outColumns
+		cdef vector[int] duplicates = duplicateColumns
+		cdef CMath.MemoryView1D[double]* x = createMemoryView1D(xValues)
+		cdef CMath.MemoryView1D[double]* y = createMemoryView1D(yValues)
+		cdef CMath.MemoryView2D[double]* z = createMemoryView2D(outView)
+		try:
+			with nogil:
+				self.ptr.call(x, y, z, columns, duplicates)
+		finally:
+			del x, y, z
+		return out
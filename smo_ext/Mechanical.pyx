@@ -25,7 +25,73 @@ cdef class RainflowCounter:
 		self.ptr.setSNCurveParameters(S_E, N_E, k)
 			
 	def compute(self):
-		return self.ptr.compute()
+		# The GIL is released so that several counters can run in parallel threads
+		cdef double damage
+		with nogil:
+			damage = self.ptr.compute()
+		return damage
+
+cdef class StreamingRainflowCounter:
+	"""
+	Rainflow counter processing the stress history in chunks with fixed bin edges
+	(compiled version of smo.mechanical.Rainflow.StreamingRainflowCounter)
+	"""
+	cdef CMechanical.StreamingRainflowCounter* ptr
+	def __cinit__(self, double[:] binEdges not None, hysteresis = None):
+		if (hysteresis is None):
+			hysteresis = np.min(np.diff(binEdges))
+		cdef CMath.MemoryView1D[double]* edgesView = Math.createMemoryView1D(binEdges)
+		try:
+			self.ptr = new CMechanical.StreamingRainflowCounter(edgesView, hysteresis)
+		finally:
+			del edgesView
+	
+	def __dealloc__(self):
+		del self.ptr
+	
+	@staticmethod
+	def fromRange(double minStress, double maxStress, int numBins):
+		binWidth = (maxStress - minStress) / (numBins - 1)
+		binEdges = minStress + (np.arange(numBins + 1) - 0.5) * binWidth
+		cdef StreamingRainflowCounter counter = StreamingRainflowCounter(binEdges, hysteresis = binWidth)
+		counter.setUniformBins(minStress, binWidth)
+		return counter
+	
+	def setMeanStressCorrection(self, double M):
+		self.ptr.setMeanStressCorrection(M)
+	
+	def setSNCurveParameters(self, double S_E, double N_E, double k):
+		self.ptr.setSNCurveParameters(S_E, N_E, k)
+	
+	def setUniformBins(self, double binOrigin, double binWidth):
+		self.ptr.setUniformBins(binOrigin, binWidth)
+	
+	def addStresses(self, double[:] stressValues not None):
+		if (stressValues.shape[0] == 0):
+			return
+		cdef CMath.MemoryView1D[double]* sView = Math.createMemoryView1D(stressValues)
+		try:
+			with nogil:
+				self.ptr.addStresses(sView)
+		finally:
+			del sView
+	
+	def getRainflowMatrix(self, includeResidual = True):
+		numBins = self.ptr.getNumBins()
+		cdef np.ndarray[double, ndim = 2] rainflowMatrix = np.zeros([numBins, numBins], dtype = np.float)
+		cdef CMath.MemoryView2D[double]* mView = Math.createMemoryView2D(rainflowMatrix)
+		try:
+			self.ptr.getRainflowMatrix(mView, includeResidual)
+		finally:
+			del mView
+		return rainflowMatrix
+	
+	def getDamage(self, includeResidual = True):
+		return self.ptr.getDamage(includeResidual)
+	
+	property numSamples:
+		def __get__(self):
+			return self.ptr.getNumSamples()
 
 def computePrincipalStresses(double[:, ::1] stresses not None):
 	cdef np.ndarray[double] principalStresses = np.zeros(shape = stresses.shape[0], dtype = np.float)
@@ -249,3 +249,107 @@ double BiLinearInterpolator::rawInterp(int xIndex, double xValue, int yIndex, do
 	return zValue;
 }
 
+
+
+
+/**
+ * BiLinearTableInterpolator
+ */
+BiLinearTableInterpolator::BiLinearTableInterpolator(
+		MemoryView1D<double>* xValues,
+		MemoryView1D<double>* yValues,
+		MemoryView3D<double>* zValues,
+		BoundaryHandling boundaryHandling) :
+		zValues(zValues->len()),
+		boundaryHandling(boundaryHandling) {
+	numXValues = xValues->len();
+	numYValues = yValues->len();
+	numTables = zValues->shape(2);
+	if (numXValues != zValues->shape(1)) {
+		RaiseError("Inconsistent input data, the length of xValues("<< numXValues << ") must be equal to the second dimension of zValues ("<< zValues->shape(1) << ")")
+	}
+	if (numYValues != zValues->shape(0)) {
+		RaiseError("Inconsistent input data, the length of yValues("<< numYValues << ") must be equal to the first dimension of zValues("<< zValues->shape(0) << ")")
+	}
+	this->xValues = new double[numXValues];
+	this->yValues = new double[numYValues];
+	xValues->copyTo(this->xValues);
+	yValues->copyTo(this->yValues);
+	zValues->copyTo(&this->zValues[0]);
+}
+
+BiLinearTableInterpolator::~BiLinearTableInterpolator() {
+	delete[] xValues;
+	delete[] yValues;
+}
+
+void BiLinearTableInterpolator::locate(double* values, int numValues, double& value, int& index) {
+	// Same boundary handling as Interpolator2D
+	if (boundaryHandling == ibhError) {
+		if (value < values[0] || values[numValues - 1] < value) {
+			RaiseError("Input data (" << value << ") out of the interpolator range.");
+		}
+	} else if (boundaryHandling == ibhConstant) {
+		if (value < values[0]) {
+			value = values[0];
+			index = 0;
+			return;
+		} else if (value > values[numValues - 1]) {
+			value = values[numValues - 1];
+			index = numValues - 2;
+			return;
+		}
+	}
+	index = hunt(values, numValues, value, 2);
+}
+
+void BiLinearTableInterpolator::operator()(
+		MemoryView1D<double>* inXValues,
+		MemoryView1D<double>* inYValues,
+		MemoryView2D<double>* outValues,
+		const std::vector<int>& outColumns,
+		const std::vector<int>& duplicateColumns) {
+	if (inXValues->shape(0) != inYValues->shape(0)) {
+		RaiseError("Different length of x and y vectors: " << inXValues->shape(0) << " and " << inYValues->shape(0) << " respectively")
+	}
+	if (outValues->shape(0) != inXValues->shape(0)) {
+		RaiseError("The output has " << outValues->shape(0) << " rows instead of " << inXValues->shape(0))
+	}
+	if ((int) outColumns.size() != numTables || (int) duplicateColumns.size() != numTables) {
+		RaiseError("The column maps must have " << numTables << " elements")
+	}
+	for (int k = 0; k < numTables; k++) {
+		if (outColumns[k] < 0 || outColumns[k] >= outValues->shape(1) || duplicateColumns[k] >= outValues->shape(1)) {
+			RaiseError("Output column for table " << k << " out of range")
+		}
+	}
+	int rowStride = numXValues * numTables;
+	for (int i = 0; i < inXValues->len(); i++) {
+		double xValue = (*inXValues)(i);
+		double yValue = (*inYValues)(i);
+		if (isNaN(xValue) || isNaN(yValue)) {
+			RaiseError("Not-a-number value passed to interpolator");
+		}
+		int iX, iY;
+		locate(xValues, numXValues, xValue, iX);
+		locate(yValues, numYValues, yValue, iY);
+		// Compute the cell weights once for all the tables
+		double t = (xValue - xValues[iX])/(xValues[iX + 1] - xValues[iX]);
+		double u = (yValue - yValues[iY])/(yValues[iY + 1] - yValues[iY]);
+		double w00 = (1. - t) * (1. - u);
+		double w01 = t * (1. - u);
+		double w10 = (1. - t) * u;
+		double w11 = t * u;
+		const double* z00 = &zValues[iY * rowStride + iX * numTables];
+		const double* z01 = z00 + numTables;
+		const double* z10 = z00 + rowStride;
+		const double* z11 = z10 + numTables;
+		for (int k = 0; k < numTables; k++) {
+			double zValue = w00 * z00[k] + w01 * z01[k] + w10 * z10[k] + w11 * z11[k];
+			(*outValues)(i, outColumns[k]) = zValue;
+			if (duplicateColumns[k] >= 0) {
+				(*outValues)(i, duplicateColumns[k]) = zValue;
+			}
+		}
+	}
+}
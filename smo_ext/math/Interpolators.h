@@ -12,6 +12,7 @@
 #include "core/Definitions.h"
 #include "ArrayInterface.h"
 #include "VectorsMatrices.h"
+#include <vector>
 
 
 
@@ -130,4 +131,45 @@ protected:
 	virtual double rawInterp(int xIndex, double xValue, int yIndex, double yValue);
 };
 
+/**
+ * BiLinearTableInterpolator
+ *
+ * Bilinear interpolation of several tables sharing the same grid. The values are
+ * stored contiguously as zValues[yIndex][xIndex][tableIndex], so that the grid cell
+ * and the weights are computed once per point for all the tables.
+ */
+class BiLinearTableInterpolator : public GridInterpolator {
+public:
+	BiLinearTableInterpolator(
+			MemoryView1D<double>* xValues,
+			MemoryView1D<double>* yValues,
+			MemoryView3D<double>* zValues,
+			BoundaryHandling boundaryHandling = ibhConstant);
+	virtual ~BiLinearTableInterpolator();
+	int getNumTables() {return numTables;}
+	/**
+	 * Interpolates all the tables for each point. The value of table k is written
+	 * to column outColumns[k] of the output, and also to column duplicateColumns[k]
+	 * if it is not negative.
+	 */
+	void operator()(
+			MemoryView1D<double>* inXValues,
+			MemoryView1D<double>* inYValues,
+			MemoryView2D<double>* outValues,
+			const std::vector<int>& outColumns,
+			const std::vector<int>& duplicateColumns);
+
+protected:
+	void locate(double* values, int numValues, double& value, int& index);
+
+	double* xValues;
+	double* yValues;
+	std::vector<double> zValues;
+
+	int numXValues;
+	int numYValues;
+	int numTables;
+	BoundaryHandling boundaryHandling;
+};
+
 #endif /* INTERPOLATORS_H_ */
@@ -0,0 +1,229 @@
+/*
+ * StreamingRainflowCounter.cpp
+ *
+ *  Created on: Oct 18, 2026
+ *      Author: Atanas Pavlov
+ *      Copyright: SysMo Ltd., Bulgaria
+ */
+
+#include "StreamingRainflowCounter.h"
+
+// Turning point search states
+enum {
+	srsNoSamples = 0,
+	srsStarting = 1,
+	srsLookingForMinimum = 2,
+	srsLookingForMaximum = 3
+};
+
+StreamingRainflowCounter::StreamingRainflowCounter(MemoryView1D<double>* binEdges, double hysteresis)
+: numBins(binEdges->len() - 1), binEdges(binEdges->len()), binCenters(binEdges->len() - 1),
+  hysteresis(hysteresis), uniformBins(false), binOrigin(0), binWidth(0), numSamples(0), firstValue(0), lastValue(0), searchState(srsNoSamples),
+  lastMinValue(Infinity), lastMaxValue(-Infinity), ir(1), rainflowMatrix(numBins, numBins, 0),
+  S_E(0), N_E(0), k(0), M(0) {
+	MemoryView1D<double>& edges = *binEdges;
+	if (numBins < 1) {
+		RaiseError("At least 2 bin edges are necessary");
+	}
+	for (int i = 0; i <= numBins; i++) {
+		this->binEdges[i] = edges(i);
+		if (i > 0) {
+			if (edges(i) <= edges(i - 1)) {
+				RaiseError("The bin edges must be monotonically increasing");
+			}
+			binCenters[i - 1] = (edges(i - 1) + edges(i)) / 2;
+		}
+	}
+}
+
+StreamingRainflowCounter::~StreamingRainflowCounter() {
+}
+
+void StreamingRainflowCounter::setMeanStressCorrection(double M) {
+	this->M = M;
+}
+
+void StreamingRainflowCounter::setSNCurveParameters(double S_E, double N_E, double k) {
+	this->S_E = S_E;
+	this->N_E = N_E;
+	this->k = k;
+}
+
+void StreamingRainflowCounter::setUniformBins(double binOrigin, double binWidth) {
+	if (binWidth <= 0) {
+		RaiseError("The bin width must be positive");
+	}
+	uniformBins = true;
+	this->binOrigin = binOrigin;
+	this->binWidth = binWidth;
+	for (int i = 0; i < numBins; i++) {
+		binCenters[i] = i * binWidth + binOrigin;
+	}
+}
+
+int StreamingRainflowCounter::getBinIndex(double value) {
+	if (uniformBins) {
+		// Same rounding as PercentileCalculator, clipped in double to avoid int overflow
+		double index = floor((value - binOrigin) / binWidth + 0.5);
+		if (index < 0) {
+			return 0;
+		}
+		if (index > numBins - 1) {
+			return numBins - 1;
+		}
+		return (int) index;
+	}
+	// Bisection for the last edge <= value
+	int lo = 0;
+	int hi = numBins + 1;
+	while (hi - lo > 1) {
+		int mid = (lo + hi) / 2;
+		if (binEdges[mid] <= value) {
+			lo = mid;
+		} else {
+			hi = mid;
+		}
+	}
+	if (value < binEdges[0]) {
+		return 0;
+	}
+	return Min(lo, numBins - 1);
+}
+
+void StreamingRainflowCounter::addStresses(MemoryView1D<double>* sValues) {
+	MemoryView1D<double>& sigma = *sValues;
+	int n = sigma.len();
+	if (n == 0) {
+		return;
+	}
+	int i = 0;
+	if (searchState == srsNoSamples) {
+		// Add the first point
+		firstValue = sigma(0);
+		addTurningPoint(firstValue);
+		searchState = srsStarting;
+		i = 1;
+	}
+	for (; i < n; i++) {
+		double sp = sigma(i);
+		if (searchState == srsStarting) {
+			// Decide if we start searching for min or max
+			if (fabs(sp - firstValue) < hysteresis) {
+				continue;
+			}
+			searchState = (sp > firstValue) ? srsLookingForMaximum : srsLookingForMinimum;
+		}
+		// Update the current local max
+		if (sp > lastMaxValue) {
+			lastMaxValue = sp;
+		}
+		// Update the current local min
+		if (sp < lastMinValue) {
+			lastMinValue = sp;
+		}
+		if (searchState == srsLookingForMaximum) {
+			if (sp < lastMaxValue - hysteresis) {
+				addTurningPoint(lastMaxValue);
+				lastMinValue = sp;
+				searchState = srsLookingForMinimum;
+			}
+		} else {
+			if (sp > lastMinValue + hysteresis) {
+				addTurningPoint(lastMinValue);
+				lastMaxValue = sp;
+				searchState = srsLookingForMaximum;
+			}
+		}
+	}
+	lastValue = sigma(n - 1);
+	numSamples += n;
+}
+
+void StreamingRainflowCounter::addTurningPoint(double value) {
+	fillRainflowMatrix(getBinIndex(value), residual, ir, rainflowMatrix);
+}
+
+void StreamingRainflowCounter::fillRainflowMatrix(int s, std::vector<int>& residual, int& ir, NRmatrix<int>& matrix) {
+	bool repeat = true;
+	while (repeat) {
+		repeat = false;
+		int iz = residual.size();
+		if (iz > ir) {
+			int secLastRes = residual[iz - 2];
+			int lastRes = residual[iz - 1];
+			if ((s - lastRes) * (lastRes - secLastRes) >= 0) {
+				residual.pop_back();
+				repeat = true;
+			} else if (abs(s - lastRes) >= abs(lastRes - secLastRes)) {
+				matrix[lastRes][secLastRes] += 1;
+				residual.resize(iz - 2);
+				repeat = true;
+			}
+		} else if (iz == ir) {
+			int lastRes = residual[iz - 1];
+			if (((s - lastRes) * lastRes) >= 0) {
+				residual.pop_back();
+				repeat = true;
+			} else if (abs(s) > abs(lastRes)) {
+				ir += 1;
+			}
+		}
+	}
+	residual.push_back(s);
+}
+
+void StreamingRainflowCounter::closeHistory(NRmatrix<int>& matrix) {
+	// Add the last point
+	std::vector<int> lastResidual(residual);
+	int lastIr = ir;
+	fillRainflowMatrix(getBinIndex(lastValue), lastResidual, lastIr, matrix);
+	// Repeat the run on the residual
+	int resLen = lastResidual.size() - 1;
+	std::vector<int> repeatedResidual;
+	int repeatedIr = 1;
+	for (int i = 0; i < 2 * resLen; i++) {
+		fillRainflowMatrix(lastResidual[i % resLen], repeatedResidual, repeatedIr, matrix);
+	}
+}
+
+void StreamingRainflowCounter::getRainflowMatrix(MemoryView2D<double>* matrix, bool includeResidual) {
+	MemoryView2D<double>& m = *matrix;
+	NRmatrix<int> result(rainflowMatrix);
+	if (includeResidual && searchState != srsNoSamples) {
+		closeHistory(result);
+	}
+	for (int i = 0; i < numBins; i++) {
+		for (int j = 0; j < numBins; j++) {
+			m(i, j) = result[i][j];
+		}
+	}
+}
+
+double StreamingRainflowCounter::getDamage(bool includeResidual) {
+	if (S_E == 0 || N_E == 0) {
+		RaiseError("S-N curve parameters not set, call setSNCurveParameters first");
+	}
+	NRmatrix<int> result(rainflowMatrix);
+	if (includeResidual && searchState != srsNoSamples) {
+		closeHistory(result);
+	}
+	double damage = 0;
+	for (int i = 0; i < numBins; i++) {
+		for (int j = 0; j < numBins; j++) {
+			if (result[i][j] == 0) {
+				continue;
+			}
+			double cycleAmplitude = fabs(binCenters[i] - binCenters[j]) / 2;
+			double meanStress = (binCenters[i] + binCenters[j]) / 2;
+			double correction;
+			if (meanStress >= -cycleAmplitude) {
+				correction = M * meanStress;
+			} else {
+				correction = - M * cycleAmplitude;
+			}
+			double correctedApmplitude = cycleAmplitude + correction;
+			damage += 1 / N_E * pow(correctedApmplitude / S_E, k) * result[i][j];
+		}
+	}
+	return damage;
+}
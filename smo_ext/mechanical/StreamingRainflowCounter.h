@@ -0,0 +1,71 @@
+/*
+ * StreamingRainflowCounter.h
+ *
+ *  Created on: Oct 18, 2026
+ *      Author: Atanas Pavlov
+ *      Copyright: SysMo Ltd., Bulgaria
+ */
+
+#ifndef STREAMINGRAINFLOWCOUNTER_H_
+#define STREAMINGRAINFLOWCOUNTER_H_
+
+#include <vector>
+#include "core/Definitions.h"
+#include "math/ArrayInterface.h"
+#include "math/VectorsMatrices.h"
+
+/**
+ * Rainflow counter processing the stress history in chunks. Only the state
+ * of the turning point search, the residual stack and the rainflow matrix
+ * are kept, so the memory doesn't depend on the length of the history.
+ * The stress bins are fixed in advance by the bin edges.
+ */
+class StreamingRainflowCounter {
+public:
+	StreamingRainflowCounter(MemoryView1D<double>* binEdges, double hysteresis);
+	virtual ~StreamingRainflowCounter();
+
+	void setMeanStressCorrection(double M);
+	void setSNCurveParameters(double S_E, double N_E, double k);
+	void setUniformBins(double binOrigin, double binWidth);
+	void addStresses(MemoryView1D<double>* sValues);
+	void getRainflowMatrix(MemoryView2D<double>* matrix, bool includeResidual);
+	double getDamage(bool includeResidual);
+	long getNumSamples() {return numSamples;}
+	int getNumBins() {return numBins;}
+
+protected:
+	int getBinIndex(double value);
+	void addTurningPoint(double value);
+	void fillRainflowMatrix(int s, std::vector<int>& residual, int& ir, NRmatrix<int>& matrix);
+	void closeHistory(NRmatrix<int>& matrix);
+protected:
+	int numBins;
+	NRvector<double> binEdges;
+	NRvector<double> binCenters;
+	double hysteresis;
+	// Uniform bins, indexed by rounding as in PercentileCalculator
+	bool uniformBins;
+	double binOrigin;
+	double binWidth;
+
+	// Turning point search state
+	long numSamples;
+	double firstValue;
+	double lastValue;
+	int searchState;
+	double lastMinValue;
+	double lastMaxValue;
+
+	// Residual stack state
+	std::vector<int> residual;
+	int ir;
+	NRmatrix<int> rainflowMatrix;
+
+	double S_E;
+	double N_E;
+	double k;
+	double M;
+};
+
+#endif /* STREAMINGRAINFLOWCOUNTER_H_ */
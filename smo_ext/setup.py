@@ -50,6 +50,7 @@ mathExtension = Extension(
 mechExtension = Extension(
 	'smo_ext.Mechanical', sources = [	
 		"mechanical/RainflowCounter.cpp",
+		"mechanical/StreamingRainflowCounter.cpp",
 		"mechanical/StressTensorCalculator.cpp",
 		'Mechanical.pyx'
 	],